@@ -0,0 +1,343 @@
+"""
+Alarm-Regeln über das Screener-Ergebnis
+Regeln wie  pct_change < -5 and vol_ratio > 2 in sector Finanzen  werden einmal geparst und
+gegen den ganzen Screener-Frame als NumPy-Masken ausgewertet (eine Maske pro Regel, gleiche
+Teilbedingungen nur einmal). Treffer gehen als JSON in eine Datei und/oder an einen Webhook.
+
+Syntax:
+  Vergleich   spalte < 3 · spalte >= -1.5 · spalte > andere_spalte · sector == Finanzen · country != UK
+  Listen      sector in (Finanzen, Energie) · ticker in ("SAP.DE", "SIE.DE")
+  Verknüpfung and · or · not · Klammern
+  Eingrenzung ... in sector Finanzen · ... in country Deutschland, Frankreich  (gilt für die ganze Regel)
+
+Aufruf:
+  python alerts.py check                     # Regeln gegen den letzten Snapshot des Archivs prüfen
+  python alerts.py check "rsi_14 < 30 in sector Technologie"
+  python alerts.py serve --port 8099         # lokaler Webhook-Empfänger (Stand-in), schreibt alerts_received.jsonl
+"""
+
+import argparse, json, os, re
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+DATA_DIR    = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+RULES_FILE  = os.environ.get("SCREENER_ALERTS", os.path.join(DATA_DIR, "alerts.csv"))
+WEBHOOK_URL = os.environ.get("SCREENER_ALERT_WEBHOOK", "")
+
+TEXT_COLUMNS  = ["ticker", "name", "country", "sector", "currency"]
+MATCH_COLUMNS = ["ticker", "name", "country", "sector", "close", "pct_change", "vol_ratio", "turnover_eur"]
+KEYWORDS      = {"and", "or", "not", "in"}
+
+_TOKEN = re.compile(r"""\s*(?:
+    (?P<num>-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?(?![\w.]))
+  | (?P<op><=|>=|==|!=|<|>|=)
+  | (?P<str>"[^"]*"|'[^']*')
+  | (?P<punct>[(),])
+  | (?P<word>[^\s()<>=!,"']+)
+)""", re.VERBOSE)
+
+_OPS = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+        "==": np.equal, "=": np.equal, "!=": np.not_equal}
+
+
+# ─────────────────────────────────────────────
+# Parser: Regeltext → Baum aus Tupeln
+# ─────────────────────────────────────────────
+def tokenize(text):
+    tokens, pos = [], 0
+    text = text.strip()
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if not m or m.end() == pos:
+            raise ValueError(f"unerwartetes Zeichen an Position {pos}: {text[pos:pos + 10]!r}")
+        kind = m.lastgroup
+        val  = m.group(kind)
+        if kind == "num":
+            val = float(val)
+        elif kind == "str":
+            val, kind = val[1:-1], "text"
+        elif kind == "word" and val.lower() in KEYWORDS:
+            val, kind = val.lower(), "kw"
+        tokens.append((kind, val))
+        pos = m.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.i      = 0
+
+    def peek(self, kind=None, value=None):
+        if self.i >= len(self.tokens):
+            return None
+        tok = self.tokens[self.i]
+        if (kind and tok[0] != kind) or (value is not None and tok[1] != value):
+            return None
+        return tok
+
+    def take(self, kind=None, value=None, what=None):
+        tok = self.peek(kind, value)
+        if tok is None:
+            got = self.tokens[self.i][1] if self.i < len(self.tokens) else "Ende der Regel"
+            raise ValueError(f"{what or value or kind} erwartet, gefunden: {got!r}")
+        self.i += 1
+        return tok
+
+    def parse(self):
+        tree = self.scoped()
+        if self.i < len(self.tokens):
+            raise ValueError(f"unerwartet: {self.tokens[self.i][1]!r}")
+        return tree
+
+    def scoped(self):
+        """Ausdruck, gefolgt von beliebig vielen Eingrenzungen  in <spalte> <werte>."""
+        tree = self.expr()
+        while self.peek("kw", "in"):
+            self.i += 1
+            col  = self.take("word", what="Spalte")[1]
+            tree = ("and", tree, ("in", col, self.values()))
+        return tree
+
+    def expr(self):
+        tree = self.conj()
+        while self.peek("kw", "or"):
+            self.i += 1
+            tree = ("or", tree, self.conj())
+        return tree
+
+    def conj(self):
+        tree = self.unary()
+        while self.peek("kw", "and"):
+            self.i += 1
+            tree = ("and", tree, self.unary())
+        return tree
+
+    def unary(self):
+        if self.peek("kw", "not"):
+            self.i += 1
+            return ("not", self.unary())
+        if self.peek("punct", "("):
+            self.i += 1
+            tree = self.scoped()
+            self.take("punct", ")")
+            return tree
+        col = self.take("word", what="Spalte")[1]
+        if self.peek("kw", "in"):
+            # spalte in (a, b) – ohne Klammer wäre es eine Eingrenzung der ganzen Regel
+            if self.i + 1 < len(self.tokens) and self.tokens[self.i + 1] == ("punct", "("):
+                self.i += 2
+                values = self.values()
+                self.take("punct", ")")
+                return ("in", col, values)
+        op = self.take("op", what="Vergleichsoperator")[1]
+        kind, val = self.take(what="Wert")
+        if kind == "word" and col not in TEXT_COLUMNS:
+            return ("cmp", col, op, ("col", val))       # Vergleich zweier Spalten
+        if kind not in ("num", "text", "word"):
+            raise ValueError(f"Wert erwartet, gefunden: {val!r}")
+        return ("cmp", col, op, val)
+
+    def values(self):
+        out = [self.take(what="Wert")[1]]
+        while self.peek("punct", ","):
+            self.i += 1
+            out.append(self.take(what="Wert")[1])
+        return tuple(out)
+
+
+def parse_rule(text):
+    return _Parser(text).parse()
+
+
+def columns_of(tree):
+    kind = tree[0]
+    if kind in ("and", "or"):
+        return columns_of(tree[1]) | columns_of(tree[2])
+    if kind == "not":
+        return columns_of(tree[1])
+    if kind == "in":
+        return {tree[1]}
+    value = tree[3]
+    return {tree[1]} | ({value[1]} if isinstance(value, tuple) else set())
+
+
+# ─────────────────────────────────────────────
+# Auswertung: ein Kontext pro Frame, Teilmasken werden geteilt
+# ─────────────────────────────────────────────
+class _Context:
+    def __init__(self, df):
+        self.df     = df
+        self.arrays = {}
+        self.masks  = {}
+
+    def numeric(self, col):
+        if col not in self.arrays:
+            self.arrays[col] = self.df[col].to_numpy(dtype=float)
+        return self.arrays[col]
+
+    def codes(self, col):
+        """Textspalte als Codes + Zuordnung casefold(Wert) → Codes."""
+        if col not in self.arrays:
+            codes, uniques = pd.factorize(self.df[col])
+            lookup = {}
+            for k, u in enumerate(uniques):
+                lookup.setdefault(str(u).casefold(), []).append(k)
+            self.arrays[col] = (codes, lookup)
+        return self.arrays[col]
+
+    def isin(self, col, values):
+        codes, lookup = self.codes(col)
+        hit = [k for v in values for k in lookup.get(str(v).casefold(), [])]
+        return np.isin(codes, hit)
+
+    def eval(self, tree):
+        key = tree
+        if key in self.masks:
+            return self.masks[key]
+        kind = tree[0]
+        if kind == "and":
+            out = self.eval(tree[1]) & self.eval(tree[2])
+        elif kind == "or":
+            out = self.eval(tree[1]) | self.eval(tree[2])
+        elif kind == "not":
+            out = ~self.eval(tree[1])
+        elif kind == "in":
+            out = self.isin(tree[1], tree[2])
+        else:
+            _, col, op, value = tree
+            if col in TEXT_COLUMNS:
+                if op not in ("==", "=", "!="):
+                    raise ValueError(f"{col}: Textspalte erlaubt nur == / !=")
+                out = self.isin(col, (value,))
+                out = ~out if op == "!=" else out
+            else:
+                a = self.numeric(col)
+                b = self.numeric(value[1]) if isinstance(value, tuple) else value
+                with np.errstate(invalid="ignore"):
+                    out = _OPS[op](a, b) & ~np.isnan(a) & ~np.isnan(b)
+        self.masks[key] = out
+        return out
+
+
+class AlertEngine:
+    def __init__(self, rules):
+        """rules: [(Name, Regeltext), ...] – alle Regeln werden sofort geparst,
+        Fehler gesammelt gemeldet."""
+        self.rules, errors = [], []
+        for name, text in rules:
+            try:
+                self.rules.append((name, text, parse_rule(text)))
+            except ValueError as e:
+                errors.append(f"{name}: {e}")
+        if errors:
+            raise ValueError(f"Alarm-Regeln ungültig ({len(errors)} Fehler):\n  " + "\n  ".join(errors))
+        self.columns = set().union(*(columns_of(t) for _, _, t in self.rules)) if self.rules else set()
+
+    @classmethod
+    def load(cls, path=RULES_FILE):
+        if not path or not os.path.exists(path):
+            return cls([])
+        table = pd.read_csv(path, dtype=str, keep_default_na=False, encoding="utf-8", comment="#")
+        return cls([(r["name"].strip(), r["rule"].strip()) for _, r in table.iterrows() if r["rule"].strip()])
+
+    def __len__(self):
+        return len(self.rules)
+
+    def masks(self, df):
+        """Regel × Ticker als bool-Matrix."""
+        missing = sorted(self.columns - set(df.columns))
+        if missing:
+            raise ValueError(f"Alarm-Regeln verwenden unbekannte Spalten: {', '.join(missing)}")
+        ctx = _Context(df)
+        if not self.rules:
+            return np.zeros((0, len(df)), dtype=bool)
+        return np.stack([ctx.eval(tree) for _, _, tree in self.rules])
+
+    def evaluate(self, df):
+        """Treffer als Frame: eine Zeile pro (Regel, Ticker)."""
+        hits = self.masks(df)
+        r, t = np.nonzero(hits)
+        out  = df.iloc[t][[c for c in MATCH_COLUMNS if c in df.columns]].reset_index(drop=True)
+        out.insert(0, "rule", [self.rules[k][0] for k in r])
+        return out
+
+
+# ─────────────────────────────────────────────
+# Ausgabe: Datei und Webhook
+# ─────────────────────────────────────────────
+def alerts_payload(matches, asof=None):
+    return {
+        "asof":      asof,
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "count":     len(matches),
+        "alerts":    json.loads(matches.to_json(orient="records", force_ascii=False)),
+    }
+
+
+def write_alerts(matches, path, asof=None):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(alerts_payload(matches, asof), fh, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+    return path
+
+
+def post_alerts(matches, url, asof=None, session=None, timeout=10):
+    """Ein POST pro Lauf mit allen Treffern; liefert den HTTP-Status."""
+    import requests
+    session = session or requests.Session()
+    r = session.post(url, json=alerts_payload(matches, asof), timeout=timeout)
+    return r.status_code
+
+
+def serve(port, out_path):
+    """Lokaler Webhook-Empfänger: jede empfangene Nachricht als Zeile in out_path."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with open(out_path, "ab") as fh:
+                fh.write(body.replace(b"\n", b" ") + b"\n")
+            try:
+                count = json.loads(body).get("count")
+            except ValueError:
+                count = "?"
+            print(f"🔔 {count} Alarme empfangen")
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    print(f"Webhook-Empfänger auf http://127.0.0.1:{port}/ → {out_path}")
+    ThreadingHTTPServer(("127.0.0.1", port), Handler).serve_forever()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Alarm-Regeln prüfen oder Webhook-Empfänger starten")
+    ap.add_argument("command", choices=["check", "serve"])
+    ap.add_argument("rule", nargs="?", help="einzelne Regel statt der Regeldatei")
+    ap.add_argument("--rules", default=RULES_FILE)
+    ap.add_argument("--port", type=int, default=8099)
+    ap.add_argument("--out", default="alerts_received.jsonl")
+    args = ap.parse_args()
+
+    if args.command == "serve":
+        serve(args.port, args.out)
+    else:
+        from snapshots import SnapshotArchive
+        engine  = AlertEngine([("regel", args.rule)]) if args.rule else AlertEngine.load(args.rules)
+        archive = SnapshotArchive(os.environ.get("SCREENER_SNAPSHOTS",
+                                                 os.path.join(os.environ.get("SCREENER_CACHE", "cache"), "snapshots")))
+        dates = archive.dates()
+        if not dates:
+            raise SystemExit("Kein Snapshot im Archiv – erst einen Screener-Lauf ausführen.")
+        df = archive.scan(start=dates[-1]).drop(columns="date")
+        matches = engine.evaluate(df)
+        print(f"{len(engine)} Regeln · {len(matches)} Treffer am {dates[-1]:%d.%m.%Y}")
+        with pd.option_context("display.width", 160, "display.max_rows", 200):
+            print(matches.to_string(index=False) if len(matches) else "")
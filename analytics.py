@@ -0,0 +1,194 @@
+"""
+Querschnitts-Kennzahlen über das Universum
+Sektor- und Länder-Aggregate aus dem Screener-Frame, Advance/Decline aus den Tagesrenditen
+(Datum × Ticker) und Korrelationen als geblockte Matrixprodukte über das ganze Renditepanel –
+auch bei Tausenden Tickern ohne paarweise pandas-.corr().
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+RETURN_DAYS      = 60       # Handelstage für A/D-Linie und Korrelationsfenster
+CORR_MIN_PERIODS = 20       # gemeinsame Renditen, ab denen ein Paar zählt
+CORR_DTYPE       = np.dtype(os.environ.get("SCREENER_CORR_DTYPE", "float32"))
+CORR_BLOCK       = 1024     # Zeilen der Korrelationsmatrix pro Block (Speicher: BLOCK × N)
+
+
+# ─────────────────────────────────────────────
+# Renditepanel (Datum × Ticker)
+# ─────────────────────────────────────────────
+class ReturnPanel:
+    """Tagesrenditen der letzten `days` Handelstage; NaN = an diesem Tag kein Bar
+    (Börsenfeiertag, Handelsaussetzung). Basis ist der jeweils letzte vorhandene Schlusskurs."""
+
+    def __init__(self, dates, tickers, values):
+        self.dates   = np.asarray(dates, dtype="datetime64[D]")
+        self.tickers = pd.Index(tickers, name="ticker")
+        self.values  = np.asarray(values, dtype=float)
+
+    def __len__(self):
+        return len(self.dates)
+
+    @classmethod
+    def from_closes(cls, dates, tickers, closes, days=RETURN_DAYS):
+        """closes: (Datum × Ticker) mit NaN an Tagen ohne Bar, z.B. HistoryStore.view("Close")."""
+        window = np.asarray(closes[-(days + 1):], dtype=float)
+        filled = pd.DataFrame(window).ffill().to_numpy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ret = window[1:] / filled[:-1] - 1
+        ret[np.isnan(window[1:])] = np.nan
+        return cls(np.asarray(dates)[-len(ret):] if len(ret) else [], tickers, ret)
+
+    @classmethod
+    def from_frames(cls, ticker_data, days=RETURN_DAYS):
+        """ticker_data: {Ticker: Frame bzw. {"Date": ..., "Close": ...}} – nur die letzten Bars je Ticker."""
+        tails = {t: (np.asarray(d["Date"], dtype="datetime64[D]")[-(days + 1):], np.asarray(d["Close"], dtype=float)[-(days + 1):])
+                 for t, d in ticker_data.items() if d is not None and len(d["Date"])}
+        if not tails:
+            return cls([], [], np.empty((0, 0)))
+        dates  = np.unique(np.concatenate([d for d, _ in tails.values()]))[-(days + 1):]
+        closes = np.full((len(dates), len(tails)), np.nan)
+        for j, (d, c) in enumerate(tails.values()):
+            keep = d >= dates[0]
+            closes[np.searchsorted(dates, d[keep]), j] = c[keep]
+        return cls.from_closes(dates, list(tails), closes, days)
+
+    @classmethod
+    def concat(cls, panels):
+        """Panels verschiedener Shards nebeneinander, Datumsachse als Vereinigung."""
+        panels = [p for p in panels if p is not None and len(p.tickers)]
+        if not panels:
+            return None
+        dates  = np.unique(np.concatenate([p.dates for p in panels]))
+        values = np.full((len(dates), sum(len(p.tickers) for p in panels)), np.nan)
+        col = 0
+        for p in panels:
+            values[np.searchsorted(dates, p.dates), col:col + len(p.tickers)] = p.values
+            col += len(p.tickers)
+        return cls(dates, np.concatenate([p.tickers.to_numpy() for p in panels]), values)
+
+    def subset(self, tickers):
+        cols = self.tickers.get_indexer(list(tickers))
+        cols = cols[cols >= 0]
+        return ReturnPanel(self.dates, self.tickers[cols], self.values[:, cols])
+
+    def save(self, path):
+        np.savez(path, dates=self.dates, tickers=self.tickers.to_numpy(dtype=str), values=self.values)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as z:
+            return cls(z["dates"], z["tickers"], z["values"])
+
+
+# ─────────────────────────────────────────────
+# Aggregate aus dem Screener-Frame
+# ─────────────────────────────────────────────
+def group_aggregates(df, by):
+    """Je Sektor bzw. Land: Anzahl, Ø/Median-Veränderung, Marktbreite, Tagesumsatz und
+    umsatzgewichtete Veränderung (Gewicht: Umsatz in EUR, ohne Wechselkurse Schlusskurs × Volumen
+    in Landeswährung)."""
+    pct      = df["pct_change"]
+    if "turnover_eur" in df.columns:
+        turnover = df["turnover_eur"].where(lambda s: s > 0)
+    else:
+        turnover = (df["close"] * df["volume"]).where(lambda s: s > 0) if "volume" in df.columns else None
+    g = df.assign(
+        adv=pct > 0, dec=pct < 0,
+        w=turnover, wpct=pct * turnover if turnover is not None else np.nan,
+    ).groupby(by, sort=False)
+    out = pd.DataFrame({
+        "count":      g.size(),
+        "mean":       g["pct_change"].mean(),
+        "median":     g["pct_change"].median(),
+        "advancers":  g["adv"].sum(),
+        "decliners":  g["dec"].sum(),
+    })
+    out["breadth"]   = out["advancers"] / out["count"]
+    out["turnover"]  = g["w"].sum(min_count=1) if "turnover_eur" in df.columns else np.nan
+    out["vw_return"] = g["wpct"].sum(min_count=1) / g["w"].sum(min_count=1)
+    return out.sort_values("mean", ascending=False)
+
+
+def advance_decline(panel):
+    """Je Handelstag: steigende, fallende, unveränderte Titel und kumulierte A/D-Linie."""
+    ret  = panel.values
+    adv  = (ret > 0).sum(axis=1)
+    dec  = (ret < 0).sum(axis=1)
+    unch = (ret == 0).sum(axis=1)
+    return pd.DataFrame({"advancers": adv, "decliners": dec, "unchanged": unch,
+                         "net": adv - dec, "line": np.cumsum(adv - dec)},
+                        index=pd.DatetimeIndex(panel.dates, name="date"))
+
+
+# ─────────────────────────────────────────────
+# Korrelationen
+# ─────────────────────────────────────────────
+def corr_blocks(values, min_periods=CORR_MIN_PERIODS, dtype=CORR_DTYPE, block=CORR_BLOCK):
+    """Paarweise Pearson-Korrelation (nur gemeinsame Tage, wie DataFrame.corr) als Blöcke
+    von `block` Zeilen: liefert (Startzeile, Block × N). Fehlende Werte werden als Maske in die
+    Summen gerechnet – sechs Matrixprodukte pro Block statt N² einzelner Paare."""
+    values = np.asarray(values, dtype=float)
+    mask   = ~np.isnan(values)
+    # Zentrieren ändert die Korrelation nicht, hält aber die Summen in float32 stabil
+    x  = np.where(mask, values - np.nanmean(np.where(mask.any(axis=0), values, 0.0), axis=0), 0.0).astype(dtype)
+    m  = mask.astype(dtype)
+    x2 = x * x
+    for i0 in range(0, values.shape[1], block):
+        xb, mb = x[:, i0:i0 + block], m[:, i0:i0 + block]
+        n   = mb.T @ m
+        sx  = xb.T @ m
+        sy  = mb.T @ x
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = xb.T @ x - sx * sy / n
+            vx  = x2[:, i0:i0 + block].T @ m - sx * sx / n
+            vy  = mb.T @ x2 - sy * sy / n
+            c   = cov / np.sqrt(vx * vy)
+        c[(n < min_periods) | ~np.isfinite(c)] = np.nan
+        np.clip(c, -1, 1, out=c)
+        yield i0, c
+
+
+def correlation_matrix(values, **kw):
+    """Vollständige N × N-Matrix – nur für überschaubare N; sonst corr_blocks direkt reduzieren."""
+    n   = np.shape(values)[1]
+    out = np.empty((n, n), dtype=kw.get("dtype", CORR_DTYPE))
+    for i0, c in corr_blocks(values, **kw):
+        out[i0:i0 + len(c)] = c
+    return out
+
+
+def group_correlation(panel, labels, **kw):
+    """Mittlere paarweise Korrelation zwischen bzw. innerhalb der Gruppen (z.B. Sektoren),
+    blockweise über One-Hot-Matrixprodukte verdichtet; die Diagonale (Ticker mit sich selbst) zählt nicht.
+    Liefert (Gruppe × Gruppe-Frame, mittlere Korrelation des Universums)."""
+    codes, groups = pd.factorize(pd.Index(labels), sort=True)
+    dtype  = kw.get("dtype", CORR_DTYPE)
+    onehot = np.zeros((len(codes), len(groups)), dtype=dtype)
+    onehot[np.arange(len(codes)), codes] = 1
+    sums   = np.zeros((len(groups), len(groups)))
+    counts = np.zeros((len(groups), len(groups)))
+    for i0, c in corr_blocks(panel.values, **kw):
+        valid = ~np.isnan(c)
+        rows  = np.arange(len(c))
+        valid[rows, i0 + rows] = False
+        c = np.where(valid, c, 0).astype(dtype)
+        g = onehot[i0:i0 + len(c)].T
+        sums   += g @ c @ onehot
+        counts += g @ valid.astype(dtype) @ onehot
+    with np.errstate(invalid="ignore"):
+        mean = pd.DataFrame(sums / counts, index=groups, columns=groups)
+        avg  = sums.sum() / counts.sum() if counts.sum() else np.nan
+    return mean, avg
+
+
+def market_analytics(df, panel=None):
+    """Alles für die Markt-Ansicht des Dashboards."""
+    out = {"sectors": group_aggregates(df, "sector"), "countries": group_aggregates(df, "country")}
+    if panel is not None and len(panel):
+        panel = panel.subset(df["ticker"])
+        sector_of = df.set_index("ticker")["sector"].reindex(panel.tickers)
+        out["ad"] = advance_decline(panel)
+        out["sector_corr"], out["avg_corr"] = group_correlation(panel, sector_of.to_numpy())
+    return out
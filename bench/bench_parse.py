@@ -0,0 +1,60 @@
+"""
+Mikrobenchmark: CSV-Parsing einer stooq-Antwort
+alt: r.text → StringIO → read_csv → to_datetime → sort_values
+neu: screener.parse_csv(r.content)
+bulk: stooq_bulk.parse_bulk_archive auf fixtures/d_de_txt.zip – muss dieselben Bars liefern
+
+Aufruf: python bench/bench_parse.py [Wiederholungen]
+"""
+
+import io, os, sys, timeit
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import screener, stooq_bulk
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def parse_old(content):
+    df = pd.read_csv(io.StringIO(content.decode("utf-8")))
+    df["Date"] = pd.to_datetime(df["Date"])
+    return df.sort_values("Date").reset_index(drop=True)
+
+
+def payloads():
+    for name in sorted(os.listdir(FIXTURES)):
+        if name.endswith(".csv"):
+            with open(os.path.join(FIXTURES, name), "rb") as f:
+                content = f.read()
+            yield name, content
+
+
+def main(number=300):
+    for name, content in payloads():
+        old = parse_old(content)
+        new = screener.parse_csv(content)
+        pd.testing.assert_frame_equal(old, new, check_dtype=False)
+
+        number = max(10, number // (len(content) // 20000 + 1))
+        t_old = min(timeit.repeat(lambda: parse_old(content), number=number, repeat=3)) / number
+        t_new = min(timeit.repeat(lambda: screener.parse_csv(content), number=number, repeat=3)) / number
+        print(f"  {name:<20} {len(content)/1024:6.1f} KB  {len(new):4d} Bars   "
+              f"alt {t_old*1e6:7.0f}µs   neu {t_new*1e6:7.0f}µs   ×{t_old/t_new:.2f}")
+    bulk_parity()
+
+
+def bulk_parity(archive=os.path.join(FIXTURES, "d_de_txt.zip")):
+    """Bulk-Archiv und Einzel-CSV desselben Symbols ergeben dieselben Bars."""
+    singles = dict(payloads())
+    bulk    = stooq_bulk.parse_bulk_archive(archive, [n[:-4] for n in singles])
+    for name, content in singles.items():
+        pd.testing.assert_frame_equal(bulk[name[:-4]], screener.parse_csv(content), check_dtype=False)
+    t = min(timeit.repeat(lambda: stooq_bulk.parse_bulk_archive(archive, [n[:-4] for n in singles]),
+                          number=10, repeat=3)) / 10
+    print(f"  {os.path.basename(archive):<20} {os.path.getsize(archive)/1024:6.1f} KB  {len(bulk)} Symbole"
+          f"   bulk {t*1e6:7.0f}µs   = Einzel-CSV")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
@@ -0,0 +1,231 @@
+"""
+Pipeline-Benchmark mit synthetischen Universen (100 / 1.000 / 10.000 Ticker)
+Stufen: fetch (FixtureSession statt stooq.com) → fetch_bulk (dasselbe mit Bulk-Archiven für de/uk,
+Rest einzeln) → build_screener → store_write (HistoryStore) → build_incremental (ein neuer Bar aus
+dem Store auf den Indikator-Zustand des Vortags, wie screener.build) → store_cold_build (neuer Prozess: Store öffnen,
+Screener aus den gemappten Arrays) → alerts (ALERT_RULES synthetische Alarm-Regeln) → rows_html →
+Dashboard (static / inline, mit Assets) → precompress (.gz/.br der inline-Ausgabe) → cli_render (`screener.py render` als eigener Prozess aus dem Zwischenstand,
+inklusive Interpreter-Start und Importe)
+Gemessen je Stufe: Wandzeit, Peak-RSS (Hochwassermarke des Prozesses) und Ausgabegröße.
+Jede Universumsgröße läuft in einem eigenen Prozess, damit sich die RSS-Werte nicht überlagern.
+
+Aufruf:
+  python bench/bench_pipeline.py                  # alle Größen, Vergleich mit bench/baseline.json
+  python bench/bench_pipeline.py --sizes 100 1000
+  python bench/bench_pipeline.py --save           # Baseline neu schreiben
+"""
+
+import argparse, contextlib, json, os, platform, resource, subprocess, sys, tempfile, time
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, BENCH_DIR)
+
+BASELINE  = os.path.join(BENCH_DIR, "baseline.json")
+SIZES     = [100, 1000, 10000]
+TOLERANCE = {"wall_s": 1.30, "rss_mb": 1.25, "out_bytes": 1.10}   # erlaubter Faktor gegenüber Baseline
+ALERT_RULES = 200
+MIN_DELTA = {"wall_s": 0.05, "rss_mb": 20.0, "out_bytes": 1024}   # darunter kein Alarm (Messrauschen)
+
+
+def synthetic_universe(n, universe):
+    from instruments import InstrumentMaster
+
+    base = universe.frame.iloc[np.arange(n) % len(universe)]
+    nr   = [f"{i:05d}" for i in range(n)]
+    frame = pd.DataFrame({
+        "ticker":  [f"S{k}.{ex}" for k, ex in zip(nr, base["exchange"])],
+        "name":    [f"{name} #{i}" for i, name in enumerate(base["name"])],
+        "country": base["country"].to_numpy(),
+        "sector":  base["sector"].to_numpy(),
+        "stooq":   [f"s{k}.{st.rsplit('.', 1)[1]}" for k, st in zip(nr, base["stooq"])],
+    })
+    return InstrumentMaster(frame, universe.countries, universe.exchanges, universe.sectors)
+
+
+def synthetic_rules(n, universe, seed=0):
+    """n Alarm-Regeln aus Schwellen auf Tages- und Indikatorspalten, teils auf Sektor/Land eingegrenzt."""
+    rng     = np.random.default_rng(seed)
+    sectors = sorted(universe.frame["sector"].unique())
+    country = sorted(universe.frame["country"].unique())
+    rules   = []
+    for i in range(n):
+        rule = (f"pct_change {rng.choice(['<', '>'])} {rng.integers(-8, 9)} and vol_ratio > {rng.uniform(1, 4):.1f}"
+                f" or rsi_14 {rng.choice(['<', '>'])} {rng.integers(15, 86)} and ret_20d > dist_52w_low")
+        if i % 3 == 0:
+            rule = f"({rule}) in sector {rng.choice(sectors)}"
+        elif i % 3 == 1:
+            rule = f"not ma_trend < 0 and ({rule}) and country in ({', '.join(rng.choice(country, 2))})"
+        rules.append((f"r{i}", rule))
+    return rules
+
+
+def rss_mb():
+    # VmHWM statt ru_maxrss: ru_maxrss übernimmt bei fork+exec die Hochwassermarke des Elternprozesses
+    try:
+        with open("/proc/self/status") as f:
+            return next(int(l.split()[1]) for l in f if l.startswith("VmHWM:")) / 1024
+    except (OSError, StopIteration):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@contextlib.contextmanager
+def stage(results, name):
+    rec = {}
+    t0 = time.perf_counter()
+    yield rec
+    rec["wall_s"] = round(time.perf_counter() - t0, 4)
+    rec["rss_mb"] = round(rss_mb(), 1)
+    results[name] = rec
+
+
+def run_cold(root, n):
+    """Kaltstart: nur den gemappten Store öffnen und daraus rechnen – kein Frame pro Ticker."""
+    import screener
+    from history_store import HistoryStore
+
+    screener.UNIVERSE = synthetic_universe(n, screener.UNIVERSE)
+    results = {}
+    with stage(results, "store_cold_build") as rec:
+        df = screener.build_screener(HistoryStore(root).bars())
+        rec["out_bytes"] = int(df.memory_usage(deep=True).sum())
+    return results
+
+
+def run_size(n, tmp):
+    import screener, shards
+    from run_report import RunMetrics
+    from indicator_state import IndicatorState, BAR_FIELDS
+    from history_store import HistoryStore
+    from fixture_session import FixtureSession
+    from alerts import AlertEngine
+
+    screener.UNIVERSE = synthetic_universe(n, screener.UNIVERSE)
+    results = {}
+    session = FixtureSession()
+    limiter = screener.RateLimiter(rate=1e9, max_rate=1e9, burst=1e9)
+
+    with stage(results, "fetch") as rec, open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+        data = screener.fetch_data(cache_dir="", bulk=False, session=session, limiter=limiter)
+        rec["out_bytes"] = session.bytes
+    bulk_session = FixtureSession()
+    bulk_session.prepare_bulk(screener.UNIVERSE.stooq)
+    with stage(results, "fetch_bulk") as rec, open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+        bulk = screener.fetch_data(cache_dir="", bulk=True, session=bulk_session, limiter=limiter)
+        rec["out_bytes"] = bulk_session.bytes
+    assert bulk.keys() == data.keys(), "Bulk- und Einzelabruf liefern unterschiedliche Ticker"
+    del bulk, bulk_session
+    with stage(results, "build_screener") as rec:
+        df = screener.build_screener(data)
+        rec["out_bytes"] = int(df.memory_usage(deep=True).sum())
+    root = os.path.join(tmp, "history")
+    with stage(results, "store_write") as rec:
+        HistoryStore(root).write(data)
+        rec["out_bytes"] = sum(os.path.getsize(os.path.join(root, f)) for f in os.listdir(root))
+    # Stand des Vortags – wie im Betrieb aus dem Store (float32), sonst baut die Prüfung alles neu auf
+    prev = os.path.join(tmp, "history_prev")
+    HistoryStore(prev).write({t: d.iloc[:-1] for t, d in data.items() if d is not None})
+    state = IndicatorState()
+    state.update_bars(HistoryStore(prev).bars(BAR_FIELDS))
+    with stage(results, "build_incremental") as rec:
+        # wie screener.build: nur die jüngsten Zeilen des Stores, der neue Bar wird eingefaltet
+        inc = screener.screener_frame(state.update_store(HistoryStore(root)))
+        rec["out_bytes"] = int(inc.memory_usage(deep=True).sum())
+    assert state.stats["rebuilt"] == 0, state.stats
+    del data, state, inc
+    results.update(run_child(n, "--cold", root))
+    engine = AlertEngine(synthetic_rules(ALERT_RULES, screener.UNIVERSE))
+    with stage(results, "alerts") as rec:
+        matches = engine.evaluate(df)
+        rec["out_bytes"] = int(matches.memory_usage(deep=True).sum())
+    with stage(results, "rows_html") as rec:
+        rec["out_bytes"] = len(screener.rows_html(df).encode("utf-8"))
+    for mode in ("static", "inline"):
+        with stage(results, f"render_{mode}") as rec:
+            paths = screener.write_dashboard(df, os.path.join(tmp, mode), "18.10.2026", "bench", mode=mode)
+            rec["out_bytes"] = sum(os.path.getsize(p) for p in paths)
+    with stage(results, "precompress") as rec:
+        rec["out_bytes"] = sum(os.path.getsize(p) for p in screener.precompress(os.path.join(tmp, "inline")))
+    shards.write_frame(screener.stage_path("compute", os.path.join(tmp, "stages")), df, RunMetrics().to_dict())
+    with stage(results, "cli_render") as rec:
+        out = os.path.join(tmp, "cli")
+        subprocess.run([sys.executable, os.path.join(BENCH_DIR, "..", "screener.py"), "render",
+                        "--stage-dir", os.path.join(tmp, "stages"), "--out-dir", out],
+                       cwd=tmp, capture_output=True, check=True)
+        rec["out_bytes"] = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(out) for f in files)
+    return results
+
+
+def run_child(n, *args):
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", str(n), *args],
+                          capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run_all(sizes):
+    return {str(n): run_child(n) for n in sizes}
+
+
+def report(results, baseline=None):
+    regressions = []
+    base = (baseline or {}).get("results", {})
+    print(f"{'Ticker':>7}  {'Stufe':<16} {'Zeit':>9} {'RSS':>9} {'Ausgabe':>11}")
+    for size, stages in results.items():
+        for name, rec in stages.items():
+            ref = base.get(size, {}).get(name, {})
+            flags = []
+            for key, factor in TOLERANCE.items():
+                if key in rec and key in ref and rec[key] > ref[key] * factor and rec[key] - ref[key] > MIN_DELTA[key]:
+                    flags.append(f"{key} {ref[key]} → {rec[key]}")
+            regressions += [f"{size}/{name}: {f}" for f in flags]
+            print(f"{size:>7}  {name:<16} {rec['wall_s']:>8.3f}s {rec['rss_mb']:>7.0f}MB "
+                  f"{rec.get('out_bytes', 0)/1024:>9.0f}KB{'  ⚠️' if flags else ''}")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    ap.add_argument("--save", action="store_true", help="Ergebnis als neue Baseline speichern")
+    ap.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    ap.add_argument("--cold", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child and args.cold:
+        print(json.dumps(run_cold(args.cold, args.child)))
+        return 0
+    if args.child:
+        with tempfile.TemporaryDirectory() as tmp:
+            print(json.dumps(run_size(args.child, tmp)))
+        return 0
+
+    results = run_all(args.sizes)
+    baseline = None
+    if os.path.exists(BASELINE) and not args.save:
+        with open(BASELINE, encoding="utf-8") as f:
+            baseline = json.load(f)
+    regressions = report(results, baseline)
+
+    if args.save:
+        with open(BASELINE, "w", encoding="utf-8") as f:
+            json.dump({
+                "python":  platform.python_version(),
+                "pandas":  pd.__version__,
+                "numpy":   np.__version__,
+                "machine": f"{platform.system()} {platform.machine()} · {os.cpu_count()} CPUs",
+                "results": results,
+            }, f, indent=2)
+            f.write("\n")
+        print(f"💾 Baseline gespeichert: {BASELINE}")
+    elif regressions:
+        print("\n⚠️  Regressionen gegenüber Baseline:")
+        for r in regressions:
+            print(f"  {r}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
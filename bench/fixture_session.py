@@ -0,0 +1,96 @@
+"""
+Ersatz für requests.Session, der aufgezeichnete stooq-Antworten abspielt
+Jedes Symbol bekommt deterministisch eine skalierte Variante einer Fixture-CSV;
+der Zeitraum d1..d2 wird relativ zum letzten Bar der Fixture ausgeschnitten,
+damit die Benchmarks unabhängig vom aktuellen Datum laufen.
+Bulk-Archive (stooq_bulk.BULK_URL) werden für die per prepare_bulk angemeldeten Symbole im
+Layout von stooq erzeugt; fixtures/d_de_txt.zip ist ein kleines Beispiel desselben Formats.
+"""
+
+import bisect, io, os, re, zlib
+import pandas as pd
+
+import stooq_bulk
+from datetime import datetime, timedelta
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+VARIANTS = 16
+
+
+class FixtureResponse:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content     = content
+        self.headers     = headers or {}
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def iter_content(self, chunk_size=1 << 20):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _load_rows(fixture):
+    with open(os.path.join(FIXTURES, fixture), "rb") as f:
+        header, *rows = f.read().replace(b"\r\n", b"\n").strip().split(b"\n")
+    return header, rows
+
+
+def _scaled(rows, factor):
+    out = []
+    for row in rows:
+        date, *vals = row.split(b",")
+        px = [f"{float(v) * factor:.2f}".encode() for v in vals[:4]]
+        out.append(b",".join([date, *px, *vals[4:]]))
+    return out
+
+
+class FixtureSession:
+    def __init__(self, fixture="sie.de.csv"):
+        header, rows   = _load_rows(fixture)
+        self.header    = header
+        self.variants  = [_scaled(rows, 0.5 + i / VARIANTS) for i in range(VARIANTS)]
+        self.dates     = [r[:10].decode() for r in rows]
+        self.last      = datetime.strptime(self.dates[-1], "%Y-%m-%d")
+        self.requests  = 0
+        self.bytes     = 0
+        self.archives  = {}         # Markt → ZIP-Bytes
+
+    def prepare_bulk(self, stooq_tickers, level=1):
+        """Archive je Markt vorab bauen (außerhalb der gemessenen Stufe)."""
+        frames = [pd.read_csv(io.BytesIO(self.header + b"\n" + b"\n".join(rows))) for rows in self.variants]
+        for market, symbols in stooq_bulk.group_by_market(stooq_tickers).items():
+            self.archives[market] = stooq_bulk.write_bulk_archive(
+                {s: frames[zlib.crc32(s.encode()) % VARIANTS] for s in symbols}, market, level)
+
+    def csv_for(self, symbol, d1, d2):
+        span  = (datetime.strptime(d2, "%Y%m%d") - datetime.strptime(d1, "%Y%m%d")).days
+        first = (self.last - timedelta(days=span)).strftime("%Y-%m-%d")
+        rows  = self.variants[zlib.crc32(symbol.encode()) % VARIANTS]
+        return self.header + b"\r\n" + b"\r\n".join(rows[bisect.bisect_left(self.dates, first):]) + b"\r\n"
+
+    def get(self, url, params=None, **kwargs):
+        self.requests += 1
+        bulk = re.search(r"d_(\w+)_txt", url)
+        if bulk:
+            body = self.archives.get(bulk.group(1))
+            if body is None:
+                return FixtureResponse(404)
+            self.bytes += len(body)
+            return FixtureResponse(200, body, {"Content-Type": "application/zip"})
+        if not params or "s" not in params:
+            return FixtureResponse(404)
+        body = self.csv_for(params["s"], params["d1"], params["d2"])
+        self.bytes += len(body)
+        return FixtureResponse(200, body, {"Content-Type": "text/csv"})
+
+    def close(self):
+        pass
@@ -0,0 +1,94 @@
+"""
+Checkpoint eines Fetch-Laufs
+Jeder abgeschlossene Ticker wird sofort als JSON-Zeile angehängt (Ergebnis, Fehlerart, HTTP-Status,
+Versuche). Bricht ein Lauf ab, setzt der nächste Lauf desselben Tages dort fort: erfolgreiche Ticker
+kommen aus dem Kurs-Cache, geladen werden nur fehlende und fehlgeschlagene.
+"""
+
+import json, os, threading
+
+
+class FetchCheckpoint:
+    def __init__(self, path, run_key, resume=True):
+        """run_key: Kennung des Laufs (Handelstag) – ein Checkpoint eines anderen Tages gilt nicht."""
+        self.path     = path
+        self.run_key  = run_key
+        self.outcomes = self._read() if resume else {}
+        self.lock     = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # bestehende Datei fortschreiben, sonst mit Kopfzeile neu beginnen
+        fresh   = not self.outcomes
+        if not fresh:
+            self._trim()
+        self.fh = open(path, "w" if fresh else "a", encoding="utf-8")
+        if fresh:
+            self._append({"run": run_key})
+
+    def _read(self):
+        outcomes = {}
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                head = json.loads(fh.readline() or "{}")
+                if head.get("run") != self.run_key:
+                    return {}
+                for line in fh:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue        # abgebrochene letzte Zeile
+                    outcomes[rec.pop("ticker")] = rec
+        except (OSError, ValueError):
+            return {}
+        return outcomes
+
+    def _trim(self):
+        """Abgebrochene letzte Zeile abschneiden – sonst klebt der nächste Eintrag daran und geht verloren."""
+        with open(self.path, "r+b") as fh:
+            data = fh.read()
+            fh.truncate(data.rfind(b"\n") + 1)
+
+    def _append(self, rec):
+        self.fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        self.fh.flush()
+
+    # ── Abfragen ─────────────────────────────────
+    @property
+    def done(self):
+        """Ticker, die in diesem Lauf bereits erfolgreich geladen wurden."""
+        return {t for t, rec in self.outcomes.items() if rec.get("ok")}
+
+    # ── Schreiben ────────────────────────────────
+    def record(self, ticker, ok, **info):
+        rec = {"ok": bool(ok), **{k: v for k, v in info.items() if v is not None}}
+        with self.lock:
+            self.outcomes[ticker] = rec
+            self._append({"ticker": ticker, **rec})
+
+    def close(self, keep=True):
+        """keep=False (alle Ticker geladen): Checkpoint löschen – der nächste Lauf beginnt frisch."""
+        self.fh.close()
+        if not keep and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def selfcheck():
+    """Fortsetzen nach Absturz mitten im Schreiben: kein Eintrag nach der abgebrochenen Zeile geht verloren."""
+    import tempfile
+    path = os.path.join(tempfile.mkdtemp(), "checkpoint.jsonl")
+    ckpt = FetchCheckpoint(path, "2024-01-02")
+    ckpt.record("A", True)
+    ckpt.record("B", False, error="timeout")
+    ckpt.close()
+    with open(path, "r+b") as fh:                    # Absturz mitten in der Zeile von B
+        fh.truncate(os.path.getsize(path) - 12)
+    ckpt = FetchCheckpoint(path, "2024-01-02")
+    ckpt.record("C", True)
+    ckpt.close()
+    resumed = FetchCheckpoint(path, "2024-01-02")
+    resumed.close(keep=False)
+    assert resumed.done == {"A", "C"}, resumed.outcomes
+    print(f"✅ Checkpoint fortgesetzt nach abgebrochener Zeile: {sorted(resumed.outcomes)}")
+
+
+if __name__ == "__main__":
+    selfcheck()
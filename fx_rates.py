@@ -0,0 +1,91 @@
+"""
+Wechselkurse für die Umrechnung nach EUR
+Tagesschlusskurse der Paare EUR/<Währung> von stooq (z.B. eurgbp: GBP je 1 EUR), als lange Tabelle
+date,currency,per_eur auf der Platte. Pro Lauf werden nur Paare geladen, deren letzter Kurs älter
+als der Stichtag ist; ohne Netz wird mit dem jüngsten Kurs aus dem Cache gerechnet.
+Die Umrechnung ist ein Join über die Währungsspalte – ein Faktor pro Währung, nicht pro Zeile.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+BASE     = "EUR"
+SUBUNITS = {"GBp": ("GBP", 100.0), "GBX": ("GBP", 100.0)}    # Kurse in Pence
+FX_DAYS  = 14       # Kalendertage pro Abruf (überbrückt Wochenenden und Feiertage)
+COLUMNS  = ["date", "currency", "per_eur"]
+
+
+def quote_currency(currency):
+    """(ISO-Währung, Teiler) – GBp → (GBP, 100)."""
+    return SUBUNITS.get(currency, (currency, 1.0))
+
+
+def fx_symbol(currency):
+    return f"{BASE}{currency}".lower()
+
+
+class FxRates:
+    def __init__(self, table=None):
+        table = pd.DataFrame(columns=COLUMNS) if table is None else table[COLUMNS]
+        self.table = table.astype({"date": "datetime64[ns]", "currency": str, "per_eur": float})
+        self.used  = {}
+
+    @classmethod
+    def load(cls, path):
+        if not path or not os.path.exists(path):
+            return cls()
+        return cls(pd.read_csv(path, parse_dates=["date"]))
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        self.table.sort_values(COLUMNS[:2]).to_csv(tmp, index=False, date_format="%Y-%m-%d")
+        os.replace(tmp, path)
+
+    # ── Pflege ───────────────────────────────────
+    def add(self, currency, bars):
+        """bars: stooq-Frame (Date, Close) des Paars EUR/currency; vorhandene Tage werden ersetzt."""
+        new = pd.DataFrame({"date": pd.to_datetime(bars["Date"]), "currency": currency,
+                            "per_eur": bars["Close"].to_numpy(dtype=float)})
+        table = pd.concat([self.table, new], ignore_index=True)
+        self.table = table.drop_duplicates(COLUMNS[:2], keep="last").reset_index(drop=True)
+
+    def latest_dates(self):
+        return self.table.groupby("currency")["date"].max()
+
+    def stale(self, currencies, asof):
+        """ISO-Währungen (ohne EUR), für die kein Kurs vom Stichtag oder später vorliegt."""
+        needed = sorted({quote_currency(c)[0] for c in currencies} - {BASE})
+        latest = self.latest_dates()
+        return [c for c in needed if c not in latest.index or latest[c] < pd.Timestamp(asof)]
+
+    # ── Umrechnung ───────────────────────────────
+    def factors(self, currencies, asof=None):
+        """Je Kurswährung: EUR pro Einheit und Datum des verwendeten Kurses (jüngster Kurs ≤ asof)."""
+        table = self.table if asof is None else self.table[self.table["date"] <= pd.Timestamp(asof)]
+        last  = table.sort_values("date").groupby("currency").last()
+        rows  = {}
+        for c in currencies:
+            iso, div = quote_currency(c)
+            if iso == BASE:
+                rows[c] = (1.0 / div, pd.NaT)
+            elif iso in last.index:
+                rows[c] = (1.0 / (last.at[iso, "per_eur"] * div), last.at[iso, "date"])
+            else:
+                rows[c] = (np.nan, pd.NaT)
+        return pd.DataFrame.from_dict(rows, orient="index", columns=["eur", "date"]).rename_axis("currency")
+
+    def to_eur(self, df, asof=None):
+        """Hängt close_eur und turnover_eur (Schlusskurs × Volumen) an; fehlt ein Kurs, bleiben sie NaN."""
+        f = self.factors(df["currency"].unique(), asof)
+        self.used = {c: {"eur": float(f"{r.eur:.8g}") if pd.notna(r.eur) else None,
+                         "date": None if pd.isna(r.date) else f"{r.date:%Y-%m-%d}"} for c, r in f.iterrows()}
+        return apply_eur(df, f["eur"])
+
+
+def apply_eur(df, eur):
+    """eur: Kurswährung → EUR je Einheit (FxRates.factors()["eur"] oder der Stand eines früheren Laufs)."""
+    factor = eur.reindex(df["currency"]).to_numpy(dtype=float)
+    close  = df["close"].to_numpy(dtype=float) * factor
+    return df.assign(close_eur=close.round(4), turnover_eur=(close * df["volume"].to_numpy(dtype=float)).round(0))
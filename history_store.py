@@ -0,0 +1,226 @@
+"""
+Spaltenorientierter Kursspeicher (Datum × Ticker), memory-mapped
+Eine Datei pro Feld: Open/High/Low/Close als float32, Volume als int64 – Zeile = Handelstag,
+Spalte = Ticker. Lesen liefert Views direkt auf die gemappten Dateien; geladen wird nur,
+was tatsächlich angefasst wird (typischerweise die letzten ~275 Zeilen).
+Neue Tage werden angehängt (Dateien wachsen in Blöcken), neue Ticker erzwingen ein Neuschreiben.
+Beim Neuschreiben fallen Tage vor den letzten RETAIN_ROWS Zeilen weg; spätestens nach
+GROW_ROWS angehängten Tagen darüber wird neu geschrieben, damit der Speicher nicht endlos wächst.
+"""
+
+import json, os
+import numpy as np
+import pandas as pd
+
+from indicators import BarPanel, WEEKS_52, SMA_SLOW
+
+FIELDS    = {"Open": np.float32, "High": np.float32, "Low": np.float32, "Close": np.float32, "Volume": np.int64}
+VOLUME_NA = np.iinfo(np.int64).min      # int64 kennt kein NaN
+GROW_ROWS = 64                          # Reserve beim Anhängen neuer Tage
+VERSION   = 1
+# Aufbewahrung: 52-Wochen-Fenster plus Vorlauf für SMA200 (0 = alles behalten)
+RETAIN_ROWS = int(os.environ.get("SCREENER_STORE_ROWS", WEEKS_52 + SMA_SLOW))
+
+
+def _missing(field):
+    return VOLUME_NA if FIELDS[field] is np.int64 else np.nan
+
+
+def _as_float(field, values):
+    """View/Kopie als float64 mit NaN für fehlende Werte."""
+    out = np.asarray(values, dtype=float)
+    if FIELDS[field] is np.int64:
+        out[np.asarray(values) == VOLUME_NA] = np.nan
+    return out
+
+
+class HistoryStore:
+    def __init__(self, root):
+        self.root = root
+        self.tickers  = pd.Index([], name="ticker")
+        self.dates    = np.array([], dtype="datetime64[D]")
+        self.capacity = 0
+        self.maps     = {}
+        meta = self._read_meta()
+        if meta and meta.get("version") == VERSION and not meta.get("dirty"):
+            self.tickers  = pd.Index(meta["tickers"], name="ticker")
+            self.dates    = np.load(self._path("dates.npy"))
+            self.capacity = meta["capacity"]
+        self._map("r")
+
+    # ── Dateien ──────────────────────────────────
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def _file(self, field):
+        dt = np.dtype(FIELDS[field])
+        return self._path(f"{field.lower()}.{dt.kind}{dt.itemsize * 8}")
+
+    def _read_meta(self):
+        try:
+            with open(self._path("meta.json"), encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, dirty):
+        np.save(self._path("dates.npy"), self.dates)
+        tmp = self._path("meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"version": VERSION, "dirty": dirty, "capacity": self.capacity,
+                       "rows": len(self.dates), "tickers": list(self.tickers)}, fh)
+        os.replace(tmp, self._path("meta.json"))
+
+    def _map(self, mode):
+        shape = (self.capacity, len(self.tickers))
+        self.maps = {f: np.memmap(self._file(f), dtype=dt, mode=mode, shape=shape) if shape[0] and shape[1] else
+                     np.empty(shape, dtype=dt) for f, dt in FIELDS.items()}
+
+    def __len__(self):
+        return len(self.dates)
+
+    # ── Lesen ────────────────────────────────────
+    def view(self, field, start=None):
+        """Zero-copy View (Datum × Ticker) ab `start` – Werte im Speicherformat."""
+        r0 = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start), "D")))
+        return self.maps[field][r0:len(self.dates)]
+
+    def present(self, start=None):
+        """Maske (Datum × Ticker): an diesem Tag existiert ein Bar."""
+        mask = ~np.isnan(self.view("Close", start))
+        for f in ("Open", "High", "Low"):
+            mask |= ~np.isnan(self.view(f, start))
+        return mask | (self.view("Volume", start) != VOLUME_NA)
+
+    def last_dates(self):
+        """Letzter gespeicherter Tag je Ticker."""
+        mask = self.present()
+        has  = mask.any(axis=0)
+        last = len(mask) - 1 - np.argmax(mask[::-1], axis=0) if len(mask) else np.zeros(len(self.tickers), int)
+        return {t: pd.Timestamp(self.dates[r]) for t, r, h in zip(self.tickers, last, has) if h}
+
+    def _columns(self, tickers):
+        if tickers is None:
+            return np.arange(len(self.tickers)), self.tickers
+        cols = self.tickers.get_indexer(list(tickers))
+        cols = cols[cols >= 0]
+        return cols, self.tickers[cols]
+
+    def bars(self, fields=("High", "Low", "Close", "Volume"), start=None, tickers=None):
+        """BarPanel (rechtsbündig, Zeile -1 = letzter Bar) aus den Zeilen ab `start`.
+        Gelesen wird nur dieses Fenster; die Umsortierung nach Bars ist die einzige Kopie.
+        Feld "Date" liefert das Datum jedes Bars (NaT als Auffüllung)."""
+        cols, names = self._columns(tickers)
+        mask   = self.present(start)[:, cols]
+        sizes  = mask.sum(axis=0)
+        depth  = max(int(sizes.max(initial=0)), 1)
+        rows, c = np.nonzero(mask)
+        lag    = np.cumsum(mask[::-1], axis=0)[::-1][rows, c] - 1 if len(rows) else rows
+        out = {}
+        for f in fields:
+            if f == "Date":
+                m = np.full((depth, len(cols)), np.datetime64("NaT"), dtype="datetime64[D]")
+                m[depth - 1 - lag, c] = self.dates[len(self.dates) - len(mask):][rows]
+            else:
+                m = np.full((depth, len(cols)), np.nan)
+                m[depth - 1 - lag, c] = _as_float(f, self.view(f, start)[rows, cols[c]])
+            out[f] = m
+        return BarPanel(out, names, pd.Series(sizes, index=names))
+
+    def frames(self, start=None, tickers=None):
+        """Historie je Ticker als {"Date": ..., Feld: ...} aus NumPy-Arrays – gleiche Form wie
+        ticker_data, aber ohne einen DataFrame pro Ticker aufzubauen."""
+        cols, names = self._columns(tickers)
+        mask  = self.present(start)[:, cols]
+        dates = self.dates[len(self.dates) - len(mask):]
+        block = {f: self.view(f, start)[:, cols] for f in FIELDS}
+        out   = {}
+        for j, t in enumerate(names):
+            sel = mask[:, j]
+            if sel.any():
+                out[t] = {"Date": dates[sel], **{f: _as_float(f, block[f][sel, j]) for f in FIELDS}}
+        return out
+
+    # ── Schreiben ────────────────────────────────
+    def write(self, ticker_data):
+        """Übernimmt die Frames in den Speicher. Im Zeitraum jedes Frames ersetzt es die
+        gespeicherten Bars des Tickers vollständig (wie PriceCache.store)."""
+        frames = {t: df for t, df in ticker_data.items() if df is not None and len(df)}
+        if not frames:
+            return 0
+        dates = {t: df["Date"].to_numpy(dtype="datetime64[D]") for t, df in frames.items()}
+        new_t = [t for t in frames if t not in self.tickers]
+        new_d = np.setdiff1d(np.concatenate(list(dates.values())), self.dates)
+        if RETAIN_ROWS and len(new_d):      # Tage vor dem Aufbewahrungsfenster gar nicht erst aufnehmen
+            window = np.union1d(self.dates, new_d)[-RETAIN_ROWS:]
+            new_d  = new_d[new_d >= window[0]]
+        if (new_t or (len(new_d) and len(self.dates) and new_d.min() < self.dates[-1])
+                or (RETAIN_ROWS and len(self.dates) + len(new_d) > RETAIN_ROWS + GROW_ROWS)):
+            self._rewrite(self.tickers.append(pd.Index(new_t)), np.union1d(self.dates, new_d))
+        elif len(new_d):
+            self._append(new_d)
+        else:
+            self._map("r+")
+
+        self._write_meta(dirty=True)
+        cols = self.tickers.get_indexer(list(frames))
+        for col, (t, df) in zip(cols, frames.items()):
+            sel  = dates[t] >= self.dates[0]
+            rows = np.searchsorted(self.dates, dates[t][sel])
+            if not len(rows):
+                continue
+            for f, dt in FIELDS.items():
+                m = self.maps[f]
+                m[rows[0]:rows[-1] + 1, col] = _missing(f)
+                if f in df.columns:
+                    v = df[f].to_numpy(dtype=float)[sel]
+                    if dt is np.int64:
+                        v = np.where(np.isnan(v), VOLUME_NA, np.round(v)).astype(np.int64)
+                    m[rows, col] = v
+        for m in self.maps.values():
+            if isinstance(m, np.memmap):
+                m.flush()
+        self._write_meta(dirty=False)
+        self._map("r")
+        return len(frames)
+
+    def _append(self, new_dates):
+        rows = len(self.dates) + len(new_dates)
+        if rows > self.capacity:
+            self._resize(rows + GROW_ROWS)
+        self._map("r+")
+        for f in FIELDS:
+            self.maps[f][len(self.dates):rows] = _missing(f)
+        self.dates = np.concatenate([self.dates, new_dates])
+
+    def _resize(self, capacity):
+        # Zeilenweise Ablage: Wachsen heißt nur die Dateien verlängern
+        row_bytes = {f: len(self.tickers) * np.dtype(dt).itemsize for f, dt in FIELDS.items()}
+        self.maps = {}
+        for f in FIELDS:
+            with open(self._file(f), "r+b") as fh:
+                fh.truncate(capacity * row_bytes[f])
+        self.capacity = capacity
+
+    def _rewrite(self, tickers, dates):
+        """Neue Ticker, Tage vor dem letzten Stand oder zu viele Zeilen: alle Dateien in neuer Form
+        schreiben – dabei nur die letzten RETAIN_ROWS Tage übernehmen."""
+        os.makedirs(self.root, exist_ok=True)
+        if RETAIN_ROWS:
+            dates = dates[-RETAIN_ROWS:]
+        kept     = np.flatnonzero(self.dates >= dates[0]) if len(dates) else np.arange(0)
+        old_rows = np.searchsorted(dates, self.dates[kept])
+        old_cols = len(self.tickers)
+        capacity = len(dates) + GROW_ROWS
+        for f, dt in FIELDS.items():
+            tmp = self._file(f) + ".tmp"
+            m = np.memmap(tmp, dtype=dt, mode="w+", shape=(capacity, len(tickers)))
+            m[:] = _missing(f)
+            if old_cols and len(kept):
+                m[old_rows, :old_cols] = self.maps[f][kept]
+            m.flush()
+            del m
+            os.replace(tmp, self._file(f))
+        self.tickers, self.dates, self.capacity = pd.Index(tickers, name="ticker"), dates, capacity
+        self._write_meta(dirty=True)
+        self._map("r+")
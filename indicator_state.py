@@ -0,0 +1,345 @@
+"""
+Inkrementeller Indikator-Zustand pro Ticker
+Statt jeden Abend alle Fenster neu zu rechnen, wird pro Ticker ein kleiner Zustand
+gespeichert (Ringpuffer der letzten Bars, laufende Summen, Wilder-EMAs, rollierende
+Hochs/Tiefs). Jeder neue EOD-Bar wird mit O(1) Arbeit pro Ticker eingefaltet –
+vektorisiert über alle Ticker, die an diesem Schritt einen neuen Bar haben.
+"""
+
+import os
+import warnings
+import numpy as np
+import pandas as pd
+
+from indicators import BarPanel, RETURN_HORIZONS, WEEKS_52, ATR_WINDOW, RSI_WINDOW, SMA_FAST, SMA_SLOW, INDICATOR_COLUMNS
+
+STATE_VERSION = 1
+CHECK_BARS    = 5       # so viele bereits eingefaltete Bars werden gegen die Historie geprüft (Cache-Korrekturen)
+VOL_WINDOW    = 20      # Volumenschnitt ohne den aktuellen Bar
+BASE_COLUMNS  = ["today_close", "prev_close", "today_volume", "avg_vol_20"]
+BAR_FIELDS    = ("Date", "Close", "High", "Low", "Volume")     # Felder für update_bars
+RECENT_ROWS   = 2 * CHECK_BARS  # update_store: Zeilen vor dem jüngsten Stand (Feiertage einzelner Börsen)
+
+# Ringpuffer-Tiefen: Schlusskurse für Renditen und das Fenster des Vortags-SMA200
+RING_CLOSE  = max(max(RETURN_HORIZONS), SMA_SLOW) + 1
+RING_HL     = WEEKS_52
+RING_VOLUME = VOL_WINDOW + 1
+PARAMS      = np.array([STATE_VERSION, *RETURN_HORIZONS, WEEKS_52, ATR_WINDOW, RSI_WINDOW, SMA_FAST, SMA_SLOW])
+
+_RINGS   = {"close": RING_CLOSE, "high": RING_HL, "low": RING_HL, "volume": RING_VOLUME}
+_SCALARS = ["atr", "gain", "loss", "hmax", "lmin",
+            "sum_fast", "sum_slow", "sum_vol", "cnt_fast", "cnt_slow", "cnt_vol"]
+_COUNTS  = ["n", "seen_atr", "seen_rsi", "age_hmax", "age_lmin"]
+_WILDER  = {"atr": ATR_WINDOW, "gain": RSI_WINDOW, "loss": RSI_WINDOW}
+
+
+def _nz(x):
+    return np.where(np.isnan(x), 0.0, x)
+
+
+def _valid(x):
+    return (~np.isnan(x)).astype(float)
+
+
+class IndicatorState:
+    def __init__(self, tickers=()):
+        self.tickers   = pd.Index(list(tickers), name="ticker")
+        size           = len(self.tickers)
+        self.rings     = {k: np.full((depth, size), np.nan) for k, depth in _RINGS.items()}
+        self.vals      = {k: np.full(size, np.nan) for k in _SCALARS}
+        self.counts    = {k: np.zeros(size, dtype=np.int64) for k in _COUNTS}
+        self.last_date = np.full(size, np.datetime64("NaT"), dtype="datetime64[D]")
+        self.stats     = {}
+
+    # ── Persistenz ───────────────────────────────
+    @classmethod
+    def load(cls, path):
+        """Leerer Zustand, wenn die Datei fehlt oder mit anderen Fenstern geschrieben wurde."""
+        if not path or not os.path.exists(path):
+            return cls()
+        with np.load(path, allow_pickle=False) as z:
+            if not np.array_equal(z["params"], PARAMS):
+                return cls()
+            state = cls(z["tickers"].tolist())
+            state.rings     = {k: z[f"ring_{k}"] for k in _RINGS}
+            state.vals      = {k: z[k] for k in _SCALARS}
+            state.counts    = {k: z[k] for k in _COUNTS}
+            state.last_date = z["last_date"]
+        return state
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as fh:
+            np.savez(fh, params=PARAMS, tickers=np.array(self.tickers, dtype=str), last_date=self.last_date,
+                     **{f"ring_{k}": v for k, v in self.rings.items()}, **self.vals, **self.counts)
+        os.replace(tmp, path)
+        return path
+
+    # ── Verwaltung ───────────────────────────────
+    def _columns(self, tickers):
+        """Spaltenindex je Ticker; unbekannte Ticker bekommen eine leere Spalte."""
+        new = [t for t in dict.fromkeys(tickers) if t not in self.tickers]
+        if new:
+            grown = IndicatorState(new)
+            self.tickers   = self.tickers.append(grown.tickers)
+            self.rings     = {k: np.hstack([v, grown.rings[k]]) for k, v in self.rings.items()}
+            self.vals      = {k: np.concatenate([v, grown.vals[k]]) for k, v in self.vals.items()}
+            self.counts    = {k: np.concatenate([v, grown.counts[k]]) for k, v in self.counts.items()}
+            self.last_date = np.concatenate([self.last_date, grown.last_date])
+        return self.tickers.get_indexer(list(tickers))
+
+    def _reset(self, idx):
+        for ring in self.rings.values():
+            ring[:, idx] = np.nan
+        for v in self.vals.values():
+            v[idx] = np.nan
+        for k in ("sum_fast", "sum_slow", "sum_vol", "cnt_fast", "cnt_slow", "cnt_vol"):
+            self.vals[k][idx] = 0.0
+        for c in self.counts.values():
+            c[idx] = 0
+        self.last_date[idx] = np.datetime64("NaT")
+
+    def _lag(self, name, idx, k):
+        """Wert k Bars vor dem letzten eingefalteten Bar – NaN, wenn es ihn nicht gibt."""
+        n    = self.counts["n"][idx]
+        ring = self.rings[name]
+        pos  = n - 1 - k
+        out  = ring[pos % ring.shape[0], idx]
+        return np.where(pos >= 0, out, np.nan)
+
+    # ── Einfalten ────────────────────────────────
+    def _wilder(self, name, idx, x):
+        valid = ~np.isnan(x)
+        state = self.vals[name][idx]
+        state = np.where(valid & np.isnan(state), x, state)
+        self.vals[name][idx] = np.where(valid, state + (x - state) / _WILDER[name], state)
+        return valid
+
+    def _roll(self, total, count, idx, new, old):
+        self.vals[total][idx] += _nz(new) - _nz(old)
+        self.vals[count][idx] += _valid(new) - _valid(old)
+
+    def _extreme(self, name, ring, age, idx, x, sign):
+        """Rollierendes Max (sign=1) bzw. Min (sign=-1) über RING_HL Bars: neuer Rekord → Alter 0;
+        fällt das Extrem aus dem Fenster, wird nur für diese Ticker der Ringpuffer neu durchsucht."""
+        cur  = self.vals[name][idx]
+        take = np.isnan(cur) | (sign * x >= sign * cur)
+        self.vals[name][idx]  = np.where(take, x, cur)
+        self.counts[age][idx] = np.where(take, 0, self.counts[age][idx] + 1)
+
+        expired = idx[self.counts[age][idx] >= RING_HL]
+        if len(expired):
+            pos    = self.counts["n"][expired] - 1 - np.arange(RING_HL)[:, None]     # Zeile = Lag
+            window = np.where(pos >= 0, self.rings[ring][pos % RING_HL, expired], np.nan)
+            pick   = np.argmax(np.where(np.isnan(window), -np.inf, sign * window), axis=0)
+            best   = window[pick, np.arange(len(expired))]
+            self.vals[name][expired]  = best
+            self.counts[age][expired] = np.where(np.isnan(best), 0, pick)
+
+    def _push(self, idx, date, c, h, l, v):
+        h    = np.where(np.isnan(h), c, h)
+        l    = np.where(np.isnan(l), c, l)
+        prev = self._lag("close", idx, 0)
+
+        tr = np.fmax(h - l, np.fmax(np.abs(h - prev), np.abs(l - prev)))
+        self.counts["seen_atr"][idx] += self._wilder("atr", idx, tr)
+        delta = c - prev
+        gain  = np.where(delta > 0, delta, np.where(np.isnan(delta), np.nan, 0.0))
+        loss  = np.where(delta < 0, -delta, np.where(np.isnan(delta), np.nan, 0.0))
+        self._wilder("gain", idx, gain)
+        self.counts["seen_rsi"][idx] += self._wilder("loss", idx, loss)
+
+        # Werte, die das jeweilige Fenster verlassen (vor dem Schreiben in den Ring lesen)
+        self._roll("sum_fast", "cnt_fast", idx, c, self._lag("close", idx, SMA_FAST - 1))
+        self._roll("sum_slow", "cnt_slow", idx, c, self._lag("close", idx, SMA_SLOW - 1))
+        self._roll("sum_vol", "cnt_vol", idx, v, self._lag("volume", idx, VOL_WINDOW))
+
+        n = self.counts["n"][idx]
+        for name, x in (("close", c), ("high", h), ("low", l), ("volume", v)):
+            ring = self.rings[name]
+            ring[n % ring.shape[0], idx] = x
+        self.counts["n"][idx] = n + 1
+        self.last_date[idx]   = date
+
+        self._extreme("hmax", "high", "age_hmax", idx, h, 1)
+        self._extreme("lmin", "low", "age_lmin", idx, l, -1)
+
+    def _fold(self, idx, bars):
+        """bars: (Datum, Close, High, Low, Volume) je Ticker. Schritt i faltet den i-ten neuen Bar
+        aller Ticker ein, die so viele neue Bars haben – im Tagesbetrieb genau ein Schritt."""
+        sizes = np.array([len(b[0]) for b in bars], dtype=np.int64)
+        if not sizes.sum():
+            return
+        cols = np.repeat(np.arange(len(bars)), sizes)
+        rows = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        mats = []
+        for f in range(5):
+            flat = np.concatenate([b[f] for b in bars])
+            m = np.zeros((sizes.max(), len(bars)), dtype=flat.dtype)
+            m[rows, cols] = flat
+            mats.append(m)
+        for step in range(sizes.max()):
+            has = np.flatnonzero(sizes > step)
+            self._push(idx[has], *(m[step, has] for m in mats))
+
+    def update(self, ticker_data):
+        """ticker_data: je Ticker ein DataFrame oder Mapping von Spalte → Array (HistoryStore.frames).
+        Faltet alle Bars nach dem gespeicherten Stand ein. Ticker ohne Zustand oder mit
+        geänderter Historie (Korrekturen im Cache-Überlappungsfenster) werden komplett neu aufgebaut."""
+        items = [(t, df) for t, df in ticker_data.items() if df is not None and len(df)]
+        idx   = self._columns([t for t, _ in items])
+        fresh, delta = [], []
+        for col, (t, df) in zip(idx, items):
+            dates = np.asarray(df["Date"], dtype="datetime64[D]")
+            close = np.asarray(df["Close"], dtype=float)
+            n, last = self.counts["n"][col], self.last_date[col]
+            k = int(np.searchsorted(dates, last, side="right")) if n else 0
+            m = min(CHECK_BARS, n)
+            known = close[k - m:k] if k >= m else None
+            if n and (k == 0 or dates[k - 1] != last or known is None
+                      or not np.array_equal(known, self.rings["close"][(n - m + np.arange(m)) % RING_CLOSE, col],
+                                            equal_nan=True)):
+                k = 0
+            if k == 0:
+                fresh.append(col)
+            cols = [np.asarray(df[f], dtype=float)[k:] if f in df else np.full(len(dates) - k, np.nan)
+                    for f in ("Close", "High", "Low", "Volume")]
+            delta.append((dates[k:], *cols))
+
+        fresh = np.array(fresh, dtype=np.int64)
+        self._reset(fresh)
+        self._fold(idx, delta)
+        self.stats = {"tickers": len(items), "rebuilt": len(fresh),
+                      "bars": int(sum(len(d[0]) for d in delta))}
+        return self.snapshot([t for t, _ in items])
+
+    def _delta(self, bars):
+        """Je Panel-Spalte mit Bars: Zustandsspalte, Anzahl neuer Bars (nach dem gespeicherten Stand)
+        und ob die letzten CHECK_BARS eingefalteten Schlusskurse mit dem Panel übereinstimmen."""
+        cols  = np.flatnonzero(np.asarray(bars.sizes) > 0)     # Spalten im Panel (ohne Kopie)
+        idx   = self._columns(bars.tickers[cols])
+        dates = bars["Date"]
+        depth = dates.shape[0]
+        n, last = self.counts["n"][idx], self.last_date[idx]
+        new = (dates[:, cols] > last).sum(axis=0)
+        pos = depth - 1 - new
+        ok  = (n > 0) & (pos >= 0) & (dates[np.maximum(pos, 0), cols] == last)
+        for i in range(CHECK_BARS):
+            check = ok & (i < n)
+            row   = pos - i
+            seen  = self.rings["close"][(n - 1 - i) % RING_CLOSE, idx]
+            have  = np.where(row >= 0, bars["Close"][np.maximum(row, 0), cols], np.inf)
+            ok   &= ~check | (have == seen) | (np.isnan(have) & np.isnan(seen))
+        return cols, idx, new, ok
+
+    def update_bars(self, bars):
+        """Wie update, aber direkt aus einem BarPanel mit BAR_FIELDS (HistoryStore.bars): neue Bars,
+        Prüfung der bekannten Bars und das Einfalten laufen als Matrix-Operationen über alle
+        Ticker statt in einer Schleife je Ticker."""
+        cols, idx, new, ok = self._delta(bars)
+        fresh = np.flatnonzero(~ok)
+        new[fresh] = np.asarray(bars.sizes)[cols[fresh]]
+        self._reset(idx[fresh])
+
+        depth = bars.depth
+        for step in range(int(new.max(initial=0))):
+            has  = np.flatnonzero(new > step)
+            rows = depth - new[has] + step
+            self._push(idx[has], bars["Date"][rows, cols[has]],
+                       *(np.asarray(bars[f][rows, cols[has]], dtype=float) for f in BAR_FIELDS[1:]))
+        self.stats = {"tickers": len(idx), "rebuilt": len(fresh), "bars": int(new.sum())}
+        return self.snapshot(bars.tickers[cols])
+
+    def update_store(self, store, start=None, tickers=None):
+        """Wie update_bars mit store.bars(BAR_FIELDS, start, tickers), liest aber zuerst nur die
+        jüngsten Zeilen: Ticker, deren gespeicherter Stand darin liegt (Tagesbetrieb), brauchen
+        das Fenster ab `start` nicht. Nur neue oder abweichende Ticker werden voll gelesen."""
+        tickers = store.tickers if tickers is None else pd.Index(tickers)
+        known   = self.tickers.get_indexer(tickers)
+        known   = self.last_date[known[known >= 0]]
+        known   = known[~np.isnat(known)]
+        r0 = int(np.searchsorted(store.dates, known.max())) - RECENT_ROWS if len(known) else 0
+        if start is not None:
+            r0 = max(r0, int(np.searchsorted(store.dates, np.datetime64(pd.Timestamp(start), "D"))))
+        if r0 <= 0 or r0 >= len(store.dates):
+            return self.update_bars(store.bars(BAR_FIELDS, start, tickers))
+
+        recent = store.bars(BAR_FIELDS, store.dates[r0], tickers)
+        cols, idx, new, ok = self._delta(recent)
+        keep = recent.tickers[cols[ok]]
+        snap = [self.update_bars(BarPanel({f: recent[f][:, cols[ok]] for f in BAR_FIELDS},
+                                          keep, recent.sizes.iloc[cols[ok]]))]
+        stats = self.stats
+        rest  = tickers.difference(keep, sort=False)
+        if len(rest):
+            snap.append(self.update_bars(store.bars(BAR_FIELDS, start, rest)))
+            stats = {k: stats[k] + self.stats[k] for k in stats}
+        self.stats = stats
+        return pd.concat(snap)
+
+    # ── Auswertung ───────────────────────────────
+    def asof(self, tickers):
+        """Jüngster eingefaltete Handelstag über die Ticker (Stichtag des Laufs)."""
+        last = self.last_date[self.tickers.get_indexer(tickers)]
+        last = last[~np.isnat(last)]
+        return pd.Timestamp(last.max()) if len(last) else None
+
+    def snapshot(self, tickers=None):
+        """Kennzahlen des letzten Bars je Ticker: BASE_COLUMNS + INDICATOR_COLUMNS."""
+        tickers = self.tickers if tickers is None else pd.Index(tickers, name="ticker")
+        idx     = self.tickers.get_indexer(tickers)
+        n       = self.counts["n"][idx]
+        val     = {k: v[idx] for k, v in self.vals.items()}
+        close   = self._lag("close", idx, 0)
+        vol_now = self._lag("volume", idx, 0)
+        out     = {}
+
+        with warnings.catch_warnings(), np.errstate(divide="ignore", invalid="ignore"):
+            warnings.simplefilter("ignore", RuntimeWarning)
+            out["today_close"]  = close
+            out["prev_close"]   = self._lag("close", idx, 1)
+            out["today_volume"] = vol_now
+            # ab 21 Bars: Schnitt der 20 Vortage, sonst aller vorhandenen Bars inkl. heute
+            long_avg  = (val["sum_vol"] - _nz(vol_now)) / (val["cnt_vol"] - _valid(vol_now))
+            out["avg_vol_20"] = np.where(n > VOL_WINDOW, long_avg, val["sum_vol"] / val["cnt_vol"])
+
+            for h in RETURN_HORIZONS:
+                out[f"ret_{h}d"] = (close / self._lag("close", idx, h) - 1) * 100
+            out["dist_52w_high"] = (close / val["hmax"] - 1) * 100
+            out["dist_52w_low"]  = (close / val["lmin"] - 1) * 100
+            atr = np.where(self.counts["seen_atr"][idx] >= ATR_WINDOW, val["atr"], np.nan)
+            out["atr_pct"] = atr / close * 100
+            rs_ok = self.counts["seen_rsi"][idx] >= RSI_WINDOW
+            out["rsi_14"] = np.where(rs_ok, 100 - 100 / (1 + val["gain"] / val["loss"]), np.nan)
+
+            def sma(total, count, window, drop=None, add=None):
+                s, c = val[total], val[count]
+                if drop is not None:        # Fenster einen Bar früher
+                    s, c = s - _nz(drop) + _nz(add), c - _valid(drop) + _valid(add)
+                return np.where(c == window, s / window, np.nan)
+
+            c_fast, c_slow = self._lag("close", idx, SMA_FAST), self._lag("close", idx, SMA_SLOW)
+            trend_now  = np.sign(sma("sum_fast", "cnt_fast", SMA_FAST) - sma("sum_slow", "cnt_slow", SMA_SLOW))
+            trend_prev = np.sign(sma("sum_fast", "cnt_fast", SMA_FAST, close, c_fast)
+                                 - sma("sum_slow", "cnt_slow", SMA_SLOW, close, c_slow))
+            out["ma_trend"] = trend_now
+            out["ma_cross"] = np.nan_to_num((trend_now - trend_prev) / 2)
+
+        res = pd.DataFrame(out, index=tickers)[BASE_COLUMNS + INDICATOR_COLUMNS]
+        return res.replace([np.inf, -np.inf], np.nan)
+
+
+def compare(incremental, full, rtol=1e-6, atol=1e-9):
+    """Abweichungen zwischen inkrementellem und vollständig neu gerechnetem Ergebnis
+    (lange Form: ticker, column, incremental, full). Leer = alles stimmt."""
+    full = full.reindex(index=incremental.index, columns=incremental.columns)
+    a, b = incremental.to_numpy(dtype=float), full.to_numpy(dtype=float)
+    bad  = ~(np.isclose(a, b, rtol=rtol, atol=atol) | (np.isnan(a) & np.isnan(b)))
+    rows, cols = np.nonzero(bad)
+    return pd.DataFrame({
+        "ticker":      incremental.index[rows],
+        "column":      incremental.columns[cols],
+        "incremental": a[rows, cols],
+        "full":        b[rows, cols],
+    })
@@ -0,0 +1,137 @@
+"""
+Technische Indikatoren über das gesamte Ticker-Panel
+Alle Kennzahlen werden auf einer (Bar × Ticker)-Matrix berechnet – jede Operation
+läuft über alle Ticker gleichzeitig, es gibt keine Schleife pro Ticker.
+"""
+
+import warnings
+import numpy as np
+import pandas as pd
+
+RETURN_HORIZONS = (5, 20, 60, 250)   # Handelstage
+WEEKS_52        = 250
+ATR_WINDOW      = 14
+RSI_WINDOW      = 14
+SMA_FAST        = 50
+SMA_SLOW        = 200
+
+INDICATOR_COLUMNS = [f"ret_{n}d" for n in RETURN_HORIZONS] + [
+    "dist_52w_high", "dist_52w_low", "atr_pct", "rsi_14", "ma_trend", "ma_cross",
+]
+
+
+class BarPanel:
+    """Historie jedes Tickers rechtsbündig nach Bars ausgerichtet: Zeile -1 = letzter Bar,
+    -2 = Vortag, ... Börsenfeiertage erzeugen so keine Lücken in den Fenstern.
+    fields: {Feld: ndarray (depth × Ticker)}, sizes: Anzahl Bars pro Ticker."""
+
+    def __init__(self, fields, tickers, sizes):
+        self.fields  = fields
+        self.tickers = tickers
+        self.sizes   = sizes
+
+    def __getitem__(self, field):
+        return self.fields[field]
+
+    @property
+    def depth(self):
+        return next(iter(self.fields.values())).shape[0]
+
+    def frame(self, field):
+        return pd.DataFrame(self.fields[field], index=pd.RangeIndex(-self.depth, 0, name="bar"),
+                            columns=self.tickers)
+
+
+def bar_panel(panel, fields=("Open", "High", "Low", "Close", "Volume"), depth=None):
+    """panel: langer Frame mit MultiIndex (ticker, Date), z.B. aus screener.build_panel."""
+    codes  = panel.index.codes[0]
+    dcodes = panel.index.codes[1]
+    order  = None
+    same   = codes[1:] == codes[:-1]
+    if not (np.all(codes[1:] >= codes[:-1]) and np.all(dcodes[1:][same] > dcodes[:-1][same])):
+        order = np.lexsort((dcodes, codes))
+        codes = codes[order]
+
+    counts  = np.bincount(codes, minlength=len(panel.index.levels[0]))
+    used    = np.flatnonzero(counts)
+    col_of  = np.full(len(counts), -1)
+    col_of[used] = np.arange(len(used))
+    lag     = np.cumsum(counts)[codes] - 1 - np.arange(len(codes))
+    depth   = int(depth or (counts.max() if len(codes) else 1))
+    keep    = lag < depth
+    rows, cols = depth - 1 - lag[keep], col_of[codes[keep]]
+
+    out = {}
+    for field in fields:
+        values = panel[field].to_numpy(dtype=float)
+        if order is not None:
+            values = values[order]
+        m = np.full((depth, len(used)), np.nan)
+        m[rows, cols] = values[keep]
+        out[field] = m
+    tickers = pd.Index(panel.index.levels[0][used], name="ticker")
+    return BarPanel(out, tickers, pd.Series(counts[used], index=tickers))
+
+
+def wilder(x, window):
+    """Wilder-Glättung (EMA mit alpha = 1/window) zeilenweise über alle Spalten.
+    Startet am ersten gültigen Wert je Spalte; NaN erst nach `window` Beobachtungen."""
+    alpha = 1.0 / window
+    state = np.full(x.shape[1], np.nan)
+    seen  = np.zeros(x.shape[1], dtype=np.int64)
+    out   = np.empty_like(x)
+    for i in range(x.shape[0]):
+        row   = x[i]
+        valid = ~np.isnan(row)
+        state = np.where(valid & np.isnan(state), row, state)
+        state = np.where(valid, state + alpha * (row - state), state)
+        seen += valid
+        out[i] = np.where(seen >= window, state, np.nan)
+    return out
+
+
+def _window_mean(x, end, window):
+    """Mittel der `window` Bars bis einschließlich Zeile `end` (negativ) – NaN, wenn ein Wert fehlt."""
+    start = x.shape[0] + end + 1 - window
+    if start < 0:
+        return np.full(x.shape[1], np.nan)
+    return x[start:x.shape[0] + end + 1].mean(axis=0)
+
+
+def compute_indicators(panel=None, bars=None):
+    """Liefert pro Ticker die Kennzahlen aus INDICATOR_COLUMNS (Werte des letzten Bars)."""
+    bars  = bars or bar_panel(panel, ("High", "Low", "Close"))
+    close = bars["Close"]
+    # fehlende High/Low (z.B. Indizes ohne OHLC) durch Close ersetzen – als Maske, nicht pro Ticker
+    high  = np.where(np.isnan(bars["High"]), close, bars["High"])
+    low   = np.where(np.isnan(bars["Low"]), close, bars["Low"])
+    last  = close[-1]
+    depth = close.shape[0]
+    out   = {}
+
+    with warnings.catch_warnings(), np.errstate(divide="ignore", invalid="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)     # nanmax/nanmin über leere Spalten
+
+        for n in RETURN_HORIZONS:
+            out[f"ret_{n}d"] = (last / close[-1 - n] - 1) * 100 if depth > n else np.full(len(last), np.nan)
+
+        out["dist_52w_high"] = (last / np.nanmax(high[-WEEKS_52:], axis=0) - 1) * 100
+        out["dist_52w_low"]  = (last / np.nanmin(low[-WEEKS_52:], axis=0) - 1) * 100
+
+        prev = np.vstack([np.full((1, close.shape[1]), np.nan), close[:-1]])
+        tr   = np.fmax(high - low, np.fmax(np.abs(high - prev), np.abs(low - prev)))
+        out["atr_pct"] = wilder(tr, ATR_WINDOW)[-1] / last * 100
+
+        delta = close - prev
+        gain  = wilder(np.where(delta > 0, delta, np.where(np.isnan(delta), np.nan, 0.0)), RSI_WINDOW)[-1]
+        loss  = wilder(np.where(delta < 0, -delta, np.where(np.isnan(delta), np.nan, 0.0)), RSI_WINDOW)[-1]
+        out["rsi_14"] = 100 - 100 / (1 + gain / loss)
+
+        # +1: SMA50 über SMA200, -1: darunter · Kreuzung am letzten Bar: +1 Golden, -1 Death Cross
+        trend_now  = np.sign(_window_mean(close, -1, SMA_FAST) - _window_mean(close, -1, SMA_SLOW))
+        trend_prev = np.sign(_window_mean(close, -2, SMA_FAST) - _window_mean(close, -2, SMA_SLOW))
+        out["ma_trend"] = trend_now
+        out["ma_cross"] = np.nan_to_num((trend_now - trend_prev) / 2)
+
+    res = pd.DataFrame(out, index=bars.tickers)
+    return res.replace([np.inf, -np.inf], np.nan)
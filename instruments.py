@@ -0,0 +1,151 @@
+"""
+Instrumentenstamm des Screeners
+Ticker, Name, Land, Sektor und stooq-Symbol aus data/instruments.csv (oder .parquet),
+ergänzt um die Referenztabellen für Länder (Flagge, Währung), Börsen (TradingView-Kürzel)
+und Sektoren (Farbe). Wird beim Laden geprüft; Indizes nach Land, Sektor, Börse und
+Währung werden einmal aufgebaut, Abfragen sind danach Dict-Zugriffe bzw. Array-Schnitte.
+"""
+
+import os, re
+from datetime import datetime, timedelta, timezone
+from functools import reduce
+from zoneinfo import ZoneInfo
+import numpy as np
+import pandas as pd
+
+DATA_DIR    = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+MASTER_FILE = os.environ.get("SCREENER_INSTRUMENTS", os.path.join(DATA_DIR, "instruments.csv"))
+
+COLUMNS    = ["ticker", "name", "country", "sector", "stooq"]
+INDEXED    = ["country", "sector", "exchange", "currency"]
+NO_FLAG    = "🏳️"
+STOOQ_SYMBOL = re.compile(r"^[a-z0-9][a-z0-9\-_]*\.[a-z]{2}$")
+
+
+def read_table(path):
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, dtype=str, keep_default_na=False, encoding="utf-8")
+
+
+class InstrumentMaster:
+    def __init__(self, frame, countries, exchanges, sectors):
+        """frame: Spalten COLUMNS · countries: country → flag, currency ·
+        exchanges: suffix → tradingview (+ timezone, open, close für die Handelszeiten) ·
+        sectors: sector → color"""
+        self.countries = countries.set_index("country") if "country" in countries.columns else countries
+        self.exchanges = exchanges.set_index("suffix") if "suffix" in exchanges.columns else exchanges
+        self.sectors   = sectors.set_index("sector") if "sector" in sectors.columns else sectors
+        self.frame     = self._validate(frame)
+
+        self.flags         = self.countries["flag"].to_dict()
+        self.sector_colors = self.sectors["color"].to_dict()
+        self.tv_exchanges  = {f".{s}": ex for s, ex in self.exchanges["tradingview"].items()}
+        # Position je Wert, z.B. index["country"]["Schweiz"] → array([38, 39, ...])
+        self.index = {col: self.frame.groupby(col, sort=False).indices for col in INDEXED}
+
+    @classmethod
+    def load(cls, path=MASTER_FILE, data_dir=DATA_DIR):
+        return cls(read_table(path),
+                   read_table(os.path.join(data_dir, "countries.csv")),
+                   read_table(os.path.join(data_dir, "exchanges.csv")),
+                   read_table(os.path.join(data_dir, "sectors.csv")))
+
+    def _validate(self, frame):
+        missing = [c for c in COLUMNS if c not in frame.columns]
+        if missing:
+            raise ValueError(f"Instrumentenstamm: Spalten fehlen: {', '.join(missing)}")
+        df = frame[COLUMNS].astype(str).apply(lambda s: s.str.strip())
+        df["exchange"] = df["ticker"].str.rpartition(".")[2]
+
+        errors = []
+        def check(mask, what):
+            for t in df.loc[mask, "ticker"].head(20):
+                errors.append(f"{t or '(leer)'}: {what}")
+
+        for col in COLUMNS:
+            check(df[col] == "", f"{col} fehlt")
+        check(df["ticker"].duplicated(keep=False) & (df["ticker"] != ""), "Ticker doppelt")
+        check(df["stooq"].duplicated(keep=False) & (df["stooq"] != ""), "stooq-Symbol doppelt")
+        check(~df["stooq"].str.match(STOOQ_SYMBOL) & (df["stooq"] != ""), "stooq-Symbol ungültig")
+        check(~df["ticker"].str.contains(".", regex=False) | ~df["exchange"].isin(self.exchanges.index),
+              "unbekannte Börse")
+        check(~df["country"].isin(self.countries.index) & (df["country"] != ""), "unbekanntes Land")
+        check(~df["sector"].isin(self.sectors.index) & (df["sector"] != ""), "unbekannter Sektor")
+        if errors:
+            raise ValueError(f"Instrumentenstamm ungültig ({len(errors)} Fehler):\n  " + "\n  ".join(errors))
+
+        df["currency"] = df["country"].map(self.countries["currency"])
+        return df.set_index("ticker")
+
+    # ── Abfragen ─────────────────────────────────
+    def __len__(self):
+        return len(self.frame)
+
+    def __contains__(self, ticker):
+        return ticker in self.frame.index
+
+    @property
+    def tickers(self):
+        return self.frame.index
+
+    @property
+    def stooq(self):
+        """Ticker → stooq-Symbol in Stammreihenfolge."""
+        return self.frame["stooq"]
+
+    def positions(self, **criteria):
+        """Zeilenpositionen für z.B. country="Schweiz", sector=["Finanzen", "Energie"]."""
+        parts = []
+        for col, values in criteria.items():
+            if col not in self.index:
+                raise KeyError(f"kein Index für {col!r} (verfügbar: {', '.join(INDEXED)})")
+            values = [values] if isinstance(values, str) else values
+            hits = [self.index[col].get(v) for v in values]
+            parts.append(np.unique(np.concatenate([h for h in hits if h is not None] or [np.array([], int)])))
+        if not parts:
+            return np.arange(len(self.frame))
+        return reduce(np.intersect1d, parts)
+
+    def select(self, **criteria):
+        return self.frame.iloc[self.positions(**criteria)]
+
+    def subset(self, tickers):
+        """Neuer Stamm mit nur diesen Tickern (gleiche Referenztabellen)."""
+        return InstrumentMaster(self.frame.loc[list(tickers), COLUMNS[1:]].reset_index(),
+                                self.countries, self.exchanges, self.sectors)
+
+    def open_exchanges(self, now=None):
+        """Börsen (Suffix), die zum Zeitpunkt now gerade handeln: Mo–Fr zwischen open und close
+        Ortszeit. Feiertage kennt die Tabelle nicht – dort bleiben die Kurse einfach unverändert."""
+        if "timezone" not in self.exchanges.columns:
+            return []
+        now = now or datetime.now(timezone.utc)
+        out = []
+        for suffix, ex in self.exchanges.iterrows():
+            local = now.astimezone(ZoneInfo(ex["timezone"]))
+            if local.weekday() < 5 and ex["open"] <= local.strftime("%H:%M") < ex["close"]:
+                out.append(suffix)
+        return out
+
+    def last_sessions(self, now=None):
+        """Letzter abgeschlossener Handelstag je Börse (Suffix) zum Zeitpunkt now – Gegenstück zu
+        open_exchanges: nach Handelsschluss heute, sonst der Werktag davor. Feiertage kennt die
+        Tabelle nicht; dort gilt der Tag als erwartet, bis der nächste abgeschlossen ist."""
+        if "timezone" not in self.exchanges.columns:
+            return {}
+        now = now or datetime.now(timezone.utc)
+        out = {}
+        for suffix, ex in self.exchanges.iterrows():
+            local = now.astimezone(ZoneInfo(ex["timezone"]))
+            day   = local.date() - timedelta(days=0 if local.strftime("%H:%M") >= ex["close"] else 1)
+            while day.weekday() >= 5:
+                day -= timedelta(days=1)
+            out[suffix] = pd.Timestamp(day)
+        return out
+
+    def tv_link(self, ticker):
+        exchange = self.tv_exchanges.get("." + ticker.rpartition(".")[2]) if "." in ticker else None
+        if exchange:
+            return f"https://www.tradingview.com/chart/?symbol={exchange}%3A{ticker.rpartition('.')[0]}"
+        return f"https://www.tradingview.com/search/?query={ticker}"
@@ -0,0 +1,203 @@
+"""
+Intraday-Aktualisierung für den Server-Modus
+Während der Handelszeiten werden nur die Ticker der gerade offenen Börsen abgefragt – über die
+Kurs-Schnittstelle von stooq, viele Symbole pro Request. Weiter verarbeitet werden nur Symbole,
+deren Kurs sich seit dem letzten Abruf geändert hat: deren Zeilen werden aus der gespeicherten
+Historie plus laufendem Tagesbar neu berechnet und als Zeilen-Diff an die Browser geschickt.
+Aufwand und Nutzlast je Zyklus wachsen mit der Zahl geänderter Ticker, nicht mit dem Universum.
+
+Aufruf:
+  python intraday.py fake-feed --port 8097 --moves 0.1    # lokaler Kurs-Feed zum Testen
+  STOOQ_QUOTE_URL=http://127.0.0.1:8097/q/l/ python screener_server.py --intraday 30
+"""
+
+import argparse, io, os, threading
+import numpy as np
+import pandas as pd
+
+from stooq_client import wire_bytes
+
+QUOTE_URL    = os.environ.get("STOOQ_QUOTE_URL", "https://stooq.com/q/l/")
+QUOTE_FIELDS = "sd2t2ohlcv"     # Symbol, Datum, Zeit, OHLC, Volumen
+QUOTE_BATCH  = 40               # Symbole pro Request
+QUOTE_COLUMNS = ["Symbol", "Date", "Time", "Open", "High", "Low", "Close", "Volume"]
+LIVE_COLUMNS = ["ticker", "close", "pct_change", "vol_ratio", "ret_20d", "rsi_14"]   # was der Browser nachführt
+
+
+def parse_quotes(content):
+    """stooq-Kurs-CSV → Frame mit kleingeschriebenem Symbol; Zeilen ohne Kurs ("N/D") fallen weg."""
+    df = pd.read_csv(io.BytesIO(content), na_values=["N/D"], keep_default_na=False)
+    if df.empty or "Close" not in df.columns:
+        return pd.DataFrame(columns=QUOTE_COLUMNS)
+    df = df.dropna(subset=["Date", "Close"])
+    df["Symbol"] = df["Symbol"].str.lower()
+    df["Date"]   = pd.to_datetime(df["Date"]).to_numpy().astype("datetime64[D]")
+    return df.reset_index(drop=True)
+
+
+class QuoteFeed:
+    """Fragt Kurse paketweise ab und merkt sich den letzten Stand je Symbol."""
+
+    def __init__(self, session, url=QUOTE_URL, batch=QUOTE_BATCH, limiter=None):
+        self.session = session
+        self.url     = url
+        self.batch   = batch
+        self.limiter = limiter
+        self.last    = {}       # Symbol → (Datum, Hoch, Tief, Schluss, Volumen)
+        self.stats   = {}
+        self.generation = 0     # von reset() erhöht; ein laufender Abruf erkennt so einen neuen Tagesstand
+        self._lock   = threading.Lock()     # last/generation: Abruf- und Aktualisierungs-Thread
+
+    def reset(self):
+        """Bekannte Stände vergessen: der nächste Abruf liefert alle Kurse als geändert
+        (nach einem neuen Tagesstand, dessen Zeilen die Intraday-Kurse noch nicht enthalten).
+        Ein gerade laufender Abruf liefert ebenfalls alle Kurse."""
+        with self._lock:
+            self.generation += 1
+            self.last = {}
+
+    def poll(self, symbols):
+        """Nur Symbole, deren Kurs sich seit dem letzten Abruf geändert hat – alle, wenn während
+        des Abrufs reset() lief (die Kurse gehören dann auf den neuen Tagesstand)."""
+        symbols = list(symbols)
+        with self._lock:
+            generation = self.generation
+        parts, nbytes, requests, failed = [], 0, 0, 0
+        for i in range(0, len(symbols), self.batch):
+            chunk = symbols[i:i + self.batch]
+            if self.limiter is not None:
+                self.limiter.acquire()
+            requests += 1
+            try:
+                # "+" trennt die Symbole und darf nicht als %2B kodiert werden
+                r = self.session.get(f"{self.url}?s={'+'.join(chunk)}&f={QUOTE_FIELDS}&h&e=csv", timeout=10)
+            except Exception:
+                failed += 1
+                continue
+            nbytes += wire_bytes(r)
+            if r.status_code != 200:
+                failed += 1
+                if self.limiter is not None and r.status_code == 429:
+                    self.limiter.throttle()
+                continue
+            if self.limiter is not None:
+                self.limiter.success()
+            parts.append(parse_quotes(r.content))
+        quotes = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=QUOTE_COLUMNS)
+
+        # geändert = neuer Tag, Kurs, Spanne oder Volumen; die Uhrzeit allein zählt nicht
+        keys = list(zip(quotes["Date"], quotes["High"], quotes["Low"], quotes["Close"], quotes["Volume"]))
+        with self._lock:
+            if generation == self.generation:
+                changed = np.array([self.last.get(s) != k for s, k in zip(quotes["Symbol"], keys)], dtype=bool)
+            else:
+                changed = np.ones(len(quotes), dtype=bool)
+            self.last.update(zip(quotes["Symbol"], keys))
+        self.stats = {"symbols": len(symbols), "quotes": len(quotes), "changed": int(changed.sum()),
+                      "requests": requests, "failed": failed, "bytes": nbytes}
+        return quotes[changed].reset_index(drop=True)
+
+
+# ─────────────────────────────────────────────
+# Zeilen neu berechnen
+# ─────────────────────────────────────────────
+def apply_quote(frame, quote):
+    """Laufender Tagesbar in die Historie eines Tickers ({"Date": ..., Feld: ...}): gleicher Tag
+    ersetzt den letzten Bar, ein neuer Tag wird angehängt, ein älterer Kurs bleibt unbeachtet."""
+    day   = np.datetime64(quote["Date"], "D")
+    dates = frame["Date"]
+    if len(dates) and dates[-1] > day:
+        return None
+    keep = len(dates) - 1 if len(dates) and dates[-1] == day else len(dates)
+    out  = {"Date": np.append(dates[:keep], day)}
+    for f in ("Open", "High", "Low", "Close", "Volume"):
+        out[f] = np.append(np.asarray(frame[f], dtype=float)[:keep], float(quote[f]))
+    return pd.DataFrame(out)
+
+
+def recompute_rows(store, quotes, symbol_to_ticker, start, build, eur):
+    """Screener-Zeilen nur für die Ticker mit neuem Kurs: Historie aus dem Store (ab start) plus
+    Tagesbar, dann build (screener.build_screener) und EUR-Umrechnung (fx_rates.apply_eur)."""
+    from fx_rates import apply_eur
+
+    tickers = [symbol_to_ticker[s] for s in quotes["Symbol"] if s in symbol_to_ticker]
+    if not tickers:
+        return None
+    hist   = store.frames(start, tickers)
+    frames = {}
+    for q in quotes.itertuples(index=False):
+        t = symbol_to_ticker.get(q.Symbol)
+        if t in hist:
+            df = apply_quote(hist[t], q._asdict())
+            if df is not None:
+                frames[t] = df
+    if not frames:
+        return None
+    return apply_eur(build(frames), eur)
+
+
+def merge_rows(df, rows):
+    """Neuer Screener-Frame mit ersetzten Zeilen, wieder nach Tagesveränderung sortiert."""
+    pos = pd.Index(df["ticker"]).get_indexer(rows["ticker"])
+    out = df.copy()
+    hit = pos >= 0
+    cols = [c for c in df.columns if c in rows.columns]
+    out.iloc[pos[hit], [df.columns.get_loc(c) for c in cols]] = rows.loc[hit, cols].to_numpy()
+    out = out.astype(df.dtypes.to_dict())
+    return out.sort_values("pct_change", ascending=False, kind="stable").reset_index(drop=True)
+
+
+# ─────────────────────────────────────────────
+# Lokaler Kurs-Feed zum Testen
+# ─────────────────────────────────────────────
+def fake_feed(port, moves=0.1, seed=0):
+    """Antwortet wie die stooq-Kurs-Schnittstelle. Jeder Abruf bewegt einen Anteil `moves` der
+    angefragten Symbole (Random Walk um einen festen Startkurs je Symbol); der Rest bleibt gleich."""
+    import zlib
+    from datetime import datetime
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import urlparse
+
+    rng    = np.random.default_rng(seed)
+    prices = {}
+
+    def quote(sym):
+        if sym not in prices:
+            r = np.random.default_rng(zlib.crc32(sym.encode()))
+            prices[sym] = [r.uniform(10, 500), r.uniform(1e5, 1e6)]
+        elif rng.random() < moves:
+            prices[sym][0] *= 1 + rng.normal(0, 0.004)
+            prices[sym][1] += rng.uniform(1e3, 5e4)
+        close, vol = prices[sym]
+        now = datetime.now()
+        return (f"{sym.upper()},{now:%Y-%m-%d},{now:%H:%M:%S},{close * 0.99:.2f},{close * 1.01:.2f},"
+                f"{close * 0.98:.2f},{close:.2f},{int(vol)}")
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            query = urlparse(self.path).query
+            syms  = next((p[2:] for p in query.split("&") if p.startswith("s=")), "")
+            body  = ("\n".join([",".join(QUOTE_COLUMNS)] + [quote(s.lower()) for s in syms.split("+") if s])
+                     + "\n").encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    print(f"Kurs-Feed auf http://127.0.0.1:{port}/q/l/ ({moves:.0%} der Symbole bewegen sich je Abruf)")
+    ThreadingHTTPServer(("127.0.0.1", port), Handler).serve_forever()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Intraday-Werkzeuge")
+    ap.add_argument("command", choices=["fake-feed"])
+    ap.add_argument("--port", type=int, default=8097)
+    ap.add_argument("--moves", type=float, default=0.1, help="Anteil der Symbole, die sich je Abruf bewegen")
+    args = ap.parse_args()
+    fake_feed(args.port, args.moves)
@@ -0,0 +1,116 @@
+"""
+Lokaler OHLCV-Speicher für den EU Screener
+Eine SQLite-Datei pro Börse (stooq-Suffix), Schlüssel: (stooq-Ticker, Datum)
+"""
+
+import os, sqlite3, threading
+import pandas as pd
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    ticker TEXT NOT NULL,
+    date   TEXT NOT NULL,
+    open   REAL, high REAL, low REAL, close REAL, volume REAL,
+    PRIMARY KEY (ticker, date)
+) WITHOUT ROWID
+"""
+
+# ETag/Last-Modified der letzten Antwort je Ticker; query = Abfragebeginn (d1), für den sie galt
+_VALIDATORS = """
+CREATE TABLE IF NOT EXISTS validators (
+    ticker   TEXT PRIMARY KEY,
+    query    TEXT NOT NULL,
+    etag     TEXT,
+    modified TEXT
+) WITHOUT ROWID
+"""
+
+
+def exchange_of(stooq_ticker):
+    return stooq_ticker.rsplit(".", 1)[-1] if "." in stooq_ticker else "misc"
+
+
+class PriceCache:
+    def __init__(self, root):
+        self.root  = root
+        self.conns = {}
+        self.lock  = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, exchange):
+        return os.path.join(self.root, f"prices_{exchange}.sqlite")
+
+    def _conn(self, stooq_ticker):
+        ex = exchange_of(stooq_ticker)
+        conn = self.conns.get(ex)
+        if conn is None:
+            conn = sqlite3.connect(self.path(ex), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            conn.execute(_VALIDATORS)
+            self.conns[ex] = conn
+        return conn
+
+    def last_date(self, stooq_ticker):
+        with self.lock:
+            row = self._conn(stooq_ticker).execute(
+                "SELECT MAX(date) FROM prices WHERE ticker = ?", (stooq_ticker,)
+            ).fetchone()
+        return pd.Timestamp(row[0]) if row and row[0] else None
+
+    def store(self, stooq_ticker, df):
+        """Merged neue Bars ein. Im überlappenden Zeitraum ersetzt die Antwort den Cache
+        vollständig – so greifen nachträgliche Korrekturen und entfernte Bars."""
+        if df is None or df.empty:
+            return 0
+        dates = df["Date"].dt.strftime("%Y-%m-%d")
+        # NaN landet in SQLite als NULL
+        cols  = [df[c].astype(float).tolist() if c in df.columns else [None] * len(df) for c in COLUMNS]
+        rows  = list(zip([stooq_ticker] * len(df), dates, *cols))
+        with self.lock:
+            conn = self._conn(stooq_ticker)
+            with conn:
+                conn.execute(
+                    "DELETE FROM prices WHERE ticker = ? AND date BETWEEN ? AND ?",
+                    (stooq_ticker, dates.min(), dates.max()),
+                )
+                conn.executemany("INSERT INTO prices VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def validator(self, stooq_ticker, query):
+        """{"etag", "modified"} der letzten Antwort – nur wenn sie für dieselbe Abfrage galt."""
+        with self.lock:
+            row = self._conn(stooq_ticker).execute(
+                "SELECT etag, modified FROM validators WHERE ticker = ? AND query = ?", (stooq_ticker, query)
+            ).fetchone()
+        return {"etag": row[0], "modified": row[1]} if row else None
+
+    def store_validator(self, stooq_ticker, query, validator):
+        with self.lock:
+            conn = self._conn(stooq_ticker)
+            with conn:
+                if validator:
+                    conn.execute("INSERT OR REPLACE INTO validators VALUES (?, ?, ?, ?)",
+                                 (stooq_ticker, query, validator.get("etag"), validator.get("modified")))
+                else:
+                    conn.execute("DELETE FROM validators WHERE ticker = ?", (stooq_ticker,))
+
+    def load(self, stooq_ticker, start=None):
+        sql, args = "SELECT date, open, high, low, close, volume FROM prices WHERE ticker = ?", [stooq_ticker]
+        if start is not None:
+            sql += " AND date >= ?"
+            args.append(pd.Timestamp(start).strftime("%Y-%m-%d"))
+        with self.lock:
+            rows = self._conn(stooq_ticker).execute(sql + " ORDER BY date", args).fetchall()
+        df = pd.DataFrame(rows, columns=["Date"] + COLUMNS)
+        df["Date"] = pd.to_datetime(df["Date"])
+        # Spalten ohne Daten (z.B. Volume bei Indizes) wie im CSV weglassen
+        return df.dropna(axis=1, how="all") if not df.empty else df
+
+    def close(self):
+        with self.lock:
+            for conn in self.conns.values():
+                conn.close()
+            self.conns.clear()
@@ -0,0 +1,151 @@
+"""
+Laufzeit-Metriken des Screeners
+Stufen-Zeiten, HTTP-Statistik pro Ticker, Retries, Cache-Treffer und Renderzeit
+→ docs/run_report.json, optional im Prometheus-Textformat (docs/metrics.prom)
+"""
+
+import json, os, time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+
+REPORT_KEYS = ("started", "finished", "duration_s", "stages_s", "fetch", "tickers")
+
+
+def _round(v):
+    return round(v, 4) if isinstance(v, float) else v
+
+
+def _quantile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+class RunMetrics:
+    def __init__(self):
+        self.started = datetime.now(timezone.utc)
+        self.stages  = {}
+        self.tickers = {}
+        self.fetch   = {}
+        self.extra   = {}
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - t0
+
+    def record_fetch(self, stats, limiter=None):
+        self.tickers = {t: {k: _round(v) for k, v in s.items()} for t, s in stats.items()}
+        latency = [s.get("latency", 0.0) for s in stats.values() if s.get("source") != "bulk"]
+        self.fetch = {
+            "tickers":    len(stats),
+            "ok":         sum(bool(s.get("ok")) for s in stats.values()),
+            "failed":     sorted(t for t, s in stats.items() if not s.get("ok")),
+            "errors":     dict(Counter(s["error"] for s in stats.values() if not s.get("ok") and s.get("error"))),
+            "retried":    sum(bool(s.get("retry_pass")) for s in stats.values()),
+            "recovered":  sum(bool(s.get("retry_pass") and s.get("ok") and not s.get("error")) for s in stats.values()),
+            "requests":   sum(s.get("attempts", 0) for s in stats.values()),
+            "retries":    sum(s.get("retries", 0) for s in stats.values()),
+            "bytes":      sum(s.get("bytes", 0) for s in stats.values()),
+            "wait_s":     _round(sum(s.get("wait", 0.0) for s in stats.values())),
+            "latency_s":  {"p50": _round(_quantile(latency, 0.5)), "p95": _round(_quantile(latency, 0.95)),
+                           "max": _round(max(latency, default=0.0)), "sum": _round(sum(latency)),
+                           "count": len(latency)},
+            "http_status": dict(Counter(str(s.get("status")) for s in stats.values())),
+            "cache":      dict(Counter(s.get("cache", "off") for s in stats.values())),
+        }
+        if limiter is not None:
+            self.fetch["throttled"]  = limiter.throttled
+            self.fetch["final_rate"] = _round(limiter.rate)
+
+    @classmethod
+    def merge(cls, reports):
+        """Reports mehrerer Shards zu einem: Stufen als kritischer Pfad (Maximum über die Shards),
+        Fetch-Statistik über alle Ticker neu verdichtet, Start = frühester Shard."""
+        merged = cls()
+        stats  = {}
+        for r in reports:
+            stats.update(r.get("tickers", {}))
+            for k, v in r.get("stages_s", {}).items():
+                merged.stages[k] = max(merged.stages.get(k, 0.0), v)
+        merged.record_fetch(stats)
+        merged.fetch["throttled"] = sum(r.get("fetch", {}).get("throttled", 0) for r in reports)
+        if reports:
+            merged.started = min(datetime.fromisoformat(r["started"]) for r in reports)
+        asof = [r["asof"] for r in reports if r.get("asof")]
+        if asof:
+            merged.extra["asof"] = max(asof)
+        return merged
+
+    @classmethod
+    def from_dict(cls, report):
+        """Gegenstück zu to_dict: ein Lauf, dessen Stufen in getrennten Prozessen laufen
+        (screener.py fetch / compute / render), setzt den Bericht der Vorstufe fort."""
+        metrics = cls()
+        metrics.started = datetime.fromisoformat(report["started"])
+        metrics.stages  = dict(report.get("stages_s", {}))
+        metrics.fetch   = dict(report.get("fetch", {}))
+        metrics.tickers = dict(report.get("tickers", {}))
+        metrics.extra   = {k: v for k, v in report.items() if k not in REPORT_KEYS}
+        return metrics
+
+    def to_dict(self):
+        finished = datetime.now(timezone.utc)
+        return {
+            "started":    self.started.isoformat(timespec="seconds"),
+            "finished":   finished.isoformat(timespec="seconds"),
+            "duration_s": _round((finished - self.started).total_seconds()),
+            "stages_s":   {k: _round(v) for k, v in self.stages.items()},
+            "fetch":      self.fetch,
+            **self.extra,
+            "tickers":    self.tickers,
+        }
+
+    def prometheus(self):
+        f     = self.fetch
+        lat   = f.get("latency_s", {})
+        lines = [
+            "# HELP screener_stage_seconds Laufzeit je Stufe",
+            "# TYPE screener_stage_seconds gauge",
+            *(f'screener_stage_seconds{{stage="{k}"}} {v:.4f}' for k, v in self.stages.items()),
+            "# TYPE screener_tickers gauge",
+            f'screener_tickers{{result="ok"}} {f.get("ok", 0)}',
+            f'screener_tickers{{result="failed"}} {len(f.get("failed", []))}',
+            "# TYPE screener_http_requests gauge",
+            f"screener_http_requests {f.get('requests', 0)}",
+            "# TYPE screener_http_retries gauge",
+            f"screener_http_retries {f.get('retries', 0)}",
+            "# TYPE screener_http_bytes gauge",
+            f"screener_http_bytes {f.get('bytes', 0)}",
+            "# TYPE screener_http_latency_seconds summary",
+            f'screener_http_latency_seconds{{quantile="0.5"}} {lat.get("p50", 0.0)}',
+            f'screener_http_latency_seconds{{quantile="0.95"}} {lat.get("p95", 0.0)}',
+            f"screener_http_latency_seconds_sum {lat.get('sum', 0.0)}",
+            f"screener_http_latency_seconds_count {lat.get('count', 0)}",
+            "# TYPE screener_http_latency_seconds_max gauge",
+            f"screener_http_latency_seconds_max {lat.get('max', 0.0)}",
+            "# TYPE screener_cache_results gauge",
+            *(f'screener_cache_results{{result="{k}"}} {v}' for k, v in f.get("cache", {}).items()),
+            "# TYPE screener_rate_limiter_throttled gauge",
+            f"screener_rate_limiter_throttled {f.get('throttled', 0)}",
+            "# TYPE screener_run_timestamp_seconds gauge",
+            f"screener_run_timestamp_seconds {int(self.started.timestamp())}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path, prometheus_path=None):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(self.to_dict(), fh, ensure_ascii=False, indent=1)
+        written = [path]
+        if prometheus_path:
+            with open(prometheus_path, "w", encoding="utf-8") as fh:
+                fh.write(self.prometheus())
+            written.append(prometheus_path)
+        return written
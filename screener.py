@@ -2,302 +2,635 @@
 European Stock EOD Screener v3
 Datenquelle: stooq.com
 Features: Unternehmensname, Land, Sektor, Filter, modernes Finance-UI
+
+Aufruf:
+  python screener.py                 # all: fetch → compute → render in einem Prozess
+  python screener.py fetch           # Kurse laden → HistoryStore (cache/history)
+  python screener.py compute         # Indikatoren, EUR, Alarme, Archiv → cache/stages/compute.json
+  python screener.py render          # nur das Dashboard neu schreiben, ohne Netz
 """
 
+import time
+STARTED = time.perf_counter()       # Startzeit der Kommandos (Importe), siehe __main__
+
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-import os, time, requests, io
+import argparse, glob, gzip, hashlib, os, random, io, json, threading, warnings
+from functools import lru_cache
+# erst in der Stufe importiert, die sie braucht (requests allein kostet ~80 ms Start):
+#   Abruf:   requests, stooq_client, price_cache, fetch_checkpoint, stooq_bulk, concurrent.futures, multiprocessing
+#   Rechnen: history_store, indicator_state, fx_rates, snapshots, alerts, shards
+#   Rendern: analytics, shards (Zwischenstand)
+from instruments import InstrumentMaster, NO_FLAG, DATA_DIR
+from run_report import RunMetrics
+from indicators import BarPanel, bar_panel, compute_indicators, INDICATOR_COLUMNS
 
 # ─────────────────────────────────────────────
-# STAMMDATEN: Ticker → (Name, Land, Sektor, stooq-Ticker)
+# STAMMDATEN: data/instruments.csv (Ticker, Name, Land, Sektor, stooq-Symbol)
+# Länder (Flagge, Währung), Börsen und Sektorfarben: data/countries|exchanges|sectors.csv
 # ─────────────────────────────────────────────
-STOCKS = {
-    # Deutschland
-    "SAP.DE":    ("SAP SE",                      "Deutschland", "Technologie",   "sap.de"),
-    "SIE.DE":    ("Siemens AG",                  "Deutschland", "Industrie",     "sie.de"),
-    "ALV.DE":    ("Allianz SE",                  "Deutschland", "Finanzen",      "alv.de"),
-    "MRK.DE":    ("Merck KGaA",                  "Deutschland", "Gesundheit",    "mrk.de"),
-    "DTE.DE":    ("Deutsche Telekom AG",          "Deutschland", "Telekommunikation","dte.de"),
-    "BAYN.DE":   ("Bayer AG",                    "Deutschland", "Gesundheit",    "bayn.de"),
-    "BMW.DE":    ("BMW AG",                      "Deutschland", "Automobil",     "bmw.de"),
-    "MBG.DE":    ("Mercedes-Benz Group AG",      "Deutschland", "Automobil",     "mbg.de"),
-    "VOW3.DE":   ("Volkswagen AG",               "Deutschland", "Automobil",     "vow3.de"),
-    "BAS.DE":    ("BASF SE",                     "Deutschland", "Chemie",        "bas.de"),
-    "RWE.DE":    ("RWE AG",                      "Deutschland", "Energie",       "rwe.de"),
-    "EON.DE":    ("E.ON SE",                     "Deutschland", "Energie",       "eon.de"),
-    "DBK.DE":    ("Deutsche Bank AG",            "Deutschland", "Finanzen",      "dbk.de"),
-    "CBK.DE":    ("Commerzbank AG",              "Deutschland", "Finanzen",      "cbk.de"),
-    "ADS.DE":    ("Adidas AG",                   "Deutschland", "Konsumgüter",   "ads.de"),
-    "IFX.DE":    ("Infineon Technologies AG",    "Deutschland", "Technologie",   "ifx.de"),
-    "HEN3.DE":   ("Henkel AG & Co. KGaA",        "Deutschland", "Konsumgüter",   "hen3.de"),
-    "MUV2.DE":   ("Munich Re AG",                "Deutschland", "Finanzen",      "muv2.de"),
-    "MTX.DE":    ("MTU Aero Engines AG",         "Deutschland", "Industrie",     "mtx.de"),
-    # Frankreich
-    "MC.PA":     ("LVMH Moët Hennessy",          "Frankreich",  "Konsumgüter",   "mc.fr"),
-    "OR.PA":     ("L'Oréal SA",                  "Frankreich",  "Konsumgüter",   "or.fr"),
-    "TTE.PA":    ("TotalEnergies SE",            "Frankreich",  "Energie",       "tte.fr"),
-    "SAN.PA":    ("Sanofi SA",                   "Frankreich",  "Gesundheit",    "san.fr"),
-    "AIR.PA":    ("Airbus SE",                   "Frankreich",  "Industrie",     "air.fr"),
-    "BNP.PA":    ("BNP Paribas SA",              "Frankreich",  "Finanzen",      "bnp.fr"),
-    "AXA.PA":    ("AXA SA",                      "Frankreich",  "Finanzen",      "axa.fr"),
-    "SU.PA":     ("Schneider Electric SE",       "Frankreich",  "Industrie",     "su.fr"),
-    "RI.PA":     ("Pernod Ricard SA",            "Frankreich",  "Konsumgüter",   "ri.fr"),
-    "SGO.PA":    ("Compagnie de Saint-Gobain",   "Frankreich",  "Industrie",     "sgo.fr"),
-    "KER.PA":    ("Kering SA",                   "Frankreich",  "Konsumgüter",   "ker.fr"),
-    "STM.PA":    ("STMicroelectronics NV",       "Frankreich",  "Technologie",   "stm.fr"),
-    "VIV.PA":    ("Vivendi SE",                  "Frankreich",  "Telekommunikation","viv.fr"),
-    "ENGI.PA":   ("Engie SA",                    "Frankreich",  "Energie",       "engi.fr"),
-    "LR.PA":     ("Legrand SA",                  "Frankreich",  "Industrie",     "lr.fr"),
-    "RNO.PA":    ("Renault SA",                  "Frankreich",  "Automobil",     "rno.fr"),
-    "ORA.PA":    ("Orange SA",                   "Frankreich",  "Telekommunikation","ora.fr"),
-    # Schweiz (stooq: .ch)
-    "NESN.SW":   ("Nestlé SA",                   "Schweiz",     "Konsumgüter",   "nesn.ch"),
-    "NOVN.SW":   ("Novartis AG",                 "Schweiz",     "Gesundheit",    "novn.ch"),
-    "ZURN.SW":   ("Zurich Insurance Group AG",   "Schweiz",     "Finanzen",      "zurn.ch"),
-    "SIKA.SW":   ("Sika AG",                     "Schweiz",     "Chemie",        "sika.ch"),
-    "LONN.SW":   ("Lonza Group AG",              "Schweiz",     "Gesundheit",    "lonn.ch"),
-    "CFR.SW":    ("Compagnie Financière Richemont","Schweiz",   "Konsumgüter",   "cfr.ch"),
-    "HOLN.SW":   ("Holcim Ltd",                  "Schweiz",     "Industrie",     "holn.ch"),
-    # UK (stooq: .uk)
-    "HSBA.L":    ("HSBC Holdings plc",           "UK",          "Finanzen",      "hsba.uk"),
-    "SHEL.L":    ("Shell plc",                   "UK",          "Energie",       "shel.uk"),
-    "AZN.L":     ("AstraZeneca plc",             "UK",          "Gesundheit",    "azn.uk"),
-    "ULVR.L":    ("Unilever plc",                "UK",          "Konsumgüter",   "ulvr.uk"),
-    "BP.L":      ("BP plc",                      "UK",          "Energie",       "bp.uk"),
-    "GSK.L":     ("GSK plc",                     "UK",          "Gesundheit",    "gsk.uk"),
-    "RIO.L":     ("Rio Tinto plc",               "UK",          "Rohstoffe",     "rio.uk"),
-    "VOD.L":     ("Vodafone Group plc",          "UK",          "Telekommunikation","vod.uk"),
-    "REL.L":     ("RELX plc",                    "UK",          "Technologie",   "rel.uk"),
-    "NG.L":      ("National Grid plc",           "UK",          "Energie",       "ng.uk"),
-    "BARC.L":    ("Barclays plc",                "UK",          "Finanzen",      "barc.uk"),
-    "LLOY.L":    ("Lloyds Banking Group plc",    "UK",          "Finanzen",      "lloy.uk"),
-    "NWG.L":     ("NatWest Group plc",           "UK",          "Finanzen",      "nwg.uk"),
-    "PRU.L":     ("Prudential plc",              "UK",          "Finanzen",      "pru.uk"),
-    # Niederlande (stooq: .nl)
-    "ASML.AS":   ("ASML Holding NV",             "Niederlande", "Technologie",   "asml.nl"),
-    "HEIA.AS":   ("Heineken NV",                 "Niederlande", "Konsumgüter",   "heia.nl"),
-    "PHIA.AS":   ("Philips NV",                  "Niederlande", "Gesundheit",    "phia.nl"),
-    "ING.AS":    ("ING Groep NV",                "Niederlande", "Finanzen",      "ing.nl"),
-    "AD.AS":     ("Koninklijke Ahold Delhaize",  "Niederlande", "Konsumgüter",   "ad.nl"),
-    # Spanien (stooq: .es)
-    "ITX.MC":    ("Industria de Diseño Textil (Inditex)","Spanien","Konsumgüter","itx.es"),
-    "BBVA.MC":   ("Banco Bilbao Vizcaya Argentaria","Spanien",  "Finanzen",      "bbva.es"),
-    "SAN.MC":    ("Banco Santander SA",          "Spanien",     "Finanzen",      "san.es"),
-    "IBE.MC":    ("Iberdrola SA",                "Spanien",     "Energie",       "ibe.es"),
-    "REP.MC":    ("Repsol SA",                   "Spanien",     "Energie",       "rep.es"),
-    "TEF.MC":    ("Telefónica SA",               "Spanien",     "Telekommunikation","tef.es"),
-    # Italien (stooq: .it)
-    "ENI.MI":    ("Eni SpA",                     "Italien",     "Energie",       "eni.it"),
-    "ENEL.MI":   ("Enel SpA",                    "Italien",     "Energie",       "enel.it"),
-    "UCG.MI":    ("UniCredit SpA",               "Italien",     "Finanzen",      "ucg.it"),
-    "RACE.MI":   ("Ferrari NV",                  "Italien",     "Automobil",     "race.it"),
-    # Schweden (stooq: .se)
-    "VOLV-B.ST": ("Volvo AB",                    "Schweden",    "Industrie",     "volv-b.se"),
-    "ERIC-B.ST": ("Ericsson AB",                 "Schweden",    "Technologie",   "eric-b.se"),
-    "HM-B.ST":   ("H&M Group AB",               "Schweden",    "Konsumgüter",   "hm-b.se"),
-    "SAND.ST":   ("Sandvik AB",                  "Schweden",    "Industrie",     "sand.se"),
-    # Dänemark (stooq: .dk)
-    "NOVO-B.CO": ("Novo Nordisk A/S",            "Dänemark",    "Gesundheit",    "novo-b.dk"),
-    "DSV.CO":    ("DSV A/S",                     "Dänemark",    "Industrie",     "dsv.dk"),
-    # Norwegen (stooq: .no)
-    "EQNR.OL":   ("Equinor ASA",                "Norwegen",    "Energie",       "eqnr.no"),
-    "DNB.OL":    ("DNB Bank ASA",               "Norwegen",    "Finanzen",      "dnb.no"),
-    # Finnland (stooq: .fi)
-    "NOKIA.HE":  ("Nokia Oyj",                  "Finnland",    "Technologie",   "nokia.fi"),
-    # Belgien (stooq: .be)
-    "UCB.BR":    ("UCB SA",                     "Belgien",     "Gesundheit",    "ucb.be"),
-    "ABI.BR":    ("Anheuser-Busch InBev SA/NV", "Belgien",     "Konsumgüter",   "abi.be"),
-    # Österreich (stooq: .at)
-    "OMV.VI":    ("OMV AG",                     "Österreich",  "Energie",       "omv.at"),
-    "ERSTE.VI":  ("Erste Group Bank AG",        "Österreich",  "Finanzen",      "erst.at"),
-}
-
-CURRENCY_MAP = {
-    "UK": "GBp", "Schweiz": "CHF", "Schweden": "SEK",
-    "Norwegen": "NOK", "Dänemark": "DKK",
-}
-
-HEADERS = {
-    "User-Agent": (
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/120.0.0.0 Safari/537.36"
-    ),
-}
+@lru_cache(maxsize=None)
+def instrument_master():
+    return InstrumentMaster.load()
+
+
+class _Universe:
+    """Platzhalter für den Instrumentenstamm: geladen beim ersten Zugriff, nicht beim Import.
+    Zuweisen (screener.UNIVERSE = ..., Shards, Benchmark) ersetzt ihn wie bisher."""
+
+    def __getattr__(self, name):
+        return getattr(instrument_master(), name)
+
+    def __len__(self):
+        return len(instrument_master())
+
+
+UNIVERSE = _Universe()
+
+# Parallelität & Rate-Limit (per Umgebungsvariable überschreibbar)
+FETCH_WORKERS = int(os.environ.get("SCREENER_WORKERS", "6"))
+RATE_START    = float(os.environ.get("SCREENER_RATE", "2.0"))      # Requests/s beim Start
+RATE_MIN      = float(os.environ.get("SCREENER_RATE_MIN", "0.2"))
+RATE_MAX      = float(os.environ.get("SCREENER_RATE_MAX", "8.0"))
+RATE_STEP     = 0.25     # additive Erhöhung pro sauberer Antwort
+MAX_RETRIES   = 3
+BACKOFF_BASE  = 0.5      # Sekunden; Wartezeit vor Versuch n: zufällig in [0, min(cap, base·2^n)]
+BACKOFF_CAP   = 30.0
+
+# Zweiter Durchgang nur für vorübergehend fehlgeschlagene Ticker: weniger Worker, mehr Geduld
+RETRY_ATTEMPTS = int(os.environ.get("SCREENER_RETRY_ATTEMPTS", "6"))
+RETRY_BASE     = float(os.environ.get("SCREENER_RETRY_BASE", "2.0"))
+TRANSIENT      = {"network", "throttled", "server"}
+
+# Lokaler Kurs-Cache: nur Bars nach dem letzten gespeicherten Tag werden geladen
+CACHE_DIR          = os.environ.get("SCREENER_CACHE", "cache")   # "" deaktiviert den Cache
+HISTORY_DAYS       = 400    # Kalendertage (≈ 275 Bars: 250-Tage-Rendite, SMA200, 52W-Hoch/Tief)
+CACHE_OVERLAP_DAYS = 7      # erneut geladene Tage für nachträgliche Korrekturen
+
+# Memory-mapped Kurshistorie (Datum × Ticker) neben dem Kurs-Cache; Abrufe liefern dann nur das frische Fenster
+STORE_DIR = os.path.join(CACHE_DIR, "history") if CACHE_DIR else ""
+
+# Inkrementeller Indikator-Zustand neben dem Kurs-Cache; SCREENER_VERIFY_STATE=1 rechnet zur Kontrolle voll nach
+STATE_FILE   = os.path.join(CACHE_DIR, "indicator_state.npz") if CACHE_DIR else ""
+VERIFY_STATE = os.environ.get("SCREENER_VERIFY_STATE", "0") == "1"
+
+# Checkpoint des Fetch-Laufs: ein abgebrochener Lauf desselben Tages lädt nur Fehlendes nach
+CHECKPOINT_FILE = os.path.join(CACHE_DIR, "fetch_checkpoint.jsonl") if CACHE_DIR else ""
+RESUME          = os.environ.get("SCREENER_RESUME", "1") == "1"
+
+# Archiv der Tagesergebnisse (eine Partition pro Handelstag, Abfragen: snapshots.py); "" deaktiviert es
+SNAPSHOT_DIR = os.environ.get("SCREENER_SNAPSHOTS", os.path.join(CACHE_DIR, "snapshots") if CACHE_DIR else "")
+
+# Wechselkurse EUR/<Währung> (close_eur, turnover_eur); SCREENER_FX_OFFLINE=1 rechnet nur mit dem Cache
+FX_FILE    = os.path.join(CACHE_DIR, "fx_rates.csv") if CACHE_DIR else ""
+FX_OFFLINE = os.environ.get("SCREENER_FX_OFFLINE", "0") == "1"
+
+# Alarm-Regeln (data/alerts.csv, Syntax: alerts.py); Treffer nach docs/alerts.json und optional an SCREENER_ALERT_WEBHOOK
+@lru_cache(maxsize=None)
+def alert_engine():
+    """Alarm-Regeln, einmal pro Prozess beim ersten Gebrauch geladen."""
+    from alerts import AlertEngine
+    return AlertEngine.load()
+
+# Bulk-Archive pro Markt (stooq_bulk.BULK_MARKETS) statt Einzelabrufen
+USE_BULK = os.environ.get("SCREENER_BULK", "0") == "1"
+
+
+# ─────────────────────────────────────────────
+# Rate-Limiter (Token-Bucket, adaptiv)
+# ─────────────────────────────────────────────
+class RateLimiter:
+    """Token-Bucket, dessen Rate sich dem erlaubten Durchsatz anpasst:
+    429/5xx halbiert die Rate, jede saubere Antwort erhöht sie um RATE_STEP."""
+
+    def __init__(self, rate=RATE_START, min_rate=RATE_MIN, max_rate=RATE_MAX, burst=2.0):
+        self.rate      = rate
+        self.min_rate  = min_rate
+        self.max_rate  = max_rate
+        self.capacity  = burst
+        self.tokens    = burst
+        self.updated   = time.monotonic()
+        self.blocked   = 0.0        # monotonic-Zeitpunkt bis zu dem pausiert wird (Retry-After)
+        self.last_cut  = 0.0
+        self.throttled = 0
+        self.lock      = threading.Lock()
+
+    def acquire(self):
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens  = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.blocked and self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = max(self.blocked - now, (1 - self.tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def success(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + RATE_STEP)
+
+    def throttle(self, retry_after=None):
+        with self.lock:
+            now = time.monotonic()
+            self.throttled += 1
+            # mehrere 429 aus derselben Welle nur einmal halbieren
+            if now - self.last_cut >= 1.0:
+                self.rate     = max(self.min_rate, self.rate / 2)
+                self.last_cut = now
+            self.tokens = 0.0
+            if retry_after:
+                self.blocked = max(self.blocked, now + retry_after)
+
+
+def _retry_after(r):
+    try:
+        return min(float(r.headers.get("Retry-After", "")), 60.0)
+    except ValueError:
+        return None
+
+
+def _backoff(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Exponentiell mit vollem Jitter – parallele Worker laufen nicht im Gleichschritt erneut an."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
 
 # ─────────────────────────────────────────────
 # Datenabruf stooq.com
 # ─────────────────────────────────────────────
-def fetch_ticker(session, stooq_ticker, d1, d2):
-    url = "https://stooq.com/q/d/l/"
-    params = {"s": stooq_ticker, "d1": d1, "d2": d2, "i": "d"}
-    for attempt in range(2):
+def parse_csv(content, min_rows=2):
+    """Parst eine stooq-CSV direkt aus den Response-Bytes (ohne str-Dekodierung).
+    stooq liefert aufsteigend sortiert – sortiert wird nur, wenn die Prüfung fehlschlägt."""
+    if not content.startswith(b"Date,"):
+        return None            # "No data", "Exceeded the daily hits limit", HTML-Fehlerseiten
+    # Spaltentypen ohne dtype-Angabe: die Inferenz des C-Parsers ist hier schneller (bench/bench_parse.py)
+    df = pd.read_csv(io.BytesIO(content))
+    if df.empty or "Close" not in df.columns or len(df) < min_rows:
+        return None
+    # festes ISO-Format (YYYY-MM-DD): NumPy parst direkt, ohne Format-Inferenz von to_datetime
+    df["Date"] = df["Date"].to_numpy().astype("datetime64[D]").astype("datetime64[ns]")
+    if not df["Date"].is_monotonic_increasing:
+        df = df.sort_values("Date", kind="stable").reset_index(drop=True)
+    return df
+
+
+def fetch_ticker(session, stooq_ticker, d1, d2, limiter=None, stats=None, min_rows=2,
+                 retries=MAX_RETRIES, backoff=BACKOFF_BASE, validator=None):
+    """stats["error"] bei Fehlschlag: network/throttled/server (vorübergehend) oder http/nodata.
+    validator: ETag/Last-Modified der letzten Antwort → bedingter Abruf; 304 liefert None mit
+    stats["status"] == 304, eine neue Antwort aktualisiert das Dict."""
+    import requests
+    from stooq_client import STOOQ_URL, conditional_headers, validator_of, wire_bytes
+
+    params  = {"s": stooq_ticker, "d1": d1, "d2": d2, "i": "d"}
+    headers = conditional_headers(validator)
+    stats  = stats if stats is not None else {}
+    stats.update(attempts=0, retries=0, status=None, bytes=0, latency=0.0, wait=0.0, error=None)
+    retry_after = 0.0     # nur ohne Limiter – sonst pausiert dieser selbst
+
+    for attempt in range(retries):
+        if attempt:
+            stats["retries"] += 1
+            delay = max(_backoff(attempt - 1, backoff), retry_after)
+            time.sleep(delay)
+            stats["wait"] += delay
+        if limiter is not None:
+            stats["wait"] += limiter.acquire()
+        stats["attempts"] += 1
+        t0 = time.perf_counter()
+        try:
+            r = session.get(STOOQ_URL, params=params, timeout=10, headers=headers)
+        except requests.RequestException:
+            stats["latency"] += time.perf_counter() - t0
+            stats["error"]    = "network"
+            continue
+        stats["latency"] += time.perf_counter() - t0
+        stats["status"]   = r.status_code
+        stats["bytes"]   += wire_bytes(r)
+
+        if r.status_code == 429 or r.status_code >= 500:
+            stats["error"] = "throttled" if r.status_code == 429 else "server"
+            if limiter is not None:
+                limiter.throttle(_retry_after(r))
+            else:
+                retry_after = _retry_after(r) or 0.0
+            continue
+        if limiter is not None:
+            limiter.success()
+        if r.status_code == 304:
+            return None
+        stats["error"] = "http" if r.status_code != 200 else "nodata"
+        if r.status_code != 200 or len(r.content) < 50:
+            return None
         try:
-            r = session.get(url, params=params, timeout=10, headers=HEADERS)
-            if r.status_code != 200 or len(r.content) < 50:
-                return None
-            df = pd.read_csv(io.StringIO(r.text))
-            if df.empty or "Close" not in df.columns or len(df) < 2:
-                return None
-            df["Date"] = pd.to_datetime(df["Date"])
-            return df.sort_values("Date").reset_index(drop=True)
+            df = parse_csv(r.content, min_rows)
         except Exception:
-            time.sleep(1)
+            return None
+        if df is not None:
+            stats["error"] = None
+            if validator is not None:
+                validator.clear()
+                validator.update(validator_of(r) or {})
+        return df
     return None
 
 
-def fetch_data():
-    end   = datetime.today()
-    start = end - timedelta(days=40)
-    d1    = start.strftime("%Y%m%d")
+def fetch_cached(session, cache, stooq_t, start, end, limiter=None, stats=None, since=None, **retry):
+    """since: nur Bars ab diesem Tag zurückgeben (Rest liegt bereits im HistoryStore).
+    retry: retries/backoff für fetch_ticker."""
+    stats = stats if stats is not None else {}
     d2    = end.strftime("%Y%m%d")
+    if cache is None:
+        stats["cache"] = "off"
+        return fetch_ticker(session, stooq_t, start.strftime("%Y%m%d"), d2, limiter, stats, **retry)
+
+    last = cache.last_date(stooq_t)
+    if last is None or last < pd.Timestamp(start):
+        stats["cache"] = "miss"
+        d1 = start
+    else:
+        stats["cache"] = "delta"
+        d1 = max(pd.Timestamp(start), last - timedelta(days=CACHE_OVERLAP_DAYS))
+
+    # bedingt nur bei vorhandenem Cache-Stand: ein 304 heißt dann "Cache ist aktuell"
+    query     = d1.strftime("%Y%m%d")
+    validator = (cache.validator(stooq_t, query) or {}) if last is not None else None
+    new = fetch_ticker(session, stooq_t, query, d2, limiter, stats, min_rows=1, validator=validator, **retry)
+    if new is not None:
+        stats["new_bars"] = cache.store(stooq_t, new)
+        if validator is not None:
+            cache.store_validator(stooq_t, query, validator)
+    elif last is None:
+        return None
+    elif stats.get("status") == 304:
+        stats["cache"] = "unchanged"
+    else:
+        # Kein neuer Bar (Feiertag) oder Abruf fehlgeschlagen → Cache-Stand verwenden
+        stats["cache"] = "stale"
+
+    df = cache.load(stooq_t, since or start)
+    return df if len(df) >= (1 if since else 2) and "Close" in df.columns else None
+
+
+def from_bulk(cache, stooq_t, df, start, stats=None, since=None):
+    stats = stats if stats is not None else {}
+    stats.update(source="bulk", attempts=0, retries=0, latency=0.0, bytes=0)
+    if cache is None:
+        df = df[df["Date"] >= pd.Timestamp(start)].reset_index(drop=True)
+        return df if len(df) >= 2 else None
+    stats["cache"] = "bulk"
+    last = cache.last_date(stooq_t)
+    if last is not None:
+        df = df[df["Date"] >= last - timedelta(days=CACHE_OVERLAP_DAYS)]
+    stats["new_bars"] = cache.store(stooq_t, df)
+    df = cache.load(stooq_t, since or start)
+    return df if len(df) >= (1 if since else 2) and "Close" in df.columns else None
+
+
+def fetch_bulk_frames(session, limiter=None, bulk_stats=None):
+    import requests, stooq_bulk
+
+    frames = {}
+    groups = stooq_bulk.group_by_market(UNIVERSE.stooq)
+    for market, symbols in sorted(groups.items()):
+        st = {}
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            got = stooq_bulk.fetch_bulk(session, market, symbols, stats=st)
+        except requests.RequestException as e:
+            got = {}
+            st["error"] = str(e)
+        if bulk_stats is not None:
+            bulk_stats[market] = dict(st, found=len(got), wanted=len(symbols))
+        print(f"  📦 Bulk {market}: {len(got)}/{len(symbols)} Symbole"
+              f" ({st.get('bytes', 0)/1e6:.1f} MB, HTTP {st.get('status')})")
+        frames.update(got)
+    single = stooq_bulk.unmapped(UNIVERSE.stooq)
+    if single:
+        print(f"  📦 Kein Bulk-Archiv für {len(single)} Symbole"
+              f" ({', '.join(sorted({t.rsplit('.', 1)[-1] for t in single}))}) – Einzelabruf")
+    return frames
+
+
+def history_start():
+    return datetime.today() - timedelta(days=HISTORY_DAYS)
 
-    print(f"Lade {len(STOCKS)} Aktien von stooq.com...")
-    session = requests.Session()
+
+def fetch_data(workers=FETCH_WORKERS, stats=None, cache_dir=CACHE_DIR, bulk=USE_BULK, session=None, limiter=None,
+               bulk_stats=None, store=None, checkpoint_file=CHECKPOINT_FILE, resume=RESUME, tickers=None):
+    """store: HistoryStore – Ticker, die dort schon liegen, liefern nur das Fenster ab
+    letztem gespeicherten Tag minus CACHE_OVERLAP_DAYS (nur mit Kurs-Cache).
+    checkpoint_file: Ergebnis je Ticker wird sofort festgehalten; ein erneuter Lauf am selben
+    Tag lädt nur, was dort fehlt oder fehlgeschlagen ist (nur mit Kurs-Cache).
+    tickers: nur diese Ticker abrufen (Standard: ganzes UNIVERSE)."""
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    from fetch_checkpoint import FetchCheckpoint
+    from price_cache import PriceCache
+    from stooq_client import make_session
+
+    end    = datetime.today()
+    start  = history_start()
+    wanted = UNIVERSE.stooq if tickers is None else UNIVERSE.stooq.loc[list(tickers)]
+
+    session = session or make_session(workers)
+    limiter = limiter or RateLimiter()
+    cache   = PriceCache(cache_dir) if cache_dir else None
+    stats   = stats if stats is not None else {}
     results = {}
-    ok = 0
+    t0      = time.perf_counter()
+    known   = store.last_dates() if store is not None and cache is not None else {}
+    ckpt    = (FetchCheckpoint(checkpoint_file, end.strftime("%Y-%m-%d"), resume)
+               if cache is not None and checkpoint_file else None)
+    done    = ckpt.done & set(wanted.index) if ckpt is not None else set()
+
+    def since_of(ticker):
+        return max(pd.Timestamp(start), known[ticker] - timedelta(days=CACHE_OVERLAP_DAYS)) if ticker in known else None
 
-    for i, (ticker, (name, country, sector, stooq_t)) in enumerate(STOCKS.items()):
-        df = fetch_ticker(session, stooq_t, d1, d2)
+    def loaded(ticker, df):
+        """Ergebnis übernehmen und festhalten; ein veralteter Cache-Stand nach vorübergehendem
+        Fehler zählt als geladen, bleibt aber für den Wiederholungsdurchgang offen."""
+        st = stats[ticker]
+        st["ok"] = df is not None
         if df is not None:
             results[ticker] = df
-            ok += 1
-        else:
-            print(f"  Fehler: {ticker} ({stooq_t})")
-        time.sleep(0.8)
-        if (i + 1) % 20 == 0:
-            time.sleep(5)
+        if ckpt is not None:
+            ckpt.record(ticker, df is not None and st.get("error") not in TRANSIENT, error=st.get("error"),
+                        status=st.get("status"), attempts=st.get("attempts"))
+
+    if done:
+        print(f"↩️  Checkpoint vom {ckpt.run_key}: {len(done)}/{len(wanted)} Ticker bereits geladen")
+        for ticker in done:
+            stooq_t = UNIVERSE.stooq[ticker]
+            df = cache.load(stooq_t, since_of(ticker) or start)
+            stats[ticker] = {"cache": "resumed", "attempts": 0, "retries": 0, "latency": 0.0, "bytes": 0}
+            if len(df) >= (1 if ticker in known else 2) and "Close" in df.columns:
+                stats[ticker]["ok"] = True
+                results[ticker] = df
+            else:
+                done.discard(ticker)
+
+    todo   = wanted.drop(list(done))
+    print(f"Lade {len(todo)} Aktien von stooq.com ({workers} Worker)...")
+    frames = fetch_bulk_frames(session, limiter, bulk_stats) if bulk and len(todo) else {}
 
-    print(f"  ✅ {ok}/{len(STOCKS)} Aktien geladen")
+    def job(ticker, stooq_t):
+        st = stats.setdefault(ticker, {})
+        if stooq_t in frames:
+            return ticker, from_bulk(cache, stooq_t, frames.pop(stooq_t), start, st, since_of(ticker))
+        return ticker, fetch_cached(session, cache, stooq_t, start, end, limiter, st, since_of(ticker))
+
+    def retry_job(ticker, stooq_t):
+        st = {}
+        df = fetch_cached(session, cache, stooq_t, start, end, limiter, st, since_of(ticker),
+                          retries=RETRY_ATTEMPTS, backoff=RETRY_BASE)
+        prev = stats[ticker]
+        for k in ("attempts", "retries", "latency", "wait", "bytes"):
+            st[k] = prev.get(k, 0) + st.get(k, 0)
+        stats[ticker] = dict(st, retry_pass=True)
+        return ticker, df if df is not None else results.get(ticker)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = [pool.submit(job, ticker, stooq_t) for ticker, stooq_t in todo.items()]
+            for fut in as_completed(futures):
+                loaded(*fut.result())
+
+        # Zweiter Durchgang: nur vorübergehende Fehler (Netz, 429, 5xx), mit exponentiellem Backoff
+        retry = [t for t in todo.index if stats[t].get("error") in TRANSIENT]
+        if retry:
+            print(f"  🔁 Wiederholung für {len(retry)} Ticker (bis zu {RETRY_ATTEMPTS} Versuche, Backoff ab {RETRY_BASE:g}s)")
+            with ThreadPoolExecutor(max_workers=max(1, workers // 2)) as pool:
+                futures = [pool.submit(retry_job, t, UNIVERSE.stooq[t]) for t in retry]
+                for fut in as_completed(futures):
+                    loaded(*fut.result())
+    finally:
+        if cache is not None:
+            cache.close()
+        if ckpt is not None:
+            # vollständig geladen → Checkpoint löschen, sonst für den nächsten Lauf behalten
+            ckpt.close(keep=any(not ckpt.outcomes.get(t, {}).get("ok") for t in wanted.index))
+
+    failed = [t for t in wanted.index if not stats.get(t, {}).get("ok")]
+    for t in failed:
+        s = stats.get(t, {})
+        print(f"  Fehler: {t} ({UNIVERSE.stooq[t]}) – {s.get('error') or 'unbekannt'}, "
+              f"HTTP {s.get('status')}, {s.get('attempts', 0)} Versuche")
+
+    # Reihenfolge wie im Instrumentenstamm
+    results = {t: results[t] for t in wanted.index if t in results}
+    print(f"  ✅ {len(results)}/{len(wanted)} Aktien geladen in {time.perf_counter() - t0:.1f}s")
+    print_fetch_stats(stats, limiter)
     return results
 
 
+def print_fetch_stats(stats, limiter=None, top=5):
+    if not stats:
+        return
+    lat     = sorted(s.get("latency", 0.0) for s in stats.values())
+    retries = sum(s.get("retries", 0) for s in stats.values())
+    nbytes  = sum(s.get("bytes", 0) for s in stats.values())
+    cached  = sum(s.get("cache") in ("delta", "stale", "unchanged") for s in stats.values())
+    p50     = lat[len(lat) // 2]
+    p95     = lat[min(len(lat) - 1, int(len(lat) * 0.95))]
+    line    = (f"  ⏱  Latenz p50 {p50*1000:.0f}ms · p95 {p95*1000:.0f}ms · {retries} Retries"
+               f" · {nbytes/1024:.0f} KB · {cached} aus Cache")
+    if limiter is not None:
+        line += f" · {limiter.throttled}× gedrosselt · Rate am Ende {limiter.rate:.1f}/s"
+    print(line)
+    slow = sorted(stats.items(), key=lambda kv: kv[1].get("latency", 0.0), reverse=True)[:top]
+    for ticker, s in slow:
+        print(f"     {ticker:<10} {s.get('latency', 0.0)*1000:6.0f}ms  "
+              f"Versuche {s.get('attempts', 0)}  HTTP {s.get('status')}")
+
+
 # ─────────────────────────────────────────────
 # Screener aufbauen
 # ─────────────────────────────────────────────
-def build_screener(ticker_data):
-    records = []
-    for ticker, (name, country, sector, _) in STOCKS.items():
-        try:
-            df = ticker_data.get(ticker)
-            if df is None or len(df) < 2:
-                continue
-            close  = df["Close"]
-            volume = df["Volume"] if "Volume" in df.columns else pd.Series([0]*len(df))
-            high   = df["High"]   if "High"   in df.columns else close
-
-            today_close  = float(close.iloc[-1])
-            prev_close   = float(close.iloc[-2])
-            today_volume = float(volume.iloc[-1])
-            avg_vol_20   = float(volume.iloc[-21:-1].mean()) if len(volume) >= 21 else float(volume.mean())
-            pct_change   = (today_close - prev_close) / prev_close * 100
-            vol_ratio    = today_volume / avg_vol_20 if avg_vol_20 > 0 else 1.0
-
-            currency = CURRENCY_MAP.get(country, "EUR")
-            records.append({
-                "ticker":     ticker,
-                "name":       name,
-                "country":    country,
-                "sector":     sector,
-                "currency":   currency,
-                "close":      round(today_close, 2),
-                "pct_change": round(pct_change, 2),
-                "vol_ratio":  round(vol_ratio, 2),
-            })
-        except Exception as e:
-            print(f"  Parse-Fehler {ticker}: {e}")
-
-    df_out = pd.DataFrame(records)
+PANEL_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def stocks_frame():
+    return UNIVERSE.frame[["name", "country", "sector", "stooq", "currency"]]
+
+
+def build_panel(ticker_data):
+    """Alle Ticker in einem langen Frame (ticker, Date) × OHLCV.
+    Fehlende Spalten (z.B. Volume) bleiben als NaN erhalten statt pro Ticker ersetzt zu werden."""
+    frames = [(t, df) for t, df in ticker_data.items() if df is not None and len(df)]
+    if not frames:
+        idx = pd.MultiIndex.from_arrays([[], pd.DatetimeIndex([])], names=["ticker", "Date"])
+        return pd.DataFrame(columns=PANEL_COLUMNS, index=idx, dtype=float)
+    # ein concat über alle Ticker, Index direkt aus Codes statt set_index/reindex pro Ticker
+    flat   = pd.concat([df for _, df in frames], ignore_index=True, copy=False)
+    codes  = np.repeat(np.arange(len(frames)), [len(df) for _, df in frames])
+    dcodes, dates = pd.factorize(flat["Date"], sort=True)
+    index  = pd.MultiIndex(
+        levels=[pd.Index([t for t, _ in frames]), pd.DatetimeIndex(dates)],
+        codes=[codes, dcodes], names=["ticker", "Date"], verify_integrity=False,
+    )
+    return pd.DataFrame({
+        c: flat[c].to_numpy(dtype=float) if c in flat.columns else np.full(len(flat), np.nan)
+        for c in PANEL_COLUMNS
+    }, index=index)
+
+
+def last_bars(bars):
+    """Schlusskurs, Vortag, Volumen und 20-Tage-Volumenschnitt aus dem Bar-Panel."""
+    close, volume = bars["Close"], bars["Volume"]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)          # Ticker ohne Volumen
+        # 20-Tage-Schnitt ohne heute; bei kürzerer Historie alle vorhandenen Bars
+        avg_long  = np.nanmean(volume[-21:-1], axis=0) if len(volume) > 1 else np.full(volume.shape[1], np.nan)
+        avg_short = np.nanmean(volume, axis=0)
+    avg_vol = np.where(bars.sizes.to_numpy() >= 21, avg_long, avg_short)
+
+    return pd.DataFrame({
+        "today_close":  close[-1],
+        "prev_close":   close[-2] if len(close) > 1 else np.nan,
+        "today_volume": volume[-1],
+        "avg_vol_20":   avg_vol,
+    }, index=bars.tickers)
+
+
+def full_indicators(ticker_data):
+    """Alle Kennzahlen vollständig aus der Historie (BASE_COLUMNS + INDICATOR_COLUMNS).
+    ticker_data: Frames je Ticker, langes Panel oder fertiges BarPanel (z.B. HistoryStore.bars)."""
+    if isinstance(ticker_data, BarPanel):
+        bars = ticker_data
+    else:
+        panel = ticker_data if isinstance(ticker_data, pd.DataFrame) else build_panel(ticker_data)
+        bars  = bar_panel(panel, ("High", "Low", "Close", "Volume"))   # Zeile -1 = letzter Bar je Ticker
+    return last_bars(bars).join(compute_indicators(bars=bars))
+
+
+def build_screener(ticker_data, state=None):
+    """state: IndicatorState – nur neue Bars werden eingefaltet statt alle Fenster neu zu rechnen
+    (ticker_data dann als Frames je Ticker oder BarPanel mit Date aus HistoryStore.bars)."""
+    if state is not None and isinstance(ticker_data, BarPanel) and "Date" in ticker_data.fields:
+        snap = state.update_bars(ticker_data)
+    elif state is not None and not isinstance(ticker_data, (pd.DataFrame, BarPanel)):
+        snap = state.update(ticker_data)
+    else:
+        snap = full_indicators(ticker_data)
+    return screener_frame(snap)
+
+
+def screener_frame(snap):
+    """Screener-Tabelle aus den Kennzahlen je Ticker (BASE_COLUMNS + INDICATOR_COLUMNS)."""
+    meta = stocks_frame()
+    out  = snap[snap.index.isin(meta.index)].dropna(subset=["prev_close"])     # < 2 Bars
+
+    pct_change = (out["today_close"] - out["prev_close"]) / out["prev_close"] * 100
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vol_ratio = np.where(out["avg_vol_20"] > 0, out["today_volume"] / out["avg_vol_20"], 1.0)
+
+    df_out = meta.loc[meta.index.intersection(out.index, sort=False), ["name", "country", "sector", "currency"]]
+    df_out = df_out.assign(
+        close      = out["today_close"].round(2),
+        pct_change = pct_change.round(2),
+        vol_ratio  = pd.Series(vol_ratio, index=out.index).round(2),
+        volume     = out["today_volume"],
+    ).join(out[INDICATOR_COLUMNS].round(2)).rename_axis("ticker").reset_index()
     if df_out.empty:
         raise ValueError("Keine Daten verarbeitbar.")
     return df_out.sort_values("pct_change", ascending=False).reset_index(drop=True)
 
 
+def eur_rates(currencies, asof, path=FX_FILE, offline=FX_OFFLINE, session=None):
+    """Kurstabelle aus dem Cache; Paare ohne Kurs zum Stichtag werden einmal nachgeladen.
+    Schlägt der Abruf fehl, gilt der jüngste Kurs aus dem Cache."""
+    from fx_rates import FxRates, fx_symbol, FX_DAYS
+    rates = FxRates.load(path)
+    stale = [] if offline else rates.stale(currencies, asof)
+    if stale:
+        from stooq_client import make_session
+        session = session or make_session(1)
+        d1 = (pd.Timestamp(asof) - timedelta(days=FX_DAYS)).strftime("%Y%m%d")
+        d2 = pd.Timestamp(asof).strftime("%Y%m%d")
+        for cur in stale:
+            stats = {}
+            bars  = fetch_ticker(session, fx_symbol(cur), d1, d2, stats=stats, min_rows=1)
+            if bars is not None:
+                rates.add(cur, bars)
+            else:
+                print(f"⚠️  Wechselkurs EUR/{cur} nicht ladbar ({stats.get('error')}) – verwende Cache")
+        if path:
+            rates.save(path)
+    return rates
+
+
+def last_bar_date(ticker_data):
+    """Jüngster Handelstag über alle Ticker (Stichtag des Laufs)."""
+    if isinstance(ticker_data, BarPanel):
+        last = ticker_data["Date"][-1]
+        last = last[~np.isnat(last)]
+        return pd.Timestamp(last.max()) if len(last) else None
+    last = [np.asarray(d["Date"])[-1] for d in ticker_data.values() if d is not None and len(d["Date"])]
+    return pd.Timestamp(max(last)) if last else None
+
+
+def verify_state(state, ticker_data):
+    """Vergleicht den inkrementellen Zustand mit einer vollständigen Neuberechnung."""
+    from indicator_state import BASE_COLUMNS, compare
+    full = full_indicators(ticker_data)[BASE_COLUMNS + INDICATOR_COLUMNS]
+    return compare(state.snapshot(full.index), full)
+
+
 # ─────────────────────────────────────────────
 # HTML
 # ─────────────────────────────────────────────
-def rows_html(subset):
-    html = ""
-    for _, r in subset.iterrows():
-        pct = r["pct_change"]
+def iter_rows_html(subset):
+    for r in subset.itertuples(index=False):
+        pct = r.pct_change
         sign = "pos" if pct >= 0 else "neg"
         arrow = "▲" if pct >= 0 else "▼"
         vol_badge = ""
-        if r["vol_ratio"] >= 3:
+        if r.vol_ratio >= 3:
             vol_badge = '<span class="badge hot">🔥</span>'
-        elif r["vol_ratio"] >= 2:
+        elif r.vol_ratio >= 2:
             vol_badge = '<span class="badge warm">↑</span>'
-        tv = tv_link(r['ticker'])
-        html += f"""<tr data-country="{r['country']}" data-sector="{r['sector']}">
-  <td><a href="{tv}" target="_blank" rel="noopener" class="chip chip-link">{r['ticker']}</a></td>
-  <td class="td-name">{r['name']}</td>
-  <td><span class="flag">{country_flag(r['country'])}</span> <span class="td-dim">{r['country']}</span></td>
-  <td><span class="sector-tag s-{sector_slug(r['sector'])}">{r['sector']}</span></td>
-  <td class="td-num">{r['close']:.2f} <span class="td-cur">{r['currency']}</span></td>
+        yield f"""<tr data-country="{r.country}" data-sector="{r.sector}">
+  <td><a href="{tv_link(r.ticker)}" target="_blank" rel="noopener" class="chip chip-link">{r.ticker}</a></td>
+  <td class="td-name">{r.name}</td>
+  <td><span class="flag">{country_flag(r.country)}</span> <span class="td-dim">{r.country}</span></td>
+  <td><span class="sector-tag s-{sector_slug(r.sector)}">{r.sector}</span></td>
+  <td class="td-num">{r.close:.2f} <span class="td-cur">{r.currency}</span></td>
   <td class="td-num {sign} td-bold">{arrow} {abs(pct):.2f}%</td>
-  <td class="td-num">{r['vol_ratio']:.1f}x {vol_badge}</td>
+  <td class="td-num">{r.vol_ratio:.1f}x {vol_badge}</td>
+  {_ret_cell(r.ret_20d)}
+  <td class="td-num td-dim">{_num(r.rsi_14, "{:.0f}")}</td>
 </tr>"""
-    return html
 
-def tv_link(ticker):
-    exchange_map = {
-        ".DE": "XETRA", ".PA": "EURONEXT", ".SW": "SIX", ".L": "LSE",
-        ".AS": "EURONEXT", ".MC": "BME", ".MI": "MIL", ".ST": "OMX",
-        ".CO": "OMXCOP", ".OL": "OSL", ".HE": "OMXHEX", ".BR": "EURONEXT", ".VI": "WBAG",
-    }
-    for suffix, exchange in exchange_map.items():
-        if ticker.endswith(suffix):
-            symbol = ticker[:-len(suffix)]
-            return f"https://www.tradingview.com/chart/?symbol={exchange}%3A{symbol}"
-    return f"https://www.tradingview.com/search/?query={ticker}"
 
-def country_flag(c):
-    flags = {"Deutschland":"🇩🇪","Frankreich":"🇫🇷","Schweiz":"🇨🇭","UK":"🇬🇧",
-             "Niederlande":"🇳🇱","Spanien":"🇪🇸","Italien":"🇮🇹","Schweden":"🇸🇪",
-             "Dänemark":"🇩🇰","Norwegen":"🇳🇴","Finnland":"🇫🇮","Belgien":"🇧🇪","Österreich":"🇦🇹"}
-    return flags.get(c, "🏳️")
+def _num(v, fmt):
+    return "–" if pd.isna(v) else fmt.format(v)
 
-def sector_slug(s):
-    return s.lower().replace("ü","ue").replace("ö","oe").replace("ä","ae").replace(" ","").replace("/","")
 
+def _ret_cell(v):
+    sign = "" if pd.isna(v) else ("pos" if v >= 0 else "neg")
+    return f'<td class="td-num {sign}">{_num(v, "{:+.1f}%")}</td>'
 
-def generate_html(df, date_str, generated_at):
-    gainers         = df[df["pct_change"] > 0].head(20)
-    losers          = df[df["pct_change"] < 0].sort_values("pct_change").head(20)
-    volume_top      = df[df["vol_ratio"] >= 1.5].sort_values("vol_ratio", ascending=False).head(20)
-    market_avg      = df["pct_change"].mean()
-    positive_count  = len(df[df["pct_change"] > 0])
-    total_count     = len(df)
-    top_g           = df.iloc[0]
-    top_l           = df.iloc[-1]
 
-    countries = sorted(df["country"].unique())
-    sectors   = sorted(df["sector"].unique())
+def rows_html(subset):
+    return "".join(iter_rows_html(subset))
+
+def tv_link(ticker):
+    return UNIVERSE.tv_link(ticker)
 
-    country_opts = "".join(f'<option value="{c}">{country_flag(c)} {c}</option>' for c in countries)
-    sector_opts  = "".join(f'<option value="{s}">{s}</option>' for s in sectors)
+def country_flag(c):
+    return UNIVERSE.flags.get(c, NO_FLAG)
 
-    # Sector-Farben CSS
-    sector_colors = {
-        "Technologie":"2563eb","Finanzen":"0891b2","Gesundheit":"059669",
-        "Energie":"d97706","Konsumgüter":"7c3aed","Industrie":"475569",
-        "Automobil":"dc2626","Chemie":"0d9488","Telekommunikation":"9333ea",
-        "Rohstoffe":"92400e",
-    }
-    sector_css = "\n".join(
-        f'.s-{sector_slug(s)} {{ background: #{c}22; color: #{c}; border-color: #{c}44; }}'
-        for s, c in sector_colors.items()
-    )
+@lru_cache(maxsize=None)
+def sector_slug(s):
+    return s.lower().replace("ü","ue").replace("ö","oe").replace("ä","ae").replace(" ","").replace("/","")
 
-    return f"""<!DOCTYPE html>
-<html lang="de">
-<head>
-<meta charset="UTF-8">
-<meta name="viewport" content="width=device-width,initial-scale=1">
-<title>EU Screener – {date_str}</title>
-<link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&family=JetBrains+Mono:wght@400;500;600&display=swap" rel="stylesheet">
-<style>
-:root {{
+
+CSS = """:root {
   --bg:        #070b0f;
   --surface:   #0d1117;
   --surface2:  #161b22;
@@ -316,88 +649,88 @@ def generate_html(df, date_str, generated_at):
   --purple:    #bc8cff;
   --font:      'Inter', system-ui, sans-serif;
   --mono:      'JetBrains Mono', monospace;
-}}
-*, *::before, *::after {{ box-sizing: border-box; margin: 0; padding: 0; }}
-html {{ scroll-behavior: smooth; }}
-body {{ background: var(--bg); color: var(--text); font-family: var(--font); font-size: 13px; line-height: 1.5; min-height: 100vh; }}
+}
+*, *::before, *::after { box-sizing: border-box; margin: 0; padding: 0; }
+html { scroll-behavior: smooth; }
+body { background: var(--bg); color: var(--text); font-family: var(--font); font-size: 13px; line-height: 1.5; min-height: 100vh; }
 
 /* ── HEADER ── */
-.hd {{
+.hd {
   background: var(--surface);
   border-bottom: 1px solid var(--border);
   padding: 20px 32px;
-}}
-.hd-top {{
+}
+.hd-top {
   display: flex; justify-content: space-between; align-items: center;
   margin-bottom: 20px;
-}}
-.logo {{ display: flex; align-items: center; gap: 10px; }}
-.logo-mark {{
+}
+.logo { display: flex; align-items: center; gap: 10px; }
+.logo-mark {
   width: 36px; height: 36px; border-radius: 8px;
   background: linear-gradient(135deg, var(--blue2), #0d419d);
   display: flex; align-items: center; justify-content: center;
   font-size: 18px; border: 1px solid rgba(88,166,255,.2);
-}}
-.logo-text h1 {{
+}
+.logo-text h1 {
   font-size: 16px; font-weight: 700; color: var(--text); letter-spacing: -.3px;
-}}
-.logo-text p {{ font-size: 11px; color: var(--text-dim); margin-top: 1px; letter-spacing: .5px; text-transform: uppercase; }}
-.hd-meta {{
+}
+.logo-text p { font-size: 11px; color: var(--text-dim); margin-top: 1px; letter-spacing: .5px; text-transform: uppercase; }
+.hd-meta {
   display: flex; align-items: center; gap: 8px;
-}}
-.meta-chip {{
+}
+.meta-chip {
   background: var(--surface2); border: 1px solid var(--border2);
   border-radius: 6px; padding: 5px 12px;
   font-size: 11px; color: var(--text-dim); font-family: var(--mono);
-}}
-.live-dot {{
+}
+.live-dot {
   width: 7px; height: 7px; border-radius: 50%; background: var(--green);
   box-shadow: 0 0 6px var(--green); animation: pulse 2s infinite;
-}}
-@keyframes pulse {{ 0%,100% {{ opacity:1 }} 50% {{ opacity:.4 }} }}
+}
+@keyframes pulse { 0%,100% { opacity:1 } 50% { opacity:.4 } }
 
 /* ── KPI GRID ── */
-.kpi-grid {{
+.kpi-grid {
   display: grid; grid-template-columns: repeat(4, 1fr); gap: 12px;
-}}
-.kpi {{
+}
+.kpi {
   background: var(--surface2); border: 1px solid var(--border);
   border-radius: 8px; padding: 14px 16px;
   position: relative; overflow: hidden;
-}}
-.kpi::before {{
+}
+.kpi::before {
   content: ''; position: absolute; top: 0; left: 0; right: 0; height: 2px;
-}}
-.kpi.g::before {{ background: var(--green); }}
-.kpi.r::before {{ background: var(--red); }}
-.kpi.b::before {{ background: var(--blue); }}
-.kpi.o::before {{ background: var(--gold2); }}
-.kpi-label {{ font-size: 10px; color: var(--text-muted); letter-spacing: 1.5px; text-transform: uppercase; margin-bottom: 6px; }}
-.kpi-val {{ font-size: 24px; font-weight: 700; font-family: var(--mono); line-height: 1; }}
-.kpi-val.g {{ color: var(--green); }} .kpi-val.r {{ color: var(--red); }}
-.kpi-val.b {{ color: var(--blue); }} .kpi-val.o {{ color: var(--gold2); }}
-.kpi-sub {{ font-size: 11px; color: var(--text-muted); margin-top: 4px; }}
+}
+.kpi.g::before { background: var(--green); }
+.kpi.r::before { background: var(--red); }
+.kpi.b::before { background: var(--blue); }
+.kpi.o::before { background: var(--gold2); }
+.kpi-label { font-size: 10px; color: var(--text-muted); letter-spacing: 1.5px; text-transform: uppercase; margin-bottom: 6px; }
+.kpi-val { font-size: 24px; font-weight: 700; font-family: var(--mono); line-height: 1; }
+.kpi-val.g { color: var(--green); } .kpi-val.r { color: var(--red); }
+.kpi-val.b { color: var(--blue); } .kpi-val.o { color: var(--gold2); }
+.kpi-sub { font-size: 11px; color: var(--text-muted); margin-top: 4px; }
 
 /* ── TOOLBAR ── */
-.toolbar {{
+.toolbar {
   display: flex; align-items: center; gap: 10px;
   padding: 16px 32px; background: var(--surface);
   border-bottom: 1px solid var(--border);
   flex-wrap: wrap;
-}}
-.search-wrap {{ position: relative; flex: 0 0 280px; }}
-.search-wrap input {{
+}
+.search-wrap { position: relative; flex: 0 0 280px; }
+.search-wrap input {
   width: 100%; background: var(--surface2); border: 1px solid var(--border2);
   border-radius: 6px; padding: 8px 12px 8px 34px;
   color: var(--text); font-family: var(--font); font-size: 13px;
   outline: none; transition: border-color .15s;
-}}
-.search-wrap input:focus {{ border-color: var(--blue); }}
-.search-ico {{
+}
+.search-wrap input:focus { border-color: var(--blue); }
+.search-ico {
   position: absolute; left: 11px; top: 50%; transform: translateY(-50%);
   color: var(--text-muted); font-size: 13px;
-}}
-select {{
+}
+select {
   background: var(--surface2); border: 1px solid var(--border2);
   border-radius: 6px; padding: 8px 28px 8px 10px;
   color: var(--text); font-family: var(--font); font-size: 12px;
@@ -405,109 +738,397 @@ select {{
   background-image: url("data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' width='12' height='12' viewBox='0 0 12 12'%3E%3Cpath fill='%238b949e' d='M6 8L1 3h10z'/%3E%3C/svg%3E");
   background-repeat: no-repeat; background-position: right 8px center;
   transition: border-color .15s;
-}}
-select:focus {{ border-color: var(--blue); }}
-.toolbar-sep {{ width: 1px; height: 24px; background: var(--border2); }}
-.count-info {{ font-size: 12px; color: var(--text-muted); margin-left: auto; font-family: var(--mono); }}
+}
+select:focus { border-color: var(--blue); }
+.toolbar-sep { width: 1px; height: 24px; background: var(--border2); }
+.count-info { font-size: 12px; color: var(--text-muted); margin-left: auto; font-family: var(--mono); }
 
 /* ── TABS ── */
-.tabs-row {{
+.tabs-row {
   display: flex; gap: 2px; padding: 12px 32px 0;
   background: var(--surface); border-bottom: 1px solid var(--border);
-}}
-.tab {{
+}
+.tab {
   padding: 8px 18px; cursor: pointer; font-size: 13px; font-weight: 500;
   color: var(--text-dim); border-bottom: 2px solid transparent;
   margin-bottom: -1px; transition: all .15s; border-radius: 4px 4px 0 0;
   white-space: nowrap;
-}}
-.tab:hover {{ color: var(--text); background: var(--surface2); }}
-.tab.active {{ color: var(--blue); border-bottom-color: var(--blue); }}
+}
+.tab:hover { color: var(--text); background: var(--surface2); }
+.tab.active { color: var(--blue); border-bottom-color: var(--blue); }
 
 /* ── MAIN ── */
-.main {{ padding: 24px 32px; }}
-.panel {{ display: none; }} .panel.active {{ display: block; }}
+.main { padding: 24px 32px; }
+.panel { display: none; } .panel.active { display: block; }
 
 /* ── TABLE ── */
-.card {{
+.card {
   background: var(--surface); border: 1px solid var(--border);
   border-radius: 10px; overflow: hidden;
-}}
-.card-hd {{
+}
+.card-hd {
   display: flex; justify-content: space-between; align-items: center;
   padding: 14px 18px; border-bottom: 1px solid var(--border);
   background: var(--surface2);
-}}
-.card-title {{ font-size: 13px; font-weight: 600; display: flex; align-items: center; gap: 8px; }}
-.n-badge {{
+}
+.card-title { font-size: 13px; font-weight: 600; display: flex; align-items: center; gap: 8px; }
+.n-badge {
   background: var(--surface3); border: 1px solid var(--border2);
   border-radius: 20px; padding: 1px 8px; font-size: 11px;
   color: var(--text-dim); font-family: var(--mono);
-}}
-table {{ width: 100%; border-collapse: collapse; }}
-thead th {{
+}
+table { width: 100%; border-collapse: collapse; }
+thead th {
   padding: 9px 14px; text-align: left; font-size: 10px;
   color: var(--text-muted); letter-spacing: 1.5px; text-transform: uppercase;
   background: var(--surface2); cursor: pointer; user-select: none;
   white-space: nowrap; transition: color .15s; font-weight: 500;
   border-bottom: 1px solid var(--border);
-}}
-thead th:hover {{ color: var(--text); }}
-tbody tr {{
+}
+thead th:hover { color: var(--text); }
+tbody tr {
   border-top: 1px solid var(--border);
   transition: background .1s;
-}}
-tbody tr:hover {{ background: rgba(88,166,255,.04); }}
-tbody tr.hidden {{ display: none; }}
-td {{ padding: 10px 14px; vertical-align: middle; }}
-.chip-link {{
+}
+tbody tr:hover { background: rgba(88,166,255,.04); }
+tbody tr.hidden { display: none; }
+tbody tr.spacer, tbody tr.spacer:hover { border: 0; background: none; }
+.tbl-wrap { max-height: 72vh; overflow-y: auto; }
+.tbl-wrap thead th { position: sticky; top: 0; z-index: 1; }
+.tbl-wrap .td-name { white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }
+td { padding: 10px 14px; vertical-align: middle; }
+.chip-link {
   text-decoration: none;
   cursor: pointer;
   transition: background 0.15s, color 0.15s;
-}}
-.chip-link:hover {{
+}
+.chip-link:hover {
   background: #388bfd33;
   color: #79c0ff;
-}}
-.chip {{
+}
+.chip {
   background: rgba(88,166,255,.1); border: 1px solid rgba(88,166,255,.2);
   color: var(--blue); border-radius: 5px; padding: 2px 7px;
   font-size: 11px; font-family: var(--mono); white-space: nowrap; font-weight: 500;
-}}
-.td-name {{ color: var(--text); font-size: 12px; font-weight: 500; max-width: 220px; }}
-.td-dim  {{ color: var(--text-dim); font-size: 11px; }}
-.td-cur  {{ color: var(--text-muted); font-size: 10px; }}
-.td-num  {{ text-align: right; font-family: var(--mono); font-size: 12px; }}
-.td-bold {{ font-weight: 600; }}
-.flag    {{ font-size: 14px; }}
-.pos {{ color: var(--green); }} .neg {{ color: var(--red); }}
-.sector-tag {{
+}
+.td-name { color: var(--text); font-size: 12px; font-weight: 500; max-width: 220px; }
+.td-dim  { color: var(--text-dim); font-size: 11px; }
+.td-cur  { color: var(--text-muted); font-size: 10px; }
+.td-num  { text-align: right; font-family: var(--mono); font-size: 12px; }
+.td-bold { font-weight: 600; }
+.flag    { font-size: 14px; }
+.pos { color: var(--green); } .neg { color: var(--red); }
+.sector-tag {
   display: inline-block; border-radius: 4px; padding: 2px 7px;
   font-size: 10px; font-weight: 500; border: 1px solid;
   white-space: nowrap;
-}}
-{sector_css}
-.badge {{ border-radius: 4px; padding: 1px 5px; font-size: 10px; margin-left: 4px; }}
-.hot  {{ background: rgba(248,81,73,.15); color: var(--red); border: 1px solid rgba(248,81,73,.25); }}
-.warm {{ background: rgba(210,153,34,.15); color: var(--gold2); border: 1px solid rgba(210,153,34,.25); }}
+}
+/* SECTOR_CSS */
+.badge { border-radius: 4px; padding: 1px 5px; font-size: 10px; margin-left: 4px; }
+.hot  { background: rgba(248,81,73,.15); color: var(--red); border: 1px solid rgba(248,81,73,.25); }
+.warm { background: rgba(210,153,34,.15); color: var(--gold2); border: 1px solid rgba(210,153,34,.25); }
+
+/* ── MARKT ── */
+.mkt-grid { display: grid; grid-template-columns: repeat(2, minmax(0, 1fr)); gap: 16px; }
+.mkt-body { padding: 14px 18px; }
+.mkt-body svg { width: 100%; height: 140px; display: block; }
+.mkt-legend { font-size: 11px; color: var(--text-dim); font-family: var(--mono); margin-top: 8px; }
+.mkt-tbl thead th { cursor: default; }
+.mkt-tbl td { padding: 7px 14px; }
+.breadth { display: inline-block; width: 60px; height: 6px; border-radius: 3px; background: rgba(248,81,73,.35);
+           vertical-align: middle; margin-right: 6px; overflow: hidden; }
+.breadth span { display: block; height: 100%; background: var(--green); }
+.heat td, .heat th { padding: 6px 8px; text-align: center; font-family: var(--mono); font-size: 11px; }
+.heat th { text-transform: none; letter-spacing: 0; }
 
 /* ── FOOTER ── */
-.ft {{
+.ft {
   padding: 16px 32px; border-top: 1px solid var(--border);
   display: flex; justify-content: space-between; align-items: center;
   font-size: 11px; color: var(--text-muted); background: var(--surface);
-}}
-
-@media (max-width: 768px) {{
-  .hd, .toolbar, .tabs-row, .main, .ft {{ padding-left: 16px; padding-right: 16px; }}
-  .kpi-grid {{ grid-template-columns: repeat(2,1fr); }}
-  .search-wrap {{ flex: 1 1 100%; }}
-  .td-name {{ max-width: 130px; overflow: hidden; text-overflow: ellipsis; white-space: nowrap; }}
-}}
-</style>
+}
+
+@media (max-width: 768px) {
+  .hd, .toolbar, .tabs-row, .main, .ft { padding-left: 16px; padding-right: 16px; }
+  .kpi-grid { grid-template-columns: repeat(2,1fr); }
+  .mkt-grid { grid-template-columns: 1fr; }
+  .search-wrap { flex: 1 1 100%; }
+  .td-name { max-width: 130px; overflow: hidden; text-overflow: ellipsis; white-space: nowrap; }
+}"""
+
+SCRIPT = """function showTab(name, el) {
+  document.querySelectorAll('.panel').forEach(p => p.classList.remove('active'));
+  document.querySelectorAll('.tab').forEach(t => t.classList.remove('active'));
+  document.getElementById('p-' + name).classList.add('active');
+  el.classList.add('active');
+  if (typeof draw === 'function' && VIEWS['t-' + name]) draw('t-' + name);
+}"""
+
+STATIC_SCRIPT = """function applyFilters() {
+  const q       = document.getElementById('q').value.toLowerCase();
+  const country = document.getElementById('f-country').value;
+  const sector  = document.getElementById('f-sector').value;
+  let visible   = 0;
+  document.querySelectorAll('#t-all tbody tr').forEach(row => {
+    const text = row.textContent.toLowerCase();
+    const rc   = row.dataset.country;
+    const rs   = row.dataset.sector;
+    const show = (!q || text.includes(q))
+              && (!country || rc === country)
+              && (!sector  || rs === sector);
+    row.classList.toggle('hidden', !show);
+    if (show) visible++;
+  });
+  document.getElementById('row-count').textContent = visible + ' Ergebnisse';
+  document.getElementById('cnt-all').textContent   = visible;
+}
+
+function sortT(tableId, colIdx) {
+  const table = document.getElementById(tableId);
+  const tbody = table.querySelector('tbody');
+  const th    = table.querySelectorAll('thead th')[colIdx];
+  const asc   = th.dataset.dir !== 'asc';
+  table.querySelectorAll('thead th').forEach(t => delete t.dataset.dir);
+  th.dataset.dir = asc ? 'asc' : 'desc';
+  th.textContent = th.textContent.replace(/ [▲▼]$/,'') + (asc ? ' ▲' : ' ▼');
+  const rows = [...tbody.querySelectorAll('tr')];
+  rows.sort((a, b) => {
+    const av = a.cells[colIdx].textContent.replace(/[^0-9.\-]/g,'');
+    const bv = b.cells[colIdx].textContent.replace(/[^0-9.\-]/g,'');
+    const an = parseFloat(av), bn = parseFloat(bv);
+    if (!isNaN(an) && !isNaN(bn)) return asc ? an - bn : bn - an;
+    return asc
+      ? a.cells[colIdx].textContent.localeCompare(b.cells[colIdx].textContent)
+      : b.cells[colIdx].textContent.localeCompare(a.cells[colIdx].textContent);
+  });
+  rows.forEach(r => tbody.appendChild(r));
+}"""
+
+TABLE_COLUMNS = [("Ticker", False), ("Unternehmen", False), ("Land", False), ("Sektor", False),
+                 ("Kurs", True), ("% Change", True), ("Vol. Ratio", True), ("20 Tage", True), ("RSI", True)]
+
+ROW_CHUNK = 500     # Zeilen pro geschriebenem Block
+
+# static: Tabellen serverseitig als HTML · inline: Daten als JSON im HTML, Tabellen im Browser
+# json: wie inline, Daten aber in docs/data.json (separat cache- und komprimierbar)
+# live: wie json, dazu Zeilen-Diffs per Server-Sent Events (nur über screener_server.py)
+RENDER_MODE = os.environ.get("SCREENER_RENDER", "inline")
+RENDER_MODES = ("static", "inline", "json", "live")
+
+CLIENT_SCRIPT = """// Suchindex, Typed-Array-Sortierung und virtuelles Rendern: nur sichtbare Zeilen landen im DOM
+const VIRTUAL_MIN = 150, OVERSCAN = 12;
+const VIEWS = {}, IDX = {};
+let filterTimer = null, frame = null;
+
+const esc = s => String(s).replace(/[&<>"]/g, c => ({'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;'}[c]));
+
+function tvLink(t) {
+  for (const [suffix, ex] of Object.entries(D.tv))
+    if (t.endsWith(suffix)) return 'https://www.tradingview.com/chart/?symbol=' + ex + '%3A' + t.slice(0, -suffix.length);
+  return 'https://www.tradingview.com/search/?query=' + t;
+}
+
+function rowHtml(i) {
+  const c = D.data, pct = IDX.pct[i], vr = IDX.vol[i], r20 = IDX.ret20[i], rsi = IDX.rsi[i];
+  const country = D.countries[c.country[i]], sector = D.sectors[c.sector[i]];
+  const badge = vr >= 3 ? '<span class="badge hot">🔥</span>' : vr >= 2 ? '<span class="badge warm">↑</span>' : '';
+  return '<tr data-country="' + esc(country) + '" data-sector="' + esc(sector) + '">'
+    + '<td><a href="' + tvLink(c.ticker[i]) + '" target="_blank" rel="noopener" class="chip chip-link">' + esc(c.ticker[i]) + '</a></td>'
+    + '<td class="td-name">' + esc(c.name[i]) + '</td>'
+    + '<td><span class="flag">' + D.flags[c.country[i]] + '</span> <span class="td-dim">' + esc(country) + '</span></td>'
+    + '<td><span class="sector-tag s-' + D.slugs[c.sector[i]] + '">' + esc(sector) + '</span></td>'
+    + '<td class="td-num">' + IDX.close[i].toFixed(2) + ' <span class="td-cur">' + D.currencies[c.currency[i]] + '</span></td>'
+    + '<td class="td-num ' + (pct >= 0 ? 'pos' : 'neg') + ' td-bold">' + (pct >= 0 ? '▲' : '▼') + ' ' + Math.abs(pct).toFixed(2) + '%</td>'
+    + '<td class="td-num">' + vr.toFixed(1) + 'x ' + badge + '</td>'
+    + '<td class="td-num ' + (isNaN(r20) ? '' : r20 >= 0 ? 'pos' : 'neg') + '">' + (isNaN(r20) ? '–' : (r20 >= 0 ? '+' : '') + r20.toFixed(1) + '%') + '</td>'
+    + '<td class="td-num td-dim">' + (isNaN(rsi) ? '–' : rsi.toFixed(0)) + '</td></tr>';
+}
+
+// Rang je Textspalte einmalig berechnen → Sortieren vergleicht nur noch Zahlen
+function ranks(labels) {
+  const order = [...labels.keys()].sort((a, b) => labels[a].localeCompare(labels[b]));
+  const r = new Int32Array(labels.length);
+  order.forEach((i, k) => { r[i] = k; });
+  return r;
+}
+
+function buildIndex() {
+  const c = D.data, n = c.ticker.length;
+  IDX.close = Float64Array.from(c.close);
+  IDX.pct   = Float64Array.from(c.pct_change);
+  IDX.vol   = Float64Array.from(c.vol_ratio);
+  IDX.ret20 = Float64Array.from(c.ret_20d, v => v ?? NaN);
+  IDX.rsi   = Float64Array.from(c.rsi_14, v => v ?? NaN);
+  const sortable = a => a.map(v => isNaN(v) ? -Infinity : v);
+  IDX.country = Int32Array.from(c.country);
+  IDX.sector  = Int32Array.from(c.sector);
+  IDX.text  = c.ticker.map((t, i) => (t + ' ' + c.name[i] + ' ' + D.countries[c.country[i]] + ' ' + D.sectors[c.sector[i]]).toLowerCase());
+  const countryRank = ranks(D.countries), sectorRank = ranks(D.sectors);
+  IDX.keys = [
+    ranks(c.ticker), ranks(c.name),
+    Int32Array.from(c.country, k => countryRank[k]), Int32Array.from(c.sector, k => sectorRank[k]),
+    IDX.close, IDX.pct, IDX.vol, sortable(IDX.ret20), sortable(IDX.rsi),
+  ];
+  IDX.all = new Int32Array(n).map((_, i) => i);
+}
+
+function setView(tableId, rows) {
+  const wrap = document.getElementById('w-' + tableId.slice(2));
+  VIEWS[tableId] = VIEWS[tableId] || { wrap, base: rows, rowH: 41 };
+  VIEWS[tableId].base = rows;
+  VIEWS[tableId].rows = rows;
+  if (wrap && !wrap.dataset.bound) {
+    wrap.dataset.bound = '1';
+    wrap.addEventListener('scroll', () => {
+      if (!frame) frame = requestAnimationFrame(() => { frame = null; draw(tableId); });
+    }, { passive: true });
+  }
+}
+
+function spacer(h) {
+  return h > 0 ? '<tr class="spacer" style="height:' + h + 'px"><td colspan="' + IDX.keys.length + '"></td></tr>' : '';
+}
+
+function draw(tableId) {
+  const v = VIEWS[tableId], tbody = document.querySelector('#' + tableId + ' tbody'), n = v.rows.length;
+  if (n <= VIRTUAL_MIN || !v.wrap) {
+    tbody.innerHTML = Array.from(v.rows, rowHtml).join('');
+    return;
+  }
+  const first = Math.max(0, Math.floor(v.wrap.scrollTop / v.rowH) - OVERSCAN);
+  const last  = Math.min(n, first + Math.ceil((v.wrap.clientHeight || 800) / v.rowH) + 2 * OVERSCAN);
+  let html = spacer(first * v.rowH);
+  for (let k = first; k < last; k++) html += rowHtml(v.rows[k]);
+  tbody.innerHTML = html + spacer((n - last) * v.rowH);
+  const probe = tbody.rows[first ? 1 : 0];
+  if (!v.measured && probe && probe.offsetHeight) {
+    v.measured = true;
+    if (Math.abs(probe.offsetHeight - v.rowH) > 1) { v.rowH = probe.offsetHeight; draw(tableId); }
+  }
+}
+
+function applyFilters() {
+  clearTimeout(filterTimer);
+  filterTimer = setTimeout(filterNow, 80);
+}
+
+function filterNow() {
+  const q       = document.getElementById('q').value.toLowerCase().trim();
+  const country = D.countries.indexOf(document.getElementById('f-country').value);
+  const sector  = D.sectors.indexOf(document.getElementById('f-sector').value);
+  const v = VIEWS['t-all'], base = v.base, out = new Int32Array(base.length);
+  let n = 0;
+  for (let k = 0; k < base.length; k++) {
+    const i = base[k];
+    if ((country < 0 || IDX.country[i] === country)
+        && (sector < 0 || IDX.sector[i] === sector)
+        && (!q || IDX.text[i].includes(q))) out[n++] = i;
+  }
+  v.rows = out.subarray(0, n);
+  if (v.wrap) v.wrap.scrollTop = 0;
+  draw('t-all');
+  document.getElementById('row-count').textContent = n + ' Ergebnisse';
+  document.getElementById('cnt-all').textContent   = n;
+}
+
+function sortT(tableId, colIdx) {
+  const table = document.getElementById(tableId);
+  const th    = table.querySelectorAll('thead th')[colIdx];
+  const asc   = th.dataset.dir !== 'asc';
+  table.querySelectorAll('thead th').forEach(t => delete t.dataset.dir);
+  th.dataset.dir = asc ? 'asc' : 'desc';
+  th.textContent = th.textContent.replace(/ [▲▼]$/,'') + (asc ? ' ▲' : ' ▼');
+  const key = IDX.keys[colIdx], dir = asc ? 1 : -1, v = VIEWS[tableId];
+  v.base = Int32Array.from(v.base).sort((a, b) => (key[a] - key[b]) * dir || a - b);
+  if (tableId === 't-all') filterNow();
+  else { v.rows = v.base; draw(tableId); }
+}
+
+// Die vier Tabs sind Sichten auf denselben Datensatz (sortiert nach % Change absteigend)
+function topViews() {
+  const all = IDX.all, pct = IDX.pct, vol = IDX.vol;
+  setView('t-gainers', all.filter(i => pct[i] > 0).sort((a, b) => pct[b] - pct[a] || a - b).slice(0, 20));
+  setView('t-losers', all.filter(i => pct[i] < 0).sort((a, b) => pct[a] - pct[b] || a - b).slice(0, 20));
+  setView('t-volume', all.filter(i => vol[i] >= 1.5).sort((a, b) => vol[b] - vol[a] || a - b).slice(0, 20));
+  ['t-gainers', 't-losers', 't-volume'].forEach(draw);
+}
+
+function renderViews() {
+  buildIndex();
+  setView('t-all', IDX.all);
+  topViews();
+  filterNow();
+}"""
+
+LIVE_SCRIPT = """// Live: geänderte Zeilen in D und IDX einspielen – "Alle" behält Sortierung, Filter und Scrollposition
+const LIVE_FIELDS = {close: ['close', 4], pct_change: ['pct', 5], vol_ratio: ['vol', 6], ret_20d: ['ret20', 7], rsi_14: ['rsi', 8]};
+let POS = null;
+
+function applyRows(rows) {
+  POS = POS || new Map(D.data.ticker.map((t, i) => [t, i]));
+  for (const row of rows) {
+    const i = POS.get(row.ticker);
+    if (i === undefined) continue;
+    for (const [f, [name, key]] of Object.entries(LIVE_FIELDS)) {
+      const v = row[f] ?? NaN;
+      D.data[f][i] = row[f];
+      IDX[name][i] = v;
+      IDX.keys[key][i] = isNaN(v) ? -Infinity : v;
+    }
+  }
+  topViews();
+  draw('t-all');
+}
+
+function reloadData() {
+  fetch('data.json', {cache: 'no-cache'}).then(r => r.json()).then(d => { D = d; POS = null; renderViews(); });
+}
+
+const live = new EventSource('api/stream');
+live.addEventListener('rows', e => {
+  const d = JSON.parse(e.data);
+  if (D) applyRows(d.rows);
+  document.getElementById('live-status').textContent = 'Live · ' + d.time + ' · ' + d.rows.length + ' Ticker aktualisiert';
+});
+live.addEventListener('reload', reloadData);
+live.onerror = () => { document.getElementById('live-status').textContent = 'Live · Verbindung unterbrochen'; };"""
+
+
+def sector_css():
+    return "\n".join(
+        f'.s-{sector_slug(s)} {{ background: #{c}22; color: #{c}; border-color: #{c}44; }}'
+        for s, c in UNIVERSE.sector_colors.items()
+    )
+
+
+def _html_head(date_str, assets=None):
+    """assets: dashboard_assets() – CSS/JS/Fonts als eigene Dateien, sonst alles inline."""
+    if assets:
+        links = "\n".join(
+            f'<link rel="preload" href="{p}" as="font" type="font/woff2" crossorigin>' if p.endswith(".woff2") else
+            f'<link rel="stylesheet" href="{p}">' if p.endswith(".css") else
+            f'<script src="{p}" defer></script>' for p in assets)
+    else:
+        links = "<style>\n" + dashboard_css() + "\n</style>"
+    return f"""<!DOCTYPE html>
+<html lang="de">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width,initial-scale=1">
+<title>EU Screener – {date_str}</title>
+{links}
 </head>
 <body>
+"""
 
+
+def _html_header(df, date_str):
+    market_avg      = df["pct_change"].mean()
+    positive_count  = int((df["pct_change"] > 0).sum())
+    total_count     = len(df)
+    top_g           = df.iloc[0]
+    top_l           = df.iloc[-1]
+    return f"""
 <div class="hd">
   <div class="hd-top">
     <div class="logo">
@@ -546,7 +1167,14 @@ td {{ padding: 10px 14px; vertical-align: middle; }}
     </div>
   </div>
 </div>
+"""
 
+
+def _html_toolbar(df):
+    total_count  = len(df)
+    country_opts = "".join(f'<option value="{c}">{country_flag(c)} {c}</option>' for c in sorted(df["country"].unique()))
+    sector_opts  = "".join(f'<option value="{s}">{s}</option>' for s in sorted(df["sector"].unique()))
+    return f"""
 <div class="toolbar">
   <div class="search-wrap">
     <span class="search-ico">🔍</span>
@@ -569,165 +1197,714 @@ td {{ padding: 10px 14px; vertical-align: middle; }}
   <div class="tab" onclick="showTab('gainers',this)">📈 Top Gainer</div>
   <div class="tab" onclick="showTab('losers',this)">📉 Top Loser</div>
   <div class="tab" onclick="showTab('volume',this)">🔥 Volumen</div>
+  <div class="tab" onclick="showTab('market',this)">🧭 Markt</div>
 </div>
 
 <div class="main">
+"""
 
-  <div id="p-all" class="panel active">
-    <div class="card">
-      <div class="card-hd">
-        <div class="card-title">Alle Aktien <span class="n-badge" id="cnt-all">{total_count}</span></div>
-        <div style="font-size:11px;color:var(--text-dim)">Sortierbar per Klick auf Spalte</div>
-      </div>
-      <table id="t-all">
-        <thead><tr>
-          <th onclick="sortT('t-all',0)">Ticker</th>
-          <th onclick="sortT('t-all',1)">Unternehmen</th>
-          <th onclick="sortT('t-all',2)">Land</th>
-          <th onclick="sortT('t-all',3)">Sektor</th>
-          <th onclick="sortT('t-all',4)" style="text-align:right">Kurs</th>
-          <th onclick="sortT('t-all',5)" style="text-align:right">% Change</th>
-          <th onclick="sortT('t-all',6)" style="text-align:right">Vol. Ratio</th>
-        </tr></thead>
-        <tbody>{rows_html(df)}</tbody>
-      </table>
-    </div>
-  </div>
 
-  <div id="p-gainers" class="panel">
+def _iter_panel(name, title, badge, subtitle, subset, active=False, client=False):
+    table_id = f"t-{name}"
+    ths = "\n".join(
+        f"""          <th onclick="sortT('{table_id}',{i})"{' style="text-align:right"' if right else ''}>{label}</th>"""
+        for i, (label, right) in enumerate(TABLE_COLUMNS)
+    )
+    yield f"""
+  <div id="p-{name}" class="panel{' active' if active else ''}">
     <div class="card">
       <div class="card-hd">
-        <div class="card-title">📈 Top Gainer <span class="n-badge">{len(gainers)}</span></div>
-        <div style="font-size:11px;color:var(--text-dim)">Stärkste Aufwärtsbewegungen heute</div>
+        <div class="card-title">{title} {badge}</div>
+        <div style="font-size:11px;color:var(--text-dim)">{subtitle}</div>
       </div>
-      <table id="t-gainers">
+      {f'<div class="tbl-wrap" id="w-{name}">' if client else ''}<table id="{table_id}">
         <thead><tr>
-          <th onclick="sortT('t-gainers',0)">Ticker</th>
-          <th onclick="sortT('t-gainers',1)">Unternehmen</th>
-          <th onclick="sortT('t-gainers',2)">Land</th>
-          <th onclick="sortT('t-gainers',3)">Sektor</th>
-          <th onclick="sortT('t-gainers',4)" style="text-align:right">Kurs</th>
-          <th onclick="sortT('t-gainers',5)" style="text-align:right">% Change</th>
-          <th onclick="sortT('t-gainers',6)" style="text-align:right">Vol. Ratio</th>
+{ths}
         </tr></thead>
-        <tbody>{rows_html(gainers)}</tbody>
-      </table>
+        <tbody>"""
+    if not client:
+        for i in range(0, len(subset), ROW_CHUNK):
+            yield rows_html(subset.iloc[i:i + ROW_CHUNK])
+    yield f"""</tbody>
+      </table>{'</div>' if client else ''}
     </div>
   </div>
+"""
 
-  <div id="p-losers" class="panel">
-    <div class="card">
-      <div class="card-hd">
-        <div class="card-title">📉 Top Loser <span class="n-badge">{len(losers)}</span></div>
-        <div style="font-size:11px;color:var(--text-dim)">Stärkste Abwärtsbewegungen heute</div>
-      </div>
-      <table id="t-losers">
-        <thead><tr>
-          <th onclick="sortT('t-losers',0)">Ticker</th>
-          <th onclick="sortT('t-losers',1)">Unternehmen</th>
-          <th onclick="sortT('t-losers',2)">Land</th>
-          <th onclick="sortT('t-losers',3)">Sektor</th>
-          <th onclick="sortT('t-losers',4)" style="text-align:right">Kurs</th>
-          <th onclick="sortT('t-losers',5)" style="text-align:right">% Change</th>
-          <th onclick="sortT('t-losers',6)" style="text-align:right">Vol. Ratio</th>
-        </tr></thead>
-        <tbody>{rows_html(losers)}</tbody>
-      </table>
-    </div>
-  </div>
 
-  <div id="p-volume" class="panel">
-    <div class="card">
-      <div class="card-hd">
-        <div class="card-title">🔥 Volumen-Anomalien <span class="n-badge">{len(volume_top)}</span></div>
-        <div style="font-size:11px;color:var(--text-dim)">Volumen ≥ 1.5× 20-Tage-Durchschnitt</div>
+def _pct(v, digits=2):
+    if pd.isna(v):
+        return '<span class="td-dim">–</span>'
+    return f'<span class="{"pos" if v >= 0 else "neg"}">{"+" if v >= 0 else ""}{v:.{digits}f}%</span>'
+
+
+def _ad_svg(ad, width=600, height=140):
+    """A/D-Linie als Inline-SVG (Polyline), Nulllinie gestrichelt."""
+    line = ad["line"].to_numpy(dtype=float)
+    if len(line) < 2:
+        return ""
+    lo, hi = min(line.min(), 0), max(line.max(), 0)
+    span   = (hi - lo) or 1
+    y      = lambda v: height - 6 - (v - lo) / span * (height - 12)
+    pts    = " ".join(f"{i * width / (len(line) - 1):.1f},{y(v):.1f}" for i, v in enumerate(line))
+    color  = "var(--green)" if line[-1] >= 0 else "var(--red)"
+    return (f'<svg viewBox="0 0 {width} {height}" preserveAspectRatio="none">'
+            f'<line x1="0" x2="{width}" y1="{y(0):.1f}" y2="{y(0):.1f}" stroke="var(--border2)" stroke-dasharray="4 4"/>'
+            f'<polyline points="{pts}" fill="none" stroke="{color}" stroke-width="2" vector-effect="non-scaling-stroke"/></svg>')
+
+
+def _group_table(agg, label, fmt_label):
+    rows = "".join(f"""
+        <tr><td>{fmt_label(k)}</td><td class="td-num td-dim">{int(r['count'])}</td>
+          <td class="td-num">{_pct(r['mean'])}</td><td class="td-num">{_pct(r['median'])}</td>
+          <td class="td-num"><span class="breadth"><span style="width:{r['breadth'] * 100:.0f}%"></span></span>{r['breadth'] * 100:.0f}%</td>
+          <td class="td-num">{_pct(r['vw_return'])}</td>
+          <td class="td-num td-dim">{_num(r.get('turnover', np.nan) / 1e6, "{:,.1f} Mio")}</td></tr>""" for k, r in agg.iterrows())
+    return f"""<table class="mkt-tbl">
+        <thead><tr><th>{label}</th><th style="text-align:right">Aktien</th><th style="text-align:right">Ø</th>
+          <th style="text-align:right">Median</th><th style="text-align:right">Breite</th><th style="text-align:right">Umsatzgew.</th>
+          <th style="text-align:right">Umsatz €</th></tr></thead>
+        <tbody>{rows}
+        </tbody>
+      </table>"""
+
+
+def _heat_table(corr):
+    def cell(v):
+        if pd.isna(v):
+            return '<td class="td-dim">–</td>'
+        rgb = "63,185,80" if v >= 0 else "248,81,73"
+        return f'<td style="background:rgba({rgb},{min(abs(v), 1) * .6:.2f})">{v:.2f}</td>'
+    head = "".join(f'<th title="{c}">{c[:4]}</th>' for c in corr.columns)
+    body = "".join(f'<tr><th style="text-align:left">{k}</th>{"".join(cell(v) for v in row)}</tr>'
+                   for k, row in zip(corr.index, corr.to_numpy()))
+    return f'<table class="heat"><thead><tr><th></th>{head}</tr></thead><tbody>{body}</tbody></table>'
+
+
+def _market_panel(analytics):
+    """Markt-Ansicht: A/D-Linie, Sektor-Korrelationen, Sektor- und Länder-Aggregate."""
+    ad, corr = analytics.get("ad"), analytics.get("sector_corr")
+    cards = []
+    if ad is not None and len(ad):
+        last = ad.iloc[-1]
+        cards.append(f"""
+      <div class="card">
+        <div class="card-hd">
+          <div class="card-title">📊 Advance/Decline</div>
+          <div style="font-size:11px;color:var(--text-dim)">kumuliert, letzte {len(ad)} Handelstage</div>
+        </div>
+        <div class="mkt-body">{_ad_svg(ad)}
+          <div class="mkt-legend">Letzter Tag: <span class="pos">{int(last['advancers'])} ▲</span> ·
+            <span class="neg">{int(last['decliners'])} ▼</span> · {int(last['unchanged'])} unverändert · A/D-Linie {int(last['line']):+d}</div>
+        </div>
+      </div>""")
+    if corr is not None and len(corr):
+        cards.append(f"""
+      <div class="card">
+        <div class="card-hd">
+          <div class="card-title">🔗 Korrelation der Sektoren</div>
+          <div style="font-size:11px;color:var(--text-dim)">Ø paarweise, {len(ad)} Tage · Universum Ø {analytics['avg_corr']:.2f}</div>
+        </div>
+        <div class="mkt-body" style="overflow-x:auto">{_heat_table(corr)}</div>
+      </div>""")
+    cards.append(f"""
+      <div class="card">
+        <div class="card-hd"><div class="card-title">📂 Sektoren</div></div>
+        {_group_table(analytics["sectors"], "Sektor", lambda s: f'<span class="sector-tag s-{sector_slug(s)}">{s}</span>')}
       </div>
-      <table id="t-volume">
-        <thead><tr>
-          <th onclick="sortT('t-volume',0)">Ticker</th>
-          <th onclick="sortT('t-volume',1)">Unternehmen</th>
-          <th onclick="sortT('t-volume',2)">Land</th>
-          <th onclick="sortT('t-volume',3)">Sektor</th>
-          <th onclick="sortT('t-volume',4)" style="text-align:right">Kurs</th>
-          <th onclick="sortT('t-volume',5)" style="text-align:right">% Change</th>
-          <th onclick="sortT('t-volume',6)" style="text-align:right">Vol. Ratio</th>
-        </tr></thead>
-        <tbody>{rows_html(volume_top)}</tbody>
-      </table>
+      <div class="card">
+        <div class="card-hd"><div class="card-title">🌍 Länder</div></div>
+        {_group_table(analytics["countries"], "Land", lambda c: f'<span class="flag">{country_flag(c)}</span> {c}')}
+      </div>""")
+    return f"""
+  <div id="p-market" class="panel">
+    <div class="mkt-grid">{"".join(cards)}
     </div>
   </div>
+"""
+
+
+def screener_payload(df, date_str=None, generated_at=None):
+    """Kompakter, spaltenorientierter Datensatz: Land/Sektor/Währung als Index
+    in kleine Lookup-Listen, Flaggen und Sektor-Slugs nur einmal pro Wert."""
+    countries  = sorted(df["country"].unique())
+    sectors    = sorted(df["sector"].unique())
+    currencies = sorted(df["currency"].unique())
+    codes = lambda col, cats: pd.Categorical(df[col], categories=cats).codes.tolist()
+    return {
+        "date":       date_str,
+        "generated":  generated_at,
+        "countries":  countries,
+        "flags":      [country_flag(c) for c in countries],
+        "sectors":    sectors,
+        "slugs":      [sector_slug(s) for s in sectors],
+        "currencies": currencies,
+        "tv":         UNIVERSE.tv_exchanges,
+        "data": {
+            "ticker":     df["ticker"].tolist(),
+            "name":       df["name"].tolist(),
+            "country":    codes("country", countries),
+            "sector":     codes("sector", sectors),
+            "currency":   codes("currency", currencies),
+            "close":      df["close"].tolist(),
+            "pct_change": df["pct_change"].tolist(),
+            "vol_ratio":  df["vol_ratio"].tolist(),
+            "ret_20d":    _nullable(df["ret_20d"]),
+            "rsi_14":     _nullable(df["rsi_14"]),
+        },
+    }
 
+
+def _nullable(col):
+    return col.astype(object).where(col.notna(), None).tolist()
+
+
+def payload_json(payload):
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+def dashboard_script(mode=RENDER_MODE):
+    """Sortier-/Filter-Script des Render-Modus samt Start (Daten aus dem Seiten-JSON bzw. data.json)."""
+    if mode == "inline":
+        boot = "const D = JSON.parse(document.getElementById('screener-data').textContent);\nrenderViews();"
+    elif mode in ("json", "live"):
+        boot = "let D;\nfetch('data.json').then(r => r.json()).then(d => { D = d; renderViews(); });"
+        if mode == "live":
+            boot += "\n\n" + LIVE_SCRIPT
+    else:
+        boot = ""
+    return SCRIPT + "\n\n" + (STATIC_SCRIPT if mode == "static" else CLIENT_SCRIPT + "\n" + boot)
+
+
+def _html_footer(generated_at, mode="static", payload=None, assets=None):
+    data = ""
+    if mode == "inline":
+        data = ('<script id="screener-data" type="application/json">'
+                + payload_json(payload).replace("</", "<\\/") + "</script>\n")
+    script = "" if assets else "<script>\n" + dashboard_script(mode) + "\n</script>\n"
+    live   = '\n  <div id="live-status">Live · verbinde…</div>' if mode == "live" else ""
+    return f"""
 </div>
 
 <div class="ft">
-  <div>Daten: stooq.com · Kein Anlageberatungsersatz · Nur zur Information</div>
+  <div>Daten: stooq.com · Kein Anlageberatungsersatz · Nur zur Information</div>{live}
   <div>Generiert: {generated_at}</div>
 </div>
 
-<script>
-function showTab(name, el) {{
-  document.querySelectorAll('.panel').forEach(p => p.classList.remove('active'));
-  document.querySelectorAll('.tab').forEach(t => t.classList.remove('active'));
-  document.getElementById('p-' + name).classList.add('active');
-  el.classList.add('active');
-}}
+{data}{script}</body>
+</html>"""
 
-function applyFilters() {{
-  const q       = document.getElementById('q').value.toLowerCase();
-  const country = document.getElementById('f-country').value;
-  const sector  = document.getElementById('f-sector').value;
-  let visible   = 0;
-  document.querySelectorAll('#t-all tbody tr').forEach(row => {{
-    const text = row.textContent.toLowerCase();
-    const rc   = row.dataset.country;
-    const rs   = row.dataset.sector;
-    const show = (!q || text.includes(q))
-              && (!country || rc === country)
-              && (!sector  || rs === sector);
-    row.classList.toggle('hidden', !show);
-    if (show) visible++;
-  }});
-  document.getElementById('row-count').textContent = visible + ' Ergebnisse';
-  document.getElementById('cnt-all').textContent   = visible;
-}}
 
-function sortT(tableId, colIdx) {{
-  const table = document.getElementById(tableId);
-  const tbody = table.querySelector('tbody');
-  const th    = table.querySelectorAll('thead th')[colIdx];
-  const asc   = th.dataset.dir !== 'asc';
-  table.querySelectorAll('thead th').forEach(t => delete t.dataset.dir);
-  th.dataset.dir = asc ? 'asc' : 'desc';
-  th.textContent = th.textContent.replace(/ [▲▼]$/,'') + (asc ? ' ▲' : ' ▼');
-  const rows = [...tbody.querySelectorAll('tr')];
-  rows.sort((a, b) => {{
-    const av = a.cells[colIdx].textContent.replace(/[^0-9.\-]/g,'');
-    const bv = b.cells[colIdx].textContent.replace(/[^0-9.\-]/g,'');
-    const an = parseFloat(av), bn = parseFloat(bv);
-    if (!isNaN(an) && !isNaN(bn)) return asc ? an - bn : bn - an;
-    return asc
-      ? a.cells[colIdx].textContent.localeCompare(b.cells[colIdx].textContent)
-      : b.cells[colIdx].textContent.localeCompare(a.cells[colIdx].textContent);
-  }});
-  rows.forEach(r => tbody.appendChild(r));
-}}
-</script>
-</body>
-</html>"""
+def iter_html(df, date_str, generated_at, mode=RENDER_MODE, analytics=None, assets=None):
+    """Liefert das Dashboard abschnittsweise – für Tausende Zeilen ohne Riesen-String im Speicher.
+    analytics: market_analytics(df, returns); ohne Renditepanel nur Sektor-/Länder-Aggregate.
+    assets: Pfade aus dashboard_assets(mode) – ohne werden CSS und Script eingebettet."""
+    if mode not in RENDER_MODES:
+        raise ValueError(f"Unbekannter Render-Modus: {mode}")
+    gainers    = df[df["pct_change"] > 0].head(20)
+    losers     = df[df["pct_change"] < 0].sort_values("pct_change").head(20)
+    volume_top = df[df["vol_ratio"] >= 1.5].sort_values("vol_ratio", ascending=False).head(20)
+    client     = mode != "static"
 
+    yield _html_head(date_str, assets)
+    yield _html_header(df, date_str)
+    yield _html_toolbar(df)
+    yield from _iter_panel("all", "Alle Aktien", f'<span class="n-badge" id="cnt-all">{len(df)}</span>',
+                           "Sortierbar per Klick auf Spalte", df, active=True, client=client)
+    yield from _iter_panel("gainers", "📈 Top Gainer", f'<span class="n-badge">{len(gainers)}</span>',
+                           "Stärkste Aufwärtsbewegungen heute", gainers, client=client)
+    yield from _iter_panel("losers", "📉 Top Loser", f'<span class="n-badge">{len(losers)}</span>',
+                           "Stärkste Abwärtsbewegungen heute", losers, client=client)
+    yield from _iter_panel("volume", "🔥 Volumen-Anomalien", f'<span class="n-badge">{len(volume_top)}</span>',
+                           "Volumen ≥ 1.5× 20-Tage-Durchschnitt", volume_top, client=client)
+    if analytics is None:
+        from analytics import market_analytics
+        analytics = market_analytics(df)
+    yield _market_panel(analytics)
+    payload = screener_payload(df, date_str, generated_at) if mode == "inline" else None
+    yield _html_footer(generated_at, mode, payload, assets)
 
-if __name__ == "__main__":
-    date_str     = datetime.today().strftime("%d.%m.%Y")
-    generated_at = datetime.now().strftime("%d.%m.%Y %H:%M Uhr (UTC)")
 
-    ticker_data = fetch_data()
-    df          = build_screener(ticker_data)
+def generate_html(df, date_str, generated_at, mode=RENDER_MODE, analytics=None, assets=None):
+    return "".join(iter_html(df, date_str, generated_at, mode, analytics, assets))
+
+
+def write_html(df, path, date_str, generated_at, mode=RENDER_MODE, analytics=None, assets=None):
+    with open(path, "w", encoding="utf-8") as f:
+        for chunk in iter_html(df, date_str, generated_at, mode, analytics, assets):
+            f.write(chunk)
+
+
+# ─────────────────────────────────────────────
+# Statische Assets: CSS, Script und Fonts als Dateien mit Inhalts-Hash im Namen.
+# Browser und CDN cachen sie dauerhaft; von Lauf zu Lauf ändert sich nur die kleine
+# index.html (bzw. data.json). Dazu je Ausgabe vorkomprimierte .gz/.br-Kopien.
+# ─────────────────────────────────────────────
+ASSET_DIR = "assets"                                # relativ zum Ausgabeordner
+FONT_DIR  = os.path.join(DATA_DIR, "fonts")
+# woff2 (am besten auf Latin-1 reduziert, z.B. pyftsubset --unicodes=U+0000-00FF,U+2013-2026,U+20AC);
+# fehlt eine Datei, greift der System-Font-Stack aus --font / --mono
+FONTS     = [("Inter", "300 700", "Inter.woff2"), ("JetBrains Mono", "400 600", "JetBrainsMono.woff2")]
+COMPRESS  = (".html", ".json", ".css", ".js", ".svg", ".prom")    # woff2 ist bereits komprimiert
+GZIP_LEVEL   = 9
+BROTLI_LEVEL = 11
+
+
+def hashed_name(stem, ext, content):
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:10]}{ext}"
+
+
+def dashboard_css(fonts=None):
+    """fonts: Font-Familie → Dateiname (neben dem Stylesheet abgelegt)."""
+    faces = [f"@font-face {{ font-family: '{family}'; font-weight: {weight}; font-style: normal;"
+             f" font-display: swap; src: url({fonts[family]}) format('woff2'); }}"
+             for family, weight, _ in FONTS if fonts and family in fonts]
+    return "\n".join(faces + [CSS.replace("/* SECTOR_CSS */", sector_css())])
+
+
+def dashboard_assets(mode=RENDER_MODE, font_dir=FONT_DIR):
+    """{Pfad relativ zum Ausgabeordner: Bytes} – vorhandene Fonts, Stylesheet und Script des Modus."""
+    assets, fonts = {}, {}
+    for family, _, fname in FONTS:
+        path = os.path.join(font_dir, fname)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                raw = f.read()
+            fonts[family] = hashed_name(os.path.splitext(fname)[0], ".woff2", raw)
+            assets[f"{ASSET_DIR}/{fonts[family]}"] = raw
+    css = dashboard_css(fonts).encode("utf-8")
+    js  = dashboard_script(mode).encode("utf-8")
+    assets[f"{ASSET_DIR}/{hashed_name('screener', '.css', css)}"] = css
+    assets[f"{ASSET_DIR}/{hashed_name(f'screener-{mode}', '.js', js)}"] = js
+    return assets
+
+
+def write_assets(out_dir, assets):
+    """Schreibt nur, was noch nicht da ist (gleicher Name = gleicher Inhalt), und räumt
+    Assets früherer Stände samt komprimierten Kopien ab."""
+    root = os.path.join(out_dir, ASSET_DIR)
+    os.makedirs(root, exist_ok=True)
+    keep = {os.path.basename(p) for p in assets}
+    for name in os.listdir(root):
+        if name not in keep and name.removesuffix(".gz").removesuffix(".br") not in keep:
+            os.remove(os.path.join(root, name))
+    written = []
+    for rel, raw in assets.items():
+        path = os.path.join(out_dir, rel)
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(raw)
+        written.append(path)
+    return written
+
+
+def precompress(out_dir):
+    """.gz (und .br, falls das Paket brotli installiert ist) neben jede Text-Ausgabe; übersprungen,
+    wenn die Kopie schon neuer ist als das Original (unveränderte Assets). Kopien ohne Original
+    werden entfernt. Liefert die neu geschriebenen Kopien."""
+    codecs = {".gz": lambda raw: gzip.compress(raw, GZIP_LEVEL, mtime=0)}
+    try:
+        import brotli
+        codecs[".br"] = lambda raw: brotli.compress(raw, quality=BROTLI_LEVEL)
+    except ImportError:
+        pass
+    written = []
+    for root, _, files in os.walk(out_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            if name.endswith((".gz", ".br")):
+                if not os.path.exists(path[:-3]):
+                    os.remove(path)
+                continue
+            if not name.endswith(COMPRESS):
+                continue
+            with open(path, "rb") as f:
+                raw = f.read()
+            for ext, compress in codecs.items():
+                if os.path.exists(path + ext) and os.path.getmtime(path + ext) >= os.path.getmtime(path):
+                    continue
+                with open(path + ext, "wb") as f:
+                    f.write(compress(raw))
+                written.append(path + ext)
+    return written
+
+
+def write_dashboard(df, out_dir, date_str, generated_at, mode=RENDER_MODE, analytics=None, inline=False):
+    """index.html (+ data.json) und die Assets; inline=True bettet CSS und Script wie früher ein."""
+    os.makedirs(out_dir, exist_ok=True)
+    assets  = None if inline else dashboard_assets(mode)
+    written = [os.path.join(out_dir, "index.html")]
+    write_html(df, written[0], date_str, generated_at, mode, analytics, assets)
+    if mode in ("json", "live"):
+        written.append(os.path.join(out_dir, "data.json"))
+        with open(written[1], "w", encoding="utf-8") as f:
+            f.write(payload_json(screener_payload(df, date_str, generated_at)))
+    if assets:
+        written += write_assets(out_dir, assets)
+    return written
+
+
+# ─────────────────────────────────────────────
+# Lauf: einzeln oder in Shards nach Börse
+# ─────────────────────────────────────────────
+def fetch(metrics, store=None, limiter=None, checkpoint_file=CHECKPOINT_FILE, resume=RESUME, session=None,
+          tickers=None):
+    """Fetch für UNIVERSE (oder nur `tickers`), mit Store gleich in den HistoryStore geschrieben.
+    Liefert die geladenen Ticker (Reihenfolge wie im Stamm) und ihre Frames."""
+    stats      = {}
+    bulk_stats = {}
+    limiter    = limiter or RateLimiter()
+    with metrics.stage("fetch"):
+        ticker_data = fetch_data(stats=stats, session=session, limiter=limiter, bulk_stats=bulk_stats, store=store,
+                                 checkpoint_file=checkpoint_file, resume=resume, tickers=tickers)
+    metrics.record_fetch(stats, limiter)
+    if bulk_stats:
+        metrics.extra["bulk"] = bulk_stats
+    tickers = list(ticker_data)
+    if store is not None:
+        with metrics.stage("store"):
+            store.write(ticker_data)
+        metrics.extra["store"] = {"rows": len(store), "tickers": len(store.tickers)}
+    return tickers, ticker_data
+
+
+def build(metrics, tickers, ticker_data=None, store=None, state_file=STATE_FILE, state=None):
+    """Indikatoren für die geladenen Ticker; mit Store aus der gemappten Historie (ticker_data
+    wird dann nicht gebraucht). Liefert den Screener-Frame und das Renditepanel der letzten
+    Handelstage (für die Querschnitts-Kennzahlen)."""
+    from analytics import ReturnPanel
+    from indicator_state import IndicatorState, BAR_FIELDS
+    if state is None:
+        state = IndicatorState.load(state_file) if state_file else None
+    if store is not None and state is None:
+        # direkt das Bar-Panel aus der gemappten Historie statt eines DataFrames pro Ticker
+        ticker_data = store.bars(BAR_FIELDS, history_start(), tickers)
+    with metrics.stage("build"):
+        if store is not None and state is not None:
+            # Tagesbetrieb: nur die jüngsten Zeilen des Stores, volle Historie nur für neue Ticker
+            df   = screener_frame(state.update_store(store, history_start(), tickers))
+            asof = state.asof(tickers)
+        else:
+            df   = build_screener(ticker_data, state=state)
+            asof = last_bar_date(ticker_data)
+        if store is not None:
+            returns = ReturnPanel.from_closes(store.dates, store.tickers, store.view("Close")).subset(tickers)
+        else:
+            returns = ReturnPanel.from_frames(ticker_data)
+    if asof is not None:
+        metrics.extra["asof"] = f"{asof:%Y-%m-%d}"
+    if state is not None:
+        metrics.extra["indicator_state"] = state.stats
+        print(f"🧮 Indikatoren: {state.stats['bars']} neue Bars eingefaltet, "
+              f"{state.stats['rebuilt']}/{state.stats['tickers']} Ticker neu aufgebaut")
+        mismatches = None
+        if VERIFY_STATE:
+            with metrics.stage("verify"):
+                mismatches = verify_state(state, store.bars(start=history_start(), tickers=tickers)
+                                          if store is not None else ticker_data)
+            metrics.extra["indicator_state"]["mismatches"] = len(mismatches)
+            if len(mismatches):
+                print(f"⚠️  {len(mismatches)} Abweichungen gegenüber voller Neuberechnung – Zustand wird verworfen")
+                print(mismatches.head(10).to_string(index=False))
+            else:
+                print("✅ Inkrementeller Zustand stimmt mit voller Neuberechnung überein")
+        if mismatches is None or mismatches.empty:
+            if state_file:
+                state.save(state_file)
+        elif state_file and os.path.exists(state_file):
+            os.remove(state_file)
+    return df, returns
+
 
+def compute(metrics, store_dir=STORE_DIR, state_file=STATE_FILE, limiter=None,
+            checkpoint_file=CHECKPOINT_FILE, resume=RESUME, session=None, state=None, fetch_tickers=None):
+    """Fetch → HistoryStore → Indikatoren für UNIVERSE in einem Prozess (fetch + build).
+    session/state: von einem langlebigen Prozess gehalten (screener_server.py) statt pro Lauf neu.
+    fetch_tickers: nur diese Ticker abrufen; gerechnet wird mit Store trotzdem über alle
+    gespeicherten (fehlgeschlagene Abrufe fallen wie sonst heraus)."""
+    from history_store import HistoryStore
+    store = HistoryStore(store_dir) if store_dir else None
+    tickers, ticker_data = fetch(metrics, store, limiter, checkpoint_file, resume, session, fetch_tickers)
+    if store is not None:
+        ticker_data = None      # ab hier nur noch Views auf die gemappte Historie
+        if fetch_tickers is not None:
+            loaded  = set(tickers) | set(store.tickers).difference(fetch_tickers)
+            tickers = [t for t in UNIVERSE.tickers if t in loaded]
+    return build(metrics, tickers, ticker_data, store, state_file, state)
+
+
+def convert_eur(df, metrics):
+    with metrics.stage("fx"):
+        rates = eur_rates(df["currency"].unique(), metrics.extra.get("asof") or datetime.today())
+        df    = rates.to_eur(df, metrics.extra.get("asof"))
+    metrics.extra["fx"] = rates.used
+    missing = sorted(c for c, r in rates.used.items() if r["eur"] is None)
+    if missing:
+        print(f"⚠️  Kein Wechselkurs für {', '.join(missing)} – EUR-Umsätze fehlen für diese Titel")
+    return df
+
+
+def market_view(df, metrics, returns=None):
+    from analytics import market_analytics
+    with metrics.stage("analytics"):
+        analytics = market_analytics(df, returns)
+    if "avg_corr" in analytics:
+        metrics.extra["analytics"] = {"avg_corr": _round_or_none(analytics["avg_corr"]),
+                                      "ad_line": int(analytics["ad"]["line"].iloc[-1]) if len(analytics["ad"]) else None}
+        print(f"🧭 A/D-Linie {metrics.extra['analytics']['ad_line']:+d} · Ø Korrelation {analytics['avg_corr']:.2f}"
+              f" ({len(returns.tickers)} Ticker, {len(returns)} Tage)")
+    return analytics
+
+
+def evaluate_alerts(df, metrics):
+    """Alarm-Treffer; None ohne Alarm-Regeln."""
+    engine = alert_engine()
+    if not len(engine):
+        return None
+    with metrics.stage("alerts"):
+        matches = engine.evaluate(df)
+    metrics.extra["alerts"] = {"rules": len(engine), "matches": len(matches),
+                               "by_rule": matches["rule"].value_counts().to_dict()}
+    print(f"🔔 {len(matches)} Alarme aus {len(engine)} Regeln")
+    return matches
+
+
+def enrich(df, metrics, returns=None):
+    """EUR-Umrechnung, Markt-Kennzahlen und Alarm-Treffer für den Server-Modus.
+    Liefert (df, analytics, matches); matches ist None ohne Alarm-Regeln."""
+    df = convert_eur(df, metrics)
+    return df, market_view(df, metrics, returns), evaluate_alerts(df, metrics)
+
+
+def deliver(df, metrics, out_dir="docs"):
+    """Alles, was einmal je Kursstand passiert: EUR-Umrechnung, Alarme (alerts.json, Webhook)
+    und Archiv. Liefert den Frame mit EUR-Spalten."""
+    from alerts import write_alerts, post_alerts, WEBHOOK_URL
+    from snapshots import SnapshotArchive
     print(f"✅ {len(df)} Aktien verarbeitet")
     print(f"📈 Top Gainer: {df.iloc[0]['ticker']} {df.iloc[0]['name']} (+{df.iloc[0]['pct_change']:.2f}%)")
     print(f"📉 Top Loser:  {df.iloc[-1]['ticker']} {df.iloc[-1]['name']} ({df.iloc[-1]['pct_change']:.2f}%)")
 
-    os.makedirs("docs", exist_ok=True)
-    with open("docs/index.html", "w", encoding="utf-8") as f:
-        f.write(generate_html(df, date_str, generated_at))
-    print("💾 docs/index.html gespeichert")
+    df      = convert_eur(df, metrics)
+    matches = evaluate_alerts(df, metrics)
+    if matches is not None:
+        write_alerts(matches, os.path.join(out_dir, "alerts.json"), metrics.extra.get("asof"))
+        if WEBHOOK_URL and len(matches):
+            import requests
+            try:
+                print(f"   Webhook: HTTP {post_alerts(matches, WEBHOOK_URL, metrics.extra.get('asof'))}")
+            except requests.RequestException as e:
+                print(f"⚠️  Webhook nicht erreichbar: {e}")
+    if SNAPSHOT_DIR:
+        with metrics.stage("archive"):
+            path = SnapshotArchive(SNAPSHOT_DIR).write(metrics.extra.get("asof") or datetime.today(), df)
+        print(f"🗄  {path} archiviert")
+    return df
+
+
+def render(df, metrics, returns=None, out_dir="docs"):
+    """Markt-Kennzahlen, Dashboard und Laufbericht – ohne Netz, beliebig oft wiederholbar."""
+    date_str     = datetime.today().strftime("%d.%m.%Y")
+    generated_at = datetime.now().strftime("%d.%m.%Y %H:%M Uhr (UTC)")
+
+    analytics = market_view(df, metrics, returns)
+    with metrics.stage("render"):
+        paths = write_dashboard(df, out_dir, date_str, generated_at, analytics=analytics)
+    for path in paths:
+        print(f"💾 {path} gespeichert ({os.path.getsize(path)/1024:.0f} KB)")
+
+    prom = os.path.join(out_dir, "metrics.prom") if os.environ.get("SCREENER_PROMETHEUS") == "1" else None
+    for path in metrics.write(os.path.join(out_dir, "run_report.json"), prom):
+        print(f"📊 {path} gespeichert")
+    packed = precompress(out_dir)
+    print(f"🗜  {len(packed)} vorkomprimierte Kopien ({', '.join(sorted({os.path.splitext(p)[1] for p in packed}))})"
+          if packed else "🗜  vorkomprimierte Kopien aktuell")
+    print("⏱  " + " · ".join(f"{k} {v:.1f}s" for k, v in metrics.stages.items()))
+
+
+def publish(df, metrics, returns=None, out_dir="docs", stage_dir=None):
+    """deliver → render; mit stage_dir bleibt der Zwischenstand für `screener.py render` liegen."""
+    df = deliver(df, metrics, out_dir)
+    if stage_dir:
+        save_stage(df, metrics, returns, stage_dir)
+    render(df, metrics, returns, out_dir)
+
+
+def _round_or_none(v, digits=4):
+    return None if pd.isna(v) else round(float(v), digits)
+
+
+SHARD_DIR = os.environ.get("SCREENER_SHARD_DIR", "shards")
+
+
+def run_shard(exchanges, n_shards, out_dir=SHARD_DIR, resume=RESUME):
+    """Ein Shard: nur die Ticker dieser Börsen, eigener Store/Zustand, anteiliges Rate-Budget."""
+    global UNIVERSE
+    import shards
+    UNIVERSE = UNIVERSE.subset(UNIVERSE.select(exchange=exchanges).index)
+    key      = shards.shard_key(exchanges)
+    metrics  = RunMetrics()
+    limiter  = RateLimiter(rate=RATE_START / n_shards, min_rate=RATE_MIN / n_shards, max_rate=RATE_MAX / n_shards)
+    print(f"🧩 Shard {key}: {len(UNIVERSE)} Ticker")
+    df, returns = compute(metrics,
+                          store_dir=f"{STORE_DIR}-{key}" if STORE_DIR else "",
+                          state_file=STATE_FILE.replace(".npz", f"-{key}.npz") if STATE_FILE else "",
+                          limiter=limiter,
+                          checkpoint_file=CHECKPOINT_FILE.replace(".jsonl", f"-{key}.jsonl") if CHECKPOINT_FILE else "",
+                          resume=resume)
+    return shards.write_shard(out_dir, exchanges, n_shards, df, metrics.to_dict(), returns)
+
+
+def merge_shards(out_dir=SHARD_DIR, n_shards=None):
+    import shards
+    from analytics import ReturnPanel
+    metrics = RunMetrics()
+    with metrics.stage("merge"):
+        parts = shards.read_shards(out_dir)
+        if n_shards:
+            parts = [p for p in parts if p["shards"] == n_shards]
+        covered = {e for p in parts for e in p["exchanges"]}
+        missing = sorted(set(UNIVERSE.frame["exchange"]) - covered)
+        df = shards.merge_frames([p["frame"] for p in parts], UNIVERSE.tickers)
+        returns = ReturnPanel.concat([p.get("returns") for p in parts])
+    merged = RunMetrics.merge([p["report"] for p in parts])
+    merged.stages["merge"] = metrics.stages["merge"]
+    merged.extra["shards"] = {shards.shard_key(p["exchanges"]): {
+        "exchanges": p["exchanges"], "tickers": len(p["frame"]),
+        "duration_s": p["report"].get("duration_s"), "stages_s": p["report"].get("stages_s"),
+    } for p in parts}
+    if missing:
+        merged.extra["shards_missing"] = missing
+        print(f"⚠️  Keine Shard-Ergebnisse für: {', '.join(missing)}")
+    print(f"🧩 {len(parts)} Shards zusammengeführt ({len(df)} Ticker)")
+    return df, merged, returns
+
+
+def run_sharded(n_shards, out_dir=SHARD_DIR, resume=RESUME):
+    """Alle Shards parallel in eigenen Prozessen, danach Merge."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    import shards
+
+    plan = shards.plan_shards(UNIVERSE, n_shards)
+    for old in glob.glob(os.path.join(out_dir, "shard-*")):
+        os.remove(old)
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=len(plan), mp_context=ctx) as pool:
+        futures = {pool.submit(run_shard, exchanges, len(plan), out_dir, resume): exchanges for exchanges in plan}
+        for fut in as_completed(futures):
+            try:
+                fut.result()
+            except Exception as e:
+                print(f"  ❌ Shard {shards.shard_key(futures[fut])} fehlgeschlagen: {e}")
+    return merge_shards(out_dir, len(plan))
+
+
+# ─────────────────────────────────────────────
+# Einzelstufen mit Zwischenständen auf der Platte (STAGE_DIR)
+#   fetch   → HistoryStore + fetch.json (Bericht mit dem Ergebnis je Ticker)
+#   compute → Indikatoren aus dem Store, EUR, Alarme, Archiv → compute.json + compute.returns.npz
+#   render  → docs/ aus compute.json, ohne Netz – nach einer Template-Änderung in unter einer Sekunde
+# ─────────────────────────────────────────────
+STAGE_DIR = os.environ.get("SCREENER_STAGE_DIR", os.path.join(CACHE_DIR, "stages") if CACHE_DIR else "stages")
+COMMANDS  = ("fetch", "compute", "render", "all")
+
+
+def stage_path(command, stage_dir=STAGE_DIR):
+    return os.path.join(stage_dir, f"{command}.json")
+
+
+def load_stage(command, stage_dir=STAGE_DIR):
+    """Zwischenstand einer Stufe → (metrics, Frame, Renditepanel); Frame und Panel erst nach compute."""
+    import shards
+    path = stage_path(command, stage_dir)
+    if not os.path.exists(path):
+        raise SystemExit(f"{path} fehlt – erst `python screener.py {command}` ausführen.")
+    if command == "fetch":
+        with open(path, encoding="utf-8") as fh:
+            return RunMetrics.from_dict(json.load(fh)), None, None
+    data = shards.read_frame(path)
+    return RunMetrics.from_dict(data["report"]), data["frame"], data.get("returns")
+
+
+def record_startup(metrics, command, seconds):
+    metrics.extra.setdefault("startup_s", {})[command] = round(seconds, 4)
+
+
+def fetch_stage(metrics, stage_dir=STAGE_DIR, resume=RESUME):
+    from history_store import HistoryStore
+    if not STORE_DIR:
+        raise SystemExit("Einzelstufen brauchen den HistoryStore – SCREENER_CACHE darf nicht leer sein.")
+    tickers, _ = fetch(metrics, HistoryStore(STORE_DIR), resume=resume)
+    print(f"💾 {metrics.write(stage_path('fetch', stage_dir))[0]} gespeichert ({len(tickers)} Ticker im Store)")
+    return tickers
+
+
+def compute_stage(metrics, tickers=None, stage_dir=STAGE_DIR, out_dir="docs"):
+    """tickers: Ergebnis von fetch im selben Prozess, sonst die geladenen Ticker aus fetch.json."""
+    from history_store import HistoryStore
+    if tickers is None:
+        tickers = [t for t in UNIVERSE.tickers if metrics.tickers.get(t, {}).get("ok")]
+    df, returns = build(metrics, tickers, store=HistoryStore(STORE_DIR))
+    df = deliver(df, metrics, out_dir)
+    save_stage(df, metrics, returns, stage_dir)
+    return df, returns
+
+
+def save_stage(df, metrics, returns=None, stage_dir=STAGE_DIR):
+    import shards
+    path = shards.write_frame(stage_path("compute", stage_dir), df, metrics.to_dict(), returns)
+    print(f"💾 {path} gespeichert")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="European Stock EOD Screener")
+    ap.add_argument("command", nargs="?", default="all", choices=COMMANDS,
+                    help="nur eine Stufe, Zwischenstände in --stage-dir (Standard: all)")
+    ap.add_argument("--stage-dir", default=STAGE_DIR)
+    ap.add_argument("--out-dir", default="docs")
+    ap.add_argument("--shards", type=int, default=int(os.environ.get("SCREENER_SHARDS", "1")),
+                    help="Universum nach Börse auf N Prozesse verteilen")
+    ap.add_argument("--shard", metavar="K/N", help="nur Shard K von N rechnen und ablegen (z.B. CI-Matrix)")
+    ap.add_argument("--merge", action="store_true", help="abgelegte Shards zusammenführen und veröffentlichen")
+    ap.add_argument("--shard-dir", default=SHARD_DIR)
+    ap.add_argument("--fresh", action="store_true", help="Fetch-Checkpoint ignorieren und alle Ticker neu laden")
+    args = ap.parse_args()
+    resume  = RESUME and not args.fresh
+    command = args.command
+    if command != "all" and (args.shard or args.merge or args.shards > 1):
+        ap.error("--shard/--merge/--shards nur mit dem Kommando all")
+    startup = time.perf_counter() - STARTED
+    print(f"🚀 {command}: bereit nach {startup*1000:.0f} ms (Importe)")
+
+    if args.shard:
+        import shards
+        k, n = shards.parse_shard(args.shard)
+        plan = shards.plan_shards(UNIVERSE, n)
+        if k < len(plan):
+            print(f"💾 {run_shard(plan[k], len(plan), args.shard_dir, resume)} gespeichert")
+        else:
+            print(f"ℹ️  Shard {args.shard}: nur {len(plan)} Börsen-Shards – nichts zu tun")
+    elif args.merge or args.shards > 1:
+        df, metrics, returns = merge_shards(args.shard_dir) if args.merge else run_sharded(args.shards, args.shard_dir, resume)
+        record_startup(metrics, command, startup)
+        publish(df, metrics, returns, args.out_dir, args.stage_dir)
+    elif command == "all" and not STORE_DIR:
+        # ohne Cache kein HistoryStore – alles im Speicher, keine Zwischenstände
+        metrics = RunMetrics()
+        record_startup(metrics, command, startup)
+        df, returns = compute(metrics, resume=resume)
+        publish(df, metrics, returns, args.out_dir)
+    else:
+        metrics, df, returns, tickers = RunMetrics(), None, None, None
+        if command == "compute":
+            metrics, _, _ = load_stage("fetch", args.stage_dir)
+        elif command == "render":
+            metrics, df, returns = load_stage("compute", args.stage_dir)
+        record_startup(metrics, command, startup)
+        if command in ("fetch", "all"):
+            tickers = fetch_stage(metrics, args.stage_dir, resume)
+        if command in ("compute", "all"):
+            df, returns = compute_stage(metrics, tickers, args.stage_dir, args.out_dir)
+        if command in ("render", "all"):
+            render(df, metrics, returns, args.out_dir)
@@ -0,0 +1,498 @@
+"""
+Server-Modus des Screeners
+Ein langlebiger Prozess hält HistoryStore, Indikator-Zustand, HTTP-Session und das letzte
+Screener-Ergebnis im Speicher. Ein Hintergrund-Thread aktualisiert im festen Takt: abgefragt
+werden nur Ticker, deren letzter Bar älter ist als der letzte abgeschlossene Handelstag ihrer
+Börse, nur neue Bars werden eingefaltet, neu gerendert wird nur, wenn sich etwas geändert hat. Anfragen lesen den jeweils fertigen Stand – ohne Prozessstart
+und ohne Neuberechnung.
+
+Endpunkte:
+  GET  /                      Dashboard (lädt /data.json)
+  GET  /assets/<name>         CSS/Script/Fonts mit Inhalts-Hash im Namen (immutable)
+  GET  /data.json             kompakter Datensatz des Dashboards
+  GET  /api/screener          Zeilen, z.B. ?where=pct_change < -3 in sector Finanzen&sort=-vol_ratio&limit=20
+                              (where: Syntax der Alarm-Regeln, columns=ticker,close,...)
+  GET  /api/ticker/<TICKER>   Kennzahlen + Historie (?days=60)
+  GET  /api/market            Sektor-/Länder-Aggregate, A/D-Linie, Ø Korrelation
+  GET  /api/alerts            Treffer der Alarm-Regeln
+  GET  /api/status            Stand, letzte Aktualisierung, Fetch-Statistik
+  GET  /api/stream            Server-Sent Events: "rows" (geänderte Zeilen), "alert", "reload" (neuer Tagesstand)
+  POST /api/refresh           Aktualisierung sofort anstoßen
+
+Mit --intraday N fragt ein zweiter Thread alle N Sekunden die Kurse der gerade offenen Börsen ab
+(intraday.py) und schickt nur die geänderten Zeilen an die verbundenen Dashboards.
+
+Aufruf:
+  python screener_server.py --port 8080 --interval 900 --intraday 30
+  python intraday.py fake-feed & STOOQ_QUOTE_URL=http://127.0.0.1:8097/q/l/ python screener_server.py --intraday 5 --all-hours
+"""
+
+import argparse, gzip, json, os, queue, threading, time
+from datetime import datetime
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+import numpy as np
+import pandas as pd
+
+import screener, intraday
+from alerts import AlertEngine
+from analytics import market_analytics
+from history_store import HistoryStore, FIELDS
+from indicator_state import IndicatorState
+from run_report import RunMetrics
+from stooq_client import make_session
+
+PORT     = int(os.environ.get("SCREENER_SERVER_PORT", "8080"))
+INTERVAL = float(os.environ.get("SCREENER_REFRESH", "900"))     # Sekunden zwischen zwei Aktualisierungen
+INTRADAY = float(os.environ.get("SCREENER_INTRADAY", "0"))       # Sekunden zwischen Intraday-Abrufen, 0 = aus
+LIMIT    = 100      # Standard-Zeilenzahl von /api/screener
+GZIP_MIN = 1024     # kleinere Antworten unkomprimiert
+KEEPALIVE = 15      # Sekunden ohne Ereignis bis zum Kommentar-Ping im Event-Stream
+IMMUTABLE = "public, max-age=31536000, immutable"     # Assets mit Inhalts-Hash im Namen
+ASSET_TYPES = {".css": "text/css; charset=utf-8", ".js": "text/javascript; charset=utf-8", ".woff2": "font/woff2"}
+
+
+def _json(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _records(df):
+    return json.loads(df.to_json(orient="records", force_ascii=False, date_format="iso"))
+
+
+@lru_cache(maxsize=256)
+def _query_engine(where):
+    """Filter aus der Anfrage einmal parsen und wiederverwenden."""
+    return AlertEngine([("query", where)])
+
+
+# ─────────────────────────────────────────────
+# Stand: unveränderlich, wird bei jeder Aktualisierung als Ganzes ersetzt
+# ─────────────────────────────────────────────
+class View:
+    """Ein Stand des Screeners. Dashboard, Datensatz und Aggregate werden erst bei der ersten
+    Anfrage gerendert – ein Intraday-Stand, den niemand abruft, kostet nur den Zeilentausch."""
+    PATHS = ("/", "/data.json", "/api/market", "/api/alerts")
+
+    def __init__(self, version, df, analytics, matches, report):
+        self.version   = version
+        self.df        = df
+        self.by_ticker = pd.Index(df["ticker"])
+        self.matches   = matches
+        self.report    = report
+        self.asof      = report.get("asof")
+        self.etag      = f'"v{version}-{self.asof}"'
+        self.eur       = pd.Series({c: r["eur"] for c, r in report.get("fx", {}).items()}, dtype=float)
+        self._analytics = analytics
+        self._bodies    = {}
+        self._lock      = threading.Lock()
+
+    def derive(self, version, df, matches):
+        """Intraday-Stand: neue Zeilen, Renditepanel-Kennzahlen (A/D, Korrelationen) vom Tagesstand,
+        Sektor-/Länder-Aggregate werden bei Bedarf neu gebildet."""
+        base = {k: v for k, v in self._analytics.items() if k not in ("sectors", "countries")}
+        return View(version, df, base, matches, self.report)
+
+    @property
+    def analytics(self):
+        with self._lock:
+            if "sectors" not in self._analytics:
+                self._analytics.update(market_analytics(self.df))
+        return self._analytics
+
+    def body(self, path):
+        """(Content-Type, Bytes, gzip-Bytes) eines gerenderten Pfads, einmal pro Stand."""
+        if path not in self.PATHS:
+            return None
+        analytics = self.analytics
+        with self._lock:
+            if path not in self._bodies:
+                self._bodies[path] = self._render(path, analytics)
+            return self._bodies[path]
+
+    def _render(self, path, analytics):
+        date_str     = datetime.today().strftime("%d.%m.%Y")
+        generated_at = datetime.now().strftime("%d.%m.%Y %H:%M Uhr")
+        if path == "/":
+            return self._body(screener.generate_html(self.df, date_str, generated_at, "live", analytics, ASSETS),
+                              "text/html; charset=utf-8")
+        if path == "/data.json":
+            return self._body(screener.payload_json(screener.screener_payload(self.df, date_str, generated_at)),
+                              "application/json")
+        if path == "/api/market":
+            return self._body(_json(self._market(analytics)), "application/json")
+        return self._body(_json({"asof": self.asof, "alerts": _records(self.matches)
+                                 if self.matches is not None else []}), "application/json")
+
+    @staticmethod
+    def _body(text, ctype):
+        raw = text.encode("utf-8") if isinstance(text, str) else text
+        return ctype, raw, gzip.compress(raw, 6) if len(raw) >= GZIP_MIN else None
+
+    def _market(self, a):
+        out = {"asof": self.asof,
+               "sectors":   _records(a["sectors"].reset_index()),
+               "countries": _records(a["countries"].reset_index())}
+        if "ad" in a:
+            out["ad"] = _records(a["ad"].reset_index())
+            out["avg_corr"] = screener._round_or_none(a["avg_corr"])
+        return out
+
+    # ── Abfragen ─────────────────────────────────
+    def rows(self, where=None, sort=None, limit=LIMIT, columns=None):
+        df = self.df
+        if where:
+            df = df[_query_engine(where).masks(df)[0]]
+        if sort:
+            col = sort.lstrip("-")
+            df  = df.sort_values(col, ascending=not sort.startswith("-"), na_position="last")
+        total = len(df)
+        df    = df.head(limit)
+        if columns:
+            df = df[[c for c in columns if c in df.columns]]
+        return {"asof": self.asof, "version": self.version, "count": total, "rows": _records(df)}
+
+    def ticker(self, ticker, days=60, store=None):
+        pos = self.by_ticker.get_indexer([ticker])[0]
+        if pos < 0:
+            return None
+        out = {"asof": self.asof, **_records(self.df.iloc[[pos]])[0]}
+        if store is not None and ticker in store.tickers:
+            start = store.dates[max(0, len(store.dates) - days)] if len(store.dates) else None
+            hist  = store.frames(start, [ticker]).get(ticker)
+            if hist is not None:
+                out["history"] = {k: (np.datetime_as_string(v, "D") if k == "Date" else
+                                      np.where(np.isnan(v.astype(float)), None, v.astype(float))).tolist()
+                                  for k, v in hist.items()}
+        return out
+
+
+# CSS, Script und Fonts des Live-Dashboards: einmal pro Prozess, vom Browser dauerhaft gecacht
+ASSETS       = screener.dashboard_assets("live")
+ASSET_BODIES = {"/" + p: View._body(raw, ASSET_TYPES[os.path.splitext(p)[1]]) for p, raw in ASSETS.items()}
+
+
+# ─────────────────────────────────────────────
+# Server-Sent Events: eine Queue pro verbundenem Browser
+# ─────────────────────────────────────────────
+class Broadcaster:
+    def __init__(self, backlog=64):
+        self.backlog = backlog
+        self.clients = set()
+        self.lock    = threading.Lock()
+        self.sent    = {"events": 0, "bytes": 0}
+
+    def subscribe(self):
+        q = queue.Queue(self.backlog)
+        with self.lock:
+            self.clients.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            self.clients.discard(q)
+
+    def publish(self, event, data):
+        """Liefert die Größe der Nachricht; Browser, die nicht mehr abholen, werden abgehängt."""
+        msg = f"event: {event}\ndata: ".encode() + _json(data) + b"\n\n"
+        with self.lock:
+            for q in list(self.clients):
+                try:
+                    q.put_nowait(msg)
+                except queue.Full:
+                    self.clients.discard(q)
+            self.sent["events"] += 1
+            self.sent["bytes"]  += len(msg) * len(self.clients)
+        return len(msg)
+
+
+# ─────────────────────────────────────────────
+# Dienst: Aktualisierung im Hintergrund
+# ─────────────────────────────────────────────
+def _last_bars(store, tickers):
+    """Letzter gespeicherter Bar je Ticker (Datum + Felder) – Vergleich vor/nach dem Abruf."""
+    if store is None or not tickers:
+        return pd.DataFrame(index=pd.Index(tickers or [], name="ticker"))
+    bars = store.bars(("Date", *FIELDS), screener.history_start(), tickers)
+    return pd.DataFrame({f: bars[f][-1] for f in bars.fields}, index=bars.tickers).reindex(tickers)
+
+
+def _changed(before, after):
+    """Anzahl Ticker, deren letzter gespeicherter Bar sich geändert hat (neu oder korrigiert)."""
+    after = after.reindex(index=before.index, columns=before.columns)
+    same  = (before == after) | (before.isna() & after.isna())
+    return int((~same.all(axis=1)).sum())
+
+
+class ScreenerService:
+    def __init__(self, interval=INTERVAL, intraday_s=INTRADAY, all_hours=False):
+        """all_hours: Handelszeiten ignorieren und immer alle Börsen abfragen (Test mit dem Fake-Feed)."""
+        self.interval   = interval
+        self.intraday_s = intraday_s
+        self.all_hours  = all_hours
+        self.session    = make_session(screener.FETCH_WORKERS)
+        self.limiter    = screener.RateLimiter()
+        self.feed       = intraday.QuoteFeed(self.session, limiter=self.limiter)
+        self.symbols    = {s: t for t, s in screener.UNIVERSE.stooq.items()}
+        self.events     = Broadcaster()
+        self.state      = (IndicatorState.load(screener.STATE_FILE) if screener.STATE_FILE else None) or IndicatorState()
+        self.store      = None
+        self.view       = None
+        self.version    = 0
+        self.status     = {"state": "starting", "refreshes": 0}
+        self.lock       = threading.Lock()      # eine Aktualisierung zur Zeit
+        self.wake       = threading.Event()
+        self.stopped    = threading.Event()
+
+    def refresh(self):
+        """Ein Durchlauf; liefert True, wenn ein neuer Stand veröffentlicht wurde."""
+        with self.lock:
+            t0      = time.perf_counter()
+            metrics = RunMetrics()
+            self.status["state"] = "refreshing"
+            try:
+                # nur veraltete Ticker abfragen; kein Fetch-Checkpoint, der Store ist der Stand
+                store  = self.store or (HistoryStore(screener.STORE_DIR) if screener.STORE_DIR else None)
+                stale  = self.stale(store)
+                before = _last_bars(store, stale)
+                if stale == [] and self.view is not None:
+                    changed = published = 0         # alles auf dem erwarteten Stand: kein Abruf, keine Rechnung
+                else:
+                    df, returns = screener.compute(metrics, checkpoint_file="", session=self.session,
+                                                   limiter=self.limiter, state=self.state, fetch_tickers=stale)
+                    # nach dem Schreiben neu mappen (Form kann sich geändert haben)
+                    self.store = HistoryStore(screener.STORE_DIR) if screener.STORE_DIR else None
+                    if stale is None:
+                        changed = sum(s.get("cache") != "unchanged" for s in metrics.tickers.values())
+                    else:
+                        changed = _changed(before, _last_bars(self.store, stale))
+                    published = self.view is None or changed or metrics.extra.get("asof") != self.view.asof
+                if published:
+                    df, analytics, matches = screener.enrich(df, metrics, returns)
+                    report = metrics.to_dict()
+                    report.pop("tickers", None)
+                    self.version += 1
+                    self.view = View(self.version, df, analytics, matches, report)
+                    # neuer Tagesstand ohne Intraday-Kurse: nächster Zyklus trägt alle wieder ein
+                    self.feed.reset()
+                    self.events.publish("reload", {"version": self.version, "asof": self.view.asof})
+                self.status.update(state="ready", error=None, changed=changed,
+                                   stale=None if stale is None else len(stale),
+                                   fetch={k: metrics.fetch.get(k) for k in ("ok", "requests", "bytes", "cache", "errors")})
+            except Exception as e:          # Dienst läuft weiter, alter Stand bleibt gültig
+                self.status.update(state="error" if self.view is None else "ready", error=repr(e))
+                print(f"⚠️  Aktualisierung fehlgeschlagen: {e!r}")
+                return False
+            finally:
+                self.status["refreshes"] += 1
+                self.status["last_refresh"] = datetime.now().isoformat(timespec="seconds")
+                self.status["refresh_s"] = round(time.perf_counter() - t0, 3)
+            print(f"🔄 Stand v{self.version}: {changed} Ticker geändert, {self.status['refresh_s']:.1f}s")
+            return bool(published)
+
+    def stale(self, store, now=None):
+        """Ticker, deren letzter gespeicherter Bar älter ist als der zuletzt abgeschlossene Handelstag
+        ihrer Börse (InstrumentMaster.last_sessions) – lokal entschieden, ohne Anfrage.
+        None: ohne Store oder Zeitzonen nicht entscheidbar, dann werden alle bedingt abgefragt."""
+        due = screener.UNIVERSE.last_sessions(now)
+        if store is None or not due:
+            return None
+        frame = screener.UNIVERSE.frame
+        last  = pd.Series(store.last_dates(), dtype="datetime64[ns]").reindex(frame.index)
+        due   = frame["exchange"].map(due)
+        return list(frame.index[last.isna() | due.isna() | (last < due)])
+
+    def intraday(self, now=None):
+        """Ein Intraday-Zyklus: Kurse der offenen Börsen abfragen, nur geänderte Zeilen neu
+        berechnen, als neuen Stand veröffentlichen und als Diff an die Browser schicken."""
+        view = self.view
+        if view is None or self.store is None:
+            return 0
+        t0     = time.perf_counter()
+        open_  = (list(screener.UNIVERSE.exchanges.index) if self.all_hours
+                  else screener.UNIVERSE.open_exchanges(now))
+        quotes = self.feed.poll(screener.UNIVERSE.select(exchange=open_)["stooq"]) if open_ else None
+        stats  = {"exchanges": open_, **(self.feed.stats if open_ else {}), "rows": 0, "event_bytes": 0}
+        if quotes is not None and len(quotes):
+            with self.lock:
+                view = self.view
+                rows = intraday.recompute_rows(self.store, quotes, self.symbols, screener.history_start(),
+                                               screener.build_screener, view.eur)
+                if rows is not None and len(rows):
+                    matches, new_hits = self._intraday_alerts(view.matches, rows)
+                    self.version += 1
+                    self.view = view.derive(self.version, intraday.merge_rows(view.df, rows), matches)
+                    stats["rows"] = len(rows)
+                    stats["event_bytes"] = self.events.publish("rows", {
+                        "version": self.version, "time": datetime.now().strftime("%H:%M:%S"),
+                        "rows": _records(rows[intraday.LIVE_COLUMNS])})
+                    if len(new_hits):
+                        self.events.publish("alert", {"version": self.version, "alerts": _records(new_hits)})
+        stats["cycle_s"] = round(time.perf_counter() - t0, 4)
+        self.status["intraday"] = stats
+        return stats["rows"]
+
+    def _intraday_alerts(self, matches, rows):
+        """Alarm-Regeln nur über die geänderten Zeilen; liefert (alle Treffer, neu hinzugekommene)."""
+        if matches is None:
+            return None, pd.DataFrame()
+        hits = screener.alert_engine().evaluate(rows)
+        keep = matches[~matches["ticker"].isin(rows["ticker"])]
+        seen = set(zip(matches["rule"], matches["ticker"]))
+        new  = hits[[k not in seen for k in zip(hits["rule"], hits["ticker"])]]
+        return pd.concat([keep, hits], ignore_index=True), new
+
+    def loop(self):
+        while not self.stopped.is_set():
+            self.refresh()
+            self.status["next_refresh"] = datetime.fromtimestamp(time.time() + self.interval).isoformat(timespec="seconds")
+            self.wake.wait(self.interval)
+            self.wake.clear()
+
+    def intraday_loop(self):
+        while not self.stopped.wait(self.intraday_s):
+            try:
+                self.intraday()
+            except Exception as e:          # nächster Zyklus versucht es erneut
+                self.status["intraday"] = {"error": repr(e)}
+                print(f"⚠️  Intraday-Zyklus fehlgeschlagen: {e!r}")
+
+    def start(self):
+        thread = threading.Thread(target=self.loop, name="refresh", daemon=True)
+        thread.start()
+        if self.intraday_s:
+            threading.Thread(target=self.intraday_loop, name="intraday", daemon=True).start()
+        return thread
+
+    def stop(self):
+        self.stopped.set()
+        self.wake.set()
+
+
+# ─────────────────────────────────────────────
+# HTTP
+# ─────────────────────────────────────────────
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, ctype, raw, gz=None, etag=None, cache="no-cache"):
+            use_gz = gz is not None and "gzip" in self.headers.get("Accept-Encoding", "")
+            if not use_gz and len(raw) >= GZIP_MIN and "gzip" in self.headers.get("Accept-Encoding", ""):
+                gz, use_gz = gzip.compress(raw, 6), True
+            body = gz if use_gz else raw
+            self.send_response(status)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", cache)
+            if use_gz:
+                self.send_header("Content-Encoding", "gzip")
+            if etag:
+                self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, obj, status=200):
+            self._send(status, "application/json", _json(obj))
+
+        def do_GET(self):
+            url   = urlparse(self.path)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            path  = url.path.rstrip("/") or "/"
+            view  = service.view
+            if path in ASSET_BODIES:
+                return self._send(200, *ASSET_BODIES[path], cache=IMMUTABLE)
+            if path == "/api/status":
+                return self._send_json({**service.status, "version": service.version,
+                                        "asof": view.asof if view else None,
+                                        "tickers": len(view.df) if view else 0,
+                                        "clients": len(service.events.clients), "events": service.events.sent})
+            if view is None:
+                return self._send_json({"status": service.status["state"], "error": service.status.get("error")}, 503)
+            if path == "/index.html":
+                path = "/"
+            if path == "/api/stream":
+                return self._stream()
+            try:
+                if path in View.PATHS:
+                    if self.headers.get("If-None-Match") == view.etag:
+                        self.send_response(304)
+                        self.send_header("ETag", view.etag)
+                        self.send_header("Content-Length", "0")
+                        return self.end_headers()
+                    return self._send(200, *view.body(path), etag=view.etag)
+                if path == "/api/screener":
+                    return self._send_json(view.rows(
+                        where=query.get("where"), sort=query.get("sort"),
+                        limit=int(query.get("limit", LIMIT)),
+                        columns=query["columns"].split(",") if query.get("columns") else None))
+                if path.startswith("/api/ticker/"):
+                    out = view.ticker(unquote(path[len("/api/ticker/"):]).upper(), int(query.get("days", 60)),
+                                      service.store)
+                    return self._send_json(out) if out else self._send_json({"error": "unbekannter Ticker"}, 404)
+            except (ValueError, KeyError) as e:
+                return self._send_json({"error": str(e).strip("'\"")}, 400)
+            self._send_json({"error": "nicht gefunden"}, 404)
+
+        def _stream(self):
+            """Event-Stream bis der Browser die Verbindung schließt."""
+            q = service.events.subscribe()
+            self.close_connection = True
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                self.wfile.write(f"retry: 5000\n: v{service.version}\n\n".encode())
+                self.wfile.flush()
+                while not service.stopped.is_set():
+                    try:
+                        msg = q.get(timeout=KEEPALIVE)
+                    except queue.Empty:
+                        msg = b": ping\n\n"
+                    self.wfile.write(msg)
+                    self.wfile.flush()
+            except OSError:
+                pass
+            finally:
+                service.events.unsubscribe(q)
+
+        def do_POST(self):
+            if urlparse(self.path).path.rstrip("/") == "/api/refresh":
+                service.wake.set()
+                return self._send_json({"status": "angestoßen"}, 202)
+            self._send_json({"error": "nicht gefunden"}, 404)
+
+    return Handler
+
+
+def serve(port=PORT, host="127.0.0.1", interval=INTERVAL, intraday_s=INTRADAY, all_hours=False):
+    service = ScreenerService(interval, intraday_s, all_hours)
+    service.start()
+    httpd = ThreadingHTTPServer((host, port), make_handler(service))
+    httpd.daemon_threads = True
+    print(f"🌐 Screener-Server auf http://{host}:{port}/ (Aktualisierung alle {interval:g}s"
+          + (f", intraday alle {intraday_s:g}s)" if intraday_s else ")"))
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Screener als lokaler HTTP-Dienst")
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--interval", type=float, default=INTERVAL, help="Sekunden zwischen zwei Aktualisierungen")
+    ap.add_argument("--intraday", type=float, default=INTRADAY,
+                    help="Sekunden zwischen Intraday-Abrufen der offenen Börsen (0 = aus)")
+    ap.add_argument("--all-hours", action="store_true", help="Handelszeiten ignorieren (Test mit intraday.py fake-feed)")
+    args = ap.parse_args()
+    serve(args.port, args.host, args.interval, args.intraday, args.all_hours)
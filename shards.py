@@ -0,0 +1,98 @@
+"""
+Sharding des Screener-Laufs nach Börse
+Das Universum wird nach Ticker-Suffix (.DE, .PA, .L, ...) auf N Shards verteilt; jeder Shard
+lädt und rechnet in einem eigenen Prozess bzw. CI-Matrix-Job und legt sein Ergebnis als
+kleine JSON-Datei ab (eine Zeile pro Ticker + Laufzeit-Metriken), daneben das Renditepanel
+der letzten Handelstage als .npz für die Querschnitts-Kennzahlen. Der Merge liest nur diese Dateien.
+Dasselbe Format dient als Zwischenstand zwischen `screener.py compute` und `screener.py render`.
+"""
+
+import glob, json, os
+import numpy as np
+import pandas as pd
+
+from analytics import ReturnPanel
+
+TEXT_COLUMNS = ["ticker", "name", "country", "sector", "currency"]
+
+
+def plan_shards(universe, n):
+    """Börsen → n Shards, nach Tickerzahl ausbalanciert (größte zuerst in den leichtesten Shard).
+    Deterministisch, damit Shard-Schlüssel (und damit Store/Zustand je Shard) stabil bleiben."""
+    counts = universe.frame["exchange"].value_counts()
+    order  = sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))
+    shards = [[] for _ in range(max(1, min(n, len(order))))]
+    load   = [0] * len(shards)
+    for exchange, count in order:
+        k = load.index(min(load))
+        shards[k].append(exchange)
+        load[k] += count
+    return [sorted(s) for s in shards]
+
+
+def shard_key(exchanges):
+    return "-".join(sorted(e.lower() for e in exchanges))
+
+
+def parse_shard(spec):
+    """'2/4' → (1, 4): nullbasierter Index und Anzahl."""
+    k, _, n = spec.partition("/")
+    k, n = int(k), int(n or 0)
+    if not 1 <= k <= n:
+        raise ValueError(f"Shard-Angabe {spec!r} ungültig, erwartet K/N mit 1 ≤ K ≤ N")
+    return k - 1, n
+
+
+def shard_path(out_dir, exchanges):
+    return os.path.join(out_dir, f"shard-{shard_key(exchanges)}.json")
+
+
+def returns_path(path):
+    return path[:-len(".json")] + ".returns.npz"
+
+
+def write_frame(path, df, report, returns=None, **meta):
+    """Screener-Frame (eine Zeile pro Ticker) + Laufbericht als JSON, Renditepanel daneben als .npz.
+    Auch der Zwischenstand der Einzelstufen (screener.py compute → render)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    rows = {c: df[c].tolist() if c in TEXT_COLUMNS else
+              df[c].astype(object).where(df[c].notna(), None).tolist() for c in df.columns}
+    if returns is not None:
+        returns.save(returns_path(path))
+    tmp  = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump({**meta, "rows": rows, "report": report}, fh, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+    return path
+
+
+def read_frame(path):
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    df = pd.DataFrame(data.pop("rows"))
+    for c in df.columns.difference(TEXT_COLUMNS):
+        df[c] = pd.to_numeric(df[c], errors="coerce").astype(float)
+    data["frame"], data["path"] = df, path
+    if os.path.exists(returns_path(path)):
+        data["returns"] = ReturnPanel.load(returns_path(path))
+    return data
+
+
+def write_shard(out_dir, exchanges, n_shards, df, report, returns=None):
+    return write_frame(shard_path(out_dir, exchanges), df, report, returns, exchanges=exchanges, shards=n_shards)
+
+
+def read_shards(out_dir):
+    return [read_frame(path) for path in sorted(glob.glob(os.path.join(out_dir, "shard-*.json")))]
+
+
+def merge_frames(frames, order):
+    """Shard-Frames zu einem Screener-Frame; Reihenfolge wie ein Einzel-Lauf
+    (Stammreihenfolge, dann nach Tagesveränderung absteigend)."""
+    frames = [f for f in frames if len(f)]
+    if not frames:
+        raise ValueError("Keine Shard-Ergebnisse vorhanden.")
+    df  = pd.concat(frames, ignore_index=True)
+    pos = pd.Index(order).get_indexer(df["ticker"])
+    df  = df.iloc[np.argsort(np.where(pos < 0, len(order), pos), kind="stable")]
+    return df.sort_values("pct_change", ascending=False).reset_index(drop=True)
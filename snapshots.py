@@ -0,0 +1,157 @@
+"""
+Archiv der täglichen Screener-Ergebnisse
+Eine Partition pro Handelstag (date=YYYY-MM-DD/), darin eine .npy-Datei pro Spalte und stats.json
+mit Zeilenzahl, Min/Max je Zahlenspalte und den Werten der Textspalten mit wenigen Ausprägungen.
+Abfragen lesen nur die benötigten Spalten (memory-mapped) und überspringen Partitionen,
+deren Statistik den Filter nicht erfüllen kann.
+
+Aufruf:
+  python snapshots.py top vol_ratio --n 10 --days 30
+  python snapshots.py streak pct_change --length 3
+"""
+
+import argparse, json, os, shutil
+import numpy as np
+import pandas as pd
+
+TEXT_COLUMNS = ["ticker", "name", "country", "sector", "currency"]
+MAX_VALUES   = 64       # Textspalten bis zu so vielen Ausprägungen bekommen eine Werteliste für das Pruning
+
+OPS = {
+    "<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+    "==": np.equal, "!=": np.not_equal, "in": np.isin,
+}
+
+
+def _may_match(stats, column, op, value):
+    """False, wenn die Partition laut Statistik sicher keine Zeile für den Filter enthält."""
+    s = stats.get("columns", {}).get(column)
+    if s is None:
+        return True
+    if "values" in s:
+        values = set(s["values"])
+        if op == "==":
+            return value in values
+        if op == "in":
+            return bool(values.intersection(value))
+        return True
+    lo, hi = s.get("min"), s.get("max")
+    if lo is None:                      # Spalte komplett NaN
+        return op == "!="
+    return {"<": lo < value, "<=": lo <= value, ">": hi > value, ">=": hi >= value,
+            "==": lo <= value <= hi}.get(op, True)
+
+
+class SnapshotArchive:
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, date):
+        return os.path.join(self.root, f"date={pd.Timestamp(date):%Y-%m-%d}")
+
+    def dates(self, start=None, end=None):
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return []
+        dates = sorted(pd.Timestamp(n[5:]) for n in names
+                       if n.startswith("date=") and os.path.exists(os.path.join(self.root, n, "stats.json")))
+        return [d for d in dates if (start is None or d >= pd.Timestamp(start)) and (end is None or d <= pd.Timestamp(end))]
+
+    # ── Schreiben ────────────────────────────────
+    def write(self, date, df):
+        """Legt das Ergebnis eines Tages ab; eine bestehende Partition desselben Tages wird ersetzt."""
+        path  = self._path(date)
+        tmp   = path + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        stats = {"rows": len(df), "columns": {}}
+        for c in df.columns:
+            if c in TEXT_COLUMNS:
+                values = df[c].to_numpy(dtype=str)
+                uniq   = np.unique(values)
+                stats["columns"][c] = {"values": uniq.tolist()} if len(uniq) <= MAX_VALUES else {}
+            else:
+                values = df[c].to_numpy(dtype=float)
+                ok     = values[~np.isnan(values)]
+                stats["columns"][c] = {"min": float(ok.min()), "max": float(ok.max())} if len(ok) else {"min": None}
+            np.save(os.path.join(tmp, f"{c}.npy"), values)
+        with open(os.path.join(tmp, "stats.json"), "w", encoding="utf-8") as fh:
+            json.dump(stats, fh, ensure_ascii=False)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+        return path
+
+    # ── Abfragen ─────────────────────────────────
+    def scan(self, columns=None, where=(), start=None, end=None, days=None):
+        """Zeilen aller Partitionen im Zeitraum (bzw. der letzten `days` Partitionen), die alle
+        Filter erfüllen. where: [(Spalte, Operator, Wert), ...] mit Operatoren aus OPS.
+        Gelesen werden nur die Spalten aus columns und where."""
+        dates = self.dates(start, end)
+        if days is not None:
+            dates = dates[-days:]
+        where = [(c, op, set(v) if op == "in" else v) for c, op, v in where]
+        parts = []
+        for date in dates:
+            path = self._path(date)
+            with open(os.path.join(path, "stats.json"), encoding="utf-8") as fh:
+                stats = json.load(fh)
+            if not all(_may_match(stats, c, op, v) for c, op, v in where):
+                continue
+            cols = list(columns or stats["columns"])
+            load = {c: np.load(os.path.join(path, f"{c}.npy"), mmap_mode="r")
+                    for c in dict.fromkeys(cols + [c for c, _, _ in where]) if c in stats["columns"]}
+            mask = np.ones(stats["rows"], dtype=bool)
+            for c, op, v in where:
+                mask &= OPS[op](load[c], list(v) if op == "in" else v) if c in load else False
+            if mask.any():
+                parts.append(pd.DataFrame({"date": date, **{c: np.asarray(load[c][mask]) if c in load else np.nan
+                                                            for c in cols}}))
+        if not parts:
+            return pd.DataFrame(columns=["date", *(columns or [])])
+        return pd.concat(parts, ignore_index=True)
+
+    def top(self, column, n=10, days=30, ascending=False, columns=("ticker", "name"), where=()):
+        """z.B. top("vol_ratio", 10, 30): höchste Werte je Ticker und Tag der letzten 30 Handelstage."""
+        df = self.scan([*columns, column], where=where, days=days).dropna(subset=[column])
+        df = df.nsmallest(n, column) if ascending else df.nlargest(n, column)
+        return df.reset_index(drop=True)
+
+    def streak(self, column="pct_change", length=3, op=">", value=0.0, days=None):
+        """Ticker, deren Bedingung (Standard: Tagesgewinn) an den letzten `length` oder mehr
+        Handelstagen in Folge erfüllt war. Fehlt ein Ticker an einem Tag, endet seine Serie."""
+        dates = self.dates()[-(days or max(length, 30)):]
+        if not dates:
+            return pd.DataFrame(columns=["ticker", "streak"])
+        df  = self.scan(["ticker", column], start=dates[0])
+        piv = df.assign(hit=OPS[op](df[column].to_numpy(dtype=float), value)) \
+                .pivot_table(index="date", columns="ticker", values="hit", aggfunc="max", fill_value=False) \
+                .reindex(dates, fill_value=False)
+        hit = piv.to_numpy(dtype=bool)
+        # Länge der laufenden Serie: erste Lücke von hinten gesucht
+        rev = hit[::-1]
+        run = np.where(rev.all(axis=0), len(rev), np.argmin(rev, axis=0))
+        out = pd.DataFrame({"ticker": piv.columns.to_numpy(), "streak": run})
+        return out[out["streak"] >= length].sort_values(["streak", "ticker"], ascending=[False, True]) \
+                                            .reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Abfragen auf das Screener-Archiv")
+    ap.add_argument("query", choices=["top", "bottom", "streak", "dates"])
+    ap.add_argument("column", nargs="?", default="pct_change")
+    ap.add_argument("--root", default=os.environ.get("SCREENER_SNAPSHOTS",
+                                                     os.path.join(os.environ.get("SCREENER_CACHE", "cache"), "snapshots")))
+    ap.add_argument("--n", type=int, default=10)
+    ap.add_argument("--days", type=int, default=30)
+    ap.add_argument("--length", type=int, default=3)
+    args = ap.parse_args()
+
+    archive = SnapshotArchive(args.root)
+    with pd.option_context("display.width", 160, "display.max_rows", 200):
+        if args.query == "dates":
+            print("\n".join(f"{d:%Y-%m-%d}" for d in archive.dates()))
+        elif args.query == "streak":
+            print(archive.streak(args.column, args.length, days=args.days).to_string(index=False))
+        else:
+            print(archive.top(args.column, args.n, args.days, ascending=args.query == "bottom").to_string(index=False))
@@ -0,0 +1,111 @@
+"""
+Bulk-Download der stooq-Tagesdaten pro Markt
+Ein ZIP-Archiv pro Markt statt eines Requests pro Ticker; es werden nur die
+Symbole des Instrumentenstamms extrahiert. Fehlende Symbole lädt der Screener weiter einzeln.
+"""
+
+import io, os, tempfile, time, zipfile
+import pandas as pd
+
+# Archiv-URL, {market} wird ersetzt (per Umgebungsvariable z.B. auf einen lokalen Server umstellbar)
+BULK_URL = os.environ.get("STOOQ_BULK_URL", "https://static.stooq.com/db/d/?b=d_{market}_txt")
+
+# stooq-Suffix → Marktkürzel des Bulk-Archivs. stooq bietet Tagesarchive nur für wenige Märkte an
+# (de, uk, us, pl, hu, jp, hk); alle übrigen europäischen Börsen des Stamms (fr, ch, nl, es, it, se,
+# dk, no, fi, at, be) haben keins und werden weiter einzeln geladen (siehe unmapped()).
+BULK_MARKETS = {"de": "de", "uk": "uk", "us": "us", "pl": "pl", "hu": "hu", "jp": "jp", "hk": "hk"}
+
+_RENAME = {
+    "<DATE>": "Date", "<OPEN>": "Open", "<HIGH>": "High",
+    "<LOW>": "Low", "<CLOSE>": "Close", "<VOL>": "Volume",
+}
+
+
+def market_of(stooq_ticker):
+    suffix = stooq_ticker.rsplit(".", 1)[-1] if "." in stooq_ticker else ""
+    return BULK_MARKETS.get(suffix)
+
+
+def group_by_market(stooq_tickers):
+    groups = {}
+    for t in stooq_tickers:
+        m = market_of(t)
+        if m:
+            groups.setdefault(m, set()).add(t)
+    return groups
+
+
+def unmapped(stooq_tickers):
+    """Ticker ohne Bulk-Archiv (Einzelabruf)."""
+    return [t for t in stooq_tickers if market_of(t) is None]
+
+
+def parse_symbol_file(fh):
+    df = pd.read_csv(fh, usecols=lambda c: c in _RENAME, dtype={"<DATE>": str})
+    df = df.rename(columns=_RENAME)
+    if df.empty or "Close" not in df.columns:
+        return None
+    df["Date"] = pd.to_datetime(df["Date"], format="%Y%m%d")
+    if not df["Date"].is_monotonic_increasing:
+        df = df.sort_values("Date")
+    return df.reset_index(drop=True)
+
+
+def parse_bulk_archive(source, symbols):
+    """source: Pfad, Bytes oder Dateiobjekt eines stooq-ZIPs.
+    Liefert {stooq-Ticker: DataFrame} für alle gefundenen Symbole."""
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    wanted = {s.lower() for s in symbols}
+    out = {}
+    with zipfile.ZipFile(source) as zf:
+        for info in zf.infolist():
+            base = os.path.basename(info.filename).lower()
+            if not base.endswith(".txt") or base[:-4] not in wanted:
+                continue
+            with zf.open(info) as fh:
+                df = parse_symbol_file(fh)
+            if df is not None and len(df) >= 2:
+                out[base[:-4]] = df
+    return out
+
+
+BULK_HEADER = "<TICKER>,<PER>,<DATE>,<TIME>,<OPEN>,<HIGH>,<LOW>,<CLOSE>,<VOL>,<OPENINT>"
+
+
+def write_bulk_archive(frames, market, level=6):
+    """Gegenstück zu parse_bulk_archive für Fixtures und lokale Stand-ins: {stooq-Ticker: Frame
+    mit Date/OHLCV} → ZIP im Layout von stooq (data/daily/<market>/…/<ticker>.txt).
+    Ein Frame, der für mehrere Ticker steht, wird nur einmal formatiert."""
+    bodies = {}
+    buf    = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED, compresslevel=level) as zf:
+        for ticker, df in sorted(frames.items()):
+            if id(df) not in bodies:
+                dates = pd.to_datetime(df["Date"]).dt.strftime("%Y%m%d")
+                bodies[id(df)] = [f",D,{d},000000,{o:.10g},{h:.10g},{l:.10g},{c:.10g},{v:.0f},0" for d, o, h, l, c, v in
+                                  zip(dates, df["Open"], df["High"], df["Low"], df["Close"], df["Volume"])]
+            t = ticker.upper()
+            zf.writestr(f"data/daily/{market}/{market} stocks/{ticker.lower()}.txt",
+                        BULK_HEADER + "\n" + t + ("\n" + t).join(bodies[id(df)]) + "\n")
+    return buf.getvalue()
+
+
+def fetch_bulk(session, market, symbols, headers=None, stats=None, timeout=120):
+    """Lädt das Archiv eines Marktes gestreamt in eine temporäre Datei und parst die gewünschten Symbole."""
+    stats = stats if stats is not None else {}
+    url = BULK_URL.format(market=market)
+    t0 = time.perf_counter()
+    with tempfile.TemporaryFile() as tmp:
+        with session.get(url, headers=headers, timeout=timeout, stream=True) as r:
+            stats.update(status=r.status_code)
+            if r.status_code != 200:
+                return {}
+            for chunk in r.iter_content(chunk_size=1 << 20):
+                tmp.write(chunk)
+        stats.update(bytes=tmp.tell(), latency=time.perf_counter() - t0)
+        tmp.seek(0)
+        try:
+            return parse_bulk_archive(tmp, symbols)
+        except zipfile.BadZipFile:
+            return {}
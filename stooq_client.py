@@ -0,0 +1,63 @@
+"""
+HTTP-Client für stooq.com
+Eine Session pro Lauf: Connection-Pool passend zur Worker-Zahl (Keep-alive statt neuer
+Verbindung pro Ticker), komprimierter Transfer und feste Header auf der Session statt pro Aufruf.
+Bedingte Abrufe: ETag/Last-Modified der letzten Antwort je Symbol werden mitgeschickt –
+unveränderte Symbole (Feiertag, ausgesetzter Handel) kosten dann nur ein 304 statt der ganzen CSV.
+"""
+
+import os
+import requests
+from requests.adapters import HTTPAdapter
+
+STOOQ_URL = os.environ.get("STOOQ_URL", "https://stooq.com/q/d/l/")
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36"
+    ),
+    "Accept":          "text/csv,text/plain;q=0.9,*/*;q=0.5",
+    "Accept-Encoding": "gzip, deflate",
+    "Connection":      "keep-alive",
+}
+
+HOSTS = 2       # stooq.com (Einzelabrufe) und static.stooq.com (Bulk-Archive)
+
+
+def make_session(workers, headers=HEADERS):
+    """Session mit einem Pool von workers+1 Verbindungen je Host – bei mehr Workern als
+    Pool-Plätzen würde urllib3 Verbindungen nach jedem Request verwerfen und neu aufbauen."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HOSTS, pool_maxsize=max(1, workers) + 1, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(headers)
+    return session
+
+
+def conditional_headers(validator):
+    """validator: {"etag": ..., "modified": ...} der letzten Antwort für dieselbe Abfrage."""
+    if not validator:
+        return None
+    headers = {}
+    if validator.get("etag"):
+        headers["If-None-Match"] = validator["etag"]
+    if validator.get("modified"):
+        headers["If-Modified-Since"] = validator["modified"]
+    return headers or None
+
+
+def validator_of(response):
+    etag, modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+    return {"etag": etag, "modified": modified} if etag or modified else None
+
+
+def wire_bytes(response):
+    """Übertragene (ggf. komprimierte) Bytes; ohne urllib3-Rohantwort die dekodierte Länge."""
+    raw = getattr(response, "raw", None)
+    try:
+        return int(raw.tell())
+    except (AttributeError, TypeError, ValueError, OSError):
+        return len(response.content)